@@ -12,6 +12,8 @@ public class PackageDto
     
     public int PostBoxId { get; set; }
     
+    public int UserId { get; set; }
+    
     public string CategoryName { get; set; }
     
     public string DeliveryStatusName { get; set; }
@@ -99,6 +99,7 @@ public class PackageService : IPackageService
             Width = p.Width,
             Depth = p.Depth,
             PostBoxId = p.PostBoxId,
+            UserId = p.UserId,
             CategoryName = p.Category?.Name ?? "",
             DeliveryStatusName = p.DeliveryStatus?.Name ?? "",
             CreatedOn = p.CreatedOn
@@ -126,6 +127,7 @@ public class PackageService : IPackageService
             Width = p.Width,
             Depth = p.Depth,
             PostBoxId = p.PostBoxId,
+            UserId = p.UserId,
             CategoryName = p.Category?.Name ?? "",
             DeliveryStatusName = p.DeliveryStatus?.Name ?? "",
             CreatedOn = p.CreatedOn
@@ -1,19 +1,41 @@
+from json_stream import iter_json_array
+
+
+# Optional Package fields; the state machine itself only reads id, the
+# dimensions and volume, which are always loaded (plus recipient_id when
+# locker co-location is on)
+PACKAGE_OPTIONAL_FIELDS = ('weight', 'recipient_id', 'recipient_name', 'tracking_number', 'status')
+
+# Optional ValidationResponse fields; the state machine only reads name and
+# roles, which are always loaded
+VALIDATION_OPTIONAL_FIELDS = ('user_id', 'email', 'serial', 'is_valid')
+
+
 class ValidationResponse:
-    def __init__(self, data):
+    __slots__ = ('name', 'roles') + VALIDATION_OPTIONAL_FIELDS
+    
+    def __init__(self, data, fields=None):
+        # fields - optional fields to load (None = all); the rest stay None
+        if fields is None:
+            fields = VALIDATION_OPTIONAL_FIELDS
+        
         if isinstance(data, dict):
-            self.user_id = data.get('id') or data.get('userId')
             self.name = data.get('name') or data.get('userName') or data.get('emailAddress', 'Unknown')
-            self.email = data.get('email') or data.get('emailAddress', '')
-            self.serial = data.get('serialNfcData', '')
             
             raw_roles = data.get('roles', [])
             self.roles = self._parse_roles(raw_roles)
             
-            self.is_valid = data.get('isValid', True)
+            self.user_id = (data.get('id') or data.get('userId')) if 'user_id' in fields else None
+            self.email = (data.get('email') or data.get('emailAddress', '')) if 'email' in fields else None
+            self.serial = data.get('serialNfcData', '') if 'serial' in fields else None
+            self.is_valid = data.get('isValid', True) if 'is_valid' in fields else None
         else:
-            self.is_valid = False
-            self.roles = []
             self.name = 'Unknown'
+            self.roles = []
+            self.user_id = None
+            self.email = '' if 'email' in fields else None
+            self.serial = '' if 'serial' in fields else None
+            self.is_valid = False if 'is_valid' in fields else None
     
     def _parse_roles(self, raw_roles):
         roles = []
@@ -48,24 +70,32 @@ class ValidationResponse:
 
 
 class Package:
-    def __init__(self, data):
+    __slots__ = ('id', 'height', 'width', 'depth', 'volume') + PACKAGE_OPTIONAL_FIELDS
+    
+    def __init__(self, data, fields=None):
+        # fields - optional fields to load (None = all); the rest stay None
         self.id = data.get('id')
         self.height = data.get('height', 0)
         self.width = data.get('width', 0)
         self.depth = data.get('depth', 0)
-        self.weight = data.get('weight', 0)
-        
-        self.recipient_name = data.get('recipientName', '')
-        self.tracking_number = data.get('trackingNumber', '')
-        self.status = data.get('status', '')
-        
         self.volume = self.height * self.width * self.depth
+        
+        if fields is None:
+            fields = PACKAGE_OPTIONAL_FIELDS
+        self.weight = data.get('weight', 0) if 'weight' in fields else None
+        # Id of the user the package is addressed to (PackageDto.UserId); None if not sent
+        self.recipient_id = data.get('userId') if 'recipient_id' in fields else None
+        self.recipient_name = data.get('recipientName', '') if 'recipient_name' in fields else None
+        self.tracking_number = data.get('trackingNumber', '') if 'tracking_number' in fields else None
+        self.status = data.get('status', '') if 'status' in fields else None
     
     def __str__(self):
         return f"Package(id={self.id}, {self.height}x{self.width}x{self.depth})"
 
 
 class LockerInfo:
+    __slots__ = ('id', 'number', 'status')
+    
     def __init__(self, data):
         if isinstance(data, dict):
             self.id = data.get('id')
@@ -77,7 +107,7 @@ class LockerInfo:
             self.status = 'available'
 
 
-def parse_validation_response(data):
+def parse_validation_response(data, fields=None):
     if not data:
         return None
     
@@ -96,12 +126,12 @@ def parse_validation_response(data):
         
         actual_data = data.get('data') or data.get('value') or data
         
-        return ValidationResponse(actual_data)
+        return ValidationResponse(actual_data, fields)
     
     return None
 
 
-def parse_packages(data):
+def parse_packages(data, fields=None):
     if not data:
         return []
     
@@ -113,10 +143,18 @@ def parse_packages(data):
     if not isinstance(packages_array, list):
         return []
     
-    return [Package(pkg) for pkg in packages_array]
+    return [Package(pkg, fields) for pkg in packages_array]
+
+
+def iter_packages(chunks, fields=None):
+    for item in iter_json_array(chunks, ('data', 'value', 'packages')):
+        if isinstance(item, dict):
+            yield Package(item, fields)
 
 
 class LockerPackage:
+    __slots__ = ('locker_id', 'package_id')
+    
     def __init__(self, data):
         if isinstance(data, dict):
             self.locker_id = data.get('lockerId') or data.get('id')
@@ -151,6 +189,30 @@ def parse_lockers(data):
     return result
 
 
+def iter_lockers(chunks):
+    for item in iter_json_array(chunks, ('data', 'value', 'lockers')):
+        if isinstance(item, (int, dict)):
+            yield LockerPackage(item)
+
+
+def parse_bulk_place_results(data, placements):
+    # None - no per-item results (empty body, proxy page), outcome unknown
+    items = data
+    if isinstance(data, dict):
+        items = data.get('data') or data.get('value') or data.get('results')
+    
+    if not isinstance(items, list):
+        return None
+    
+    succeeded = {}
+    for item in items:
+        if isinstance(item, dict):
+            ok = item.get('success', item.get('succeeded', item.get('isSuccess', False)))
+            succeeded[item.get('packageId')] = bool(ok)
+    
+    return [succeeded.get(package_id, False) for package_id, _ in placements]
+
+
 def safe_get(data, *keys, default=None):
     result = data
     for key in keys:
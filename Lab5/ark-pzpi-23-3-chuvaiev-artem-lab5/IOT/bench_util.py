@@ -0,0 +1,47 @@
+"""
+Shared timing helper for the host-side benchmarks (CPython only, not copied to the board)
+Used by placement_sim.py, lcd_bench.py and json_bench.py
+"""
+
+import time
+
+
+def benchmark(func, rounds=20, warmup=2, min_time=0.005):
+    """Times func() in the style of pytest-benchmark.
+
+    Each round calls func enough times to last at least min_time seconds
+    and records the time per call. Returns min/max/mean/median/stddev in
+    microseconds plus rounds and iterations per round.
+    """
+    for _ in range(warmup):
+        func()
+
+    iterations = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        if time.perf_counter() - start >= min_time or iterations >= 1 << 20:
+            break
+        iterations *= 2
+
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        samples.append((time.perf_counter() - start) / iterations * 1e6)
+
+    samples.sort()
+    mean = sum(samples) / len(samples)
+    middle = len(samples) // 2
+    median = samples[middle] if len(samples) % 2 else (samples[middle - 1] + samples[middle]) / 2
+    return {
+        'min': samples[0],
+        'max': samples[-1],
+        'mean': mean,
+        'median': median,
+        'stddev': (sum((s - mean) ** 2 for s in samples) / len(samples)) ** 0.5,
+        'rounds': rounds,
+        'iterations': iterations
+    }
@@ -3,7 +3,11 @@ Configuration loader for NFC Mailbox IOT System
 Loads configuration from config.json file
 """
 
-import ujson
+try:
+    import ujson
+except ImportError:
+    # CPython on the host
+    import json as ujson
 
 # Load configuration from JSON file
 try:
@@ -20,6 +24,15 @@ WIFI_PASSWORD = _config.get('wifi', {}).get('password', '')
 
 # API Configuration
 API_BASE_URL = _config.get('api', {}).get('base_url', '')
+API_TIMEOUT = _config.get('api', {}).get('timeout', 10)
+API_DNS_TTL = _config.get('api', {}).get('dns_ttl', 300)
+API_BATCH_PLACE = _config.get('api', {}).get('batch_place', True)
+API_STREAM_CHUNK_SIZE = _config.get('api', {}).get('stream_chunk_size', 256)
+# Optional Package fields to keep in RAM (see api_models.PACKAGE_OPTIONAL_FIELDS)
+API_PACKAGE_FIELDS = tuple(_config.get('api', {}).get('package_fields', []))
+# Optional ValidationResponse fields to keep in RAM (see api_models.VALIDATION_OPTIONAL_FIELDS)
+API_VALIDATION_FIELDS = tuple(_config.get('api', {}).get('validation_fields', []))
+API_LOG_TIMING = _config.get('api', {}).get('log_timing', False)
 
 # LCD Display Configuration
 LCD_I2C_ADDRESS = _config.get('lcd', {}).get('i2c_address', 0x27)
@@ -38,11 +51,15 @@ KEYPAD_KEYS = _config.get('keypad', {}).get('keys', [
     ['7', '8', '9', 'C'],
     ['*', '0', '#', 'D']
 ])
+KEYPAD_DEBOUNCE_MS = _config.get('keypad', {}).get('debounce_ms', 30)
+KEYPAD_QUEUE_SIZE = _config.get('keypad', {}).get('queue_size', 16)
+KEYPAD_LONG_PRESS_MS = _config.get('keypad', {}).get('long_press_ms', 800)
 
 # Hardware Pin Configuration
 LED_SUCCESS_PIN = _config.get('hardware', {}).get('led_success_pin', 2)
 LED_ERROR_PIN = _config.get('hardware', {}).get('led_error_pin', 4)
 RELAY_PIN = _config.get('hardware', {}).get('relay_pin', 15)
+LED_TIMER_ID = _config.get('hardware', {}).get('led_timer_id', 0)
 
 # Localization
 DEFAULT_LANGUAGE = _config.get('localization', {}).get('default_language', 'en')
@@ -55,12 +72,45 @@ LOCKER_OPEN_DURATION = _config.get('timeouts', {}).get('locker_open_duration', 5
 MAX_SERIAL_LENGTH = _config.get('input', {}).get('max_serial_length', 16)
 NUMERIC_ONLY_INPUT = _config.get('input', {}).get('numeric_only', False)
 
+# NFC Validation Cache
+VALIDATION_CACHE_SIZE = _config.get('cache', {}).get('validation_size', 32)
+VALIDATION_CACHE_TTL = _config.get('cache', {}).get('validation_ttl', 600)
+VALIDATION_CACHE_NEGATIVE_TTL = _config.get('cache', {}).get('validation_negative_ttl', 30)
+
+# Offline Outbox
+OUTBOX_ENABLED = _config.get('outbox', {}).get('enabled', True)
+OUTBOX_PATH = _config.get('outbox', {}).get('path', 'outbox.log')
+OUTBOX_BACKOFF_BASE = _config.get('outbox', {}).get('backoff_base', 5)
+OUTBOX_BACKOFF_MAX = _config.get('outbox', {}).get('backoff_max', 300)
+OUTBOX_COMPACT_AFTER = _config.get('outbox', {}).get('compact_after', 32)
+
+# Statistics Persistence
+STATS_PERSIST_ENABLED = _config.get('stats', {}).get('persist', True)
+STATS_SLOT_PATHS = tuple(_config.get('stats', {}).get('slot_paths', ['stats_a.bin', 'stats_b.bin']))
+STATS_SAVE_INTERVAL = _config.get('stats', {}).get('save_interval', 900)
+STATS_MAX_ENDPOINTS = _config.get('stats', {}).get('max_endpoints', 8)
+STATS_SAVE_WINDOWS = _config.get('stats', {}).get('save_windows', True)
+
+# Metrics Endpoint
+METRICS_ENABLED = _config.get('metrics', {}).get('enabled', True)
+METRICS_PORT = _config.get('metrics', {}).get('port', 9100)
+
 # Locker Database
 LOCKER_DATABASE = _config.get('lockers', [])
 
 # Optimal Placement Algorithm Settings
 OPTIMAL_UTILIZATION_MIN = _config.get('algorithm', {}).get('optimal_utilization_min', 60)
 OPTIMAL_UTILIZATION_MAX = _config.get('algorithm', {}).get('optimal_utilization_max', 85)
+BATCH_PLACEMENT = _config.get('algorithm', {}).get('batch_placement', True)
+PLACEMENT_ENGINE = _config.get('algorithm', {}).get('engine', 'index')
+LOCKER_COLOCATION = _config.get('algorithm', {}).get('colocation', False)
+if LOCKER_COLOCATION and 'recipient_id' not in API_PACKAGE_FIELDS:
+    # Co-location groups packages by recipient id
+    API_PACKAGE_FIELDS += ('recipient_id',)
+
+# Runtime: blocking state machine or cooperative asyncio one
+ASYNC_RUNTIME = _config.get('runtime', {}).get('async', False)
+CONSOLE_COMMANDS = _config.get('runtime', {}).get('console_commands', True)
 
 # Timing Settings
 MENU_DISPLAY_DURATION = _config.get('timing', {}).get('menu_display_duration', 3)
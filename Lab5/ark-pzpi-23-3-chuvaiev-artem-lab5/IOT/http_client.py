@@ -0,0 +1,444 @@
+"""
+Minimal HTTP/1.1 client with a persistent keep-alive connection
+Used by the API helpers instead of urequests
+"""
+
+import time
+
+try:
+    import usocket as socket
+except ImportError:
+    import socket
+
+try:
+    import ussl as ssl
+except ImportError:
+    import ssl
+
+try:
+    import ujson
+except ImportError:
+    import json as ujson
+
+try:
+    from time import ticks_ms, ticks_diff
+except ImportError:
+    # CPython fallback so the client can be exercised on Linux
+    def ticks_ms():
+        return int(time.monotonic() * 1000)
+
+    def ticks_diff(end, start):
+        return end - start
+
+# Request phases, in the order they happen
+PHASES = ('dns', 'connect', 'tls', 'request', 'body')
+PHASE_DNS = 0
+PHASE_CONNECT = 1
+PHASE_TLS = 2
+PHASE_REQUEST = 3
+PHASE_BODY = 4
+
+
+def endpoint_of(path):
+    """Path without the query string, numeric segments replaced by {id}"""
+    path = path.split('?', 1)[0]
+    return '/'.join('{id}' if part.isdigit() else part for part in path.split('/'))
+
+
+class RequestTiming:
+    """Per-request measurements passed to HttpClient.observer.
+
+    Phase durations are in milliseconds: dns and connect (0 on a reused
+    connection), tls, request (send until the status line arrives) and
+    body (headers and body). status_code is 0 if the request failed.
+    """
+
+    def __init__(self, method, path):
+        self.method = method
+        self.endpoint = endpoint_of(path)
+        self.status_code = 0
+        self.phases = [0] * len(PHASES)
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.reused = False
+
+    def add(self, phase, start):
+        self.phases[phase] += ticks_diff(ticks_ms(), start)
+
+    @property
+    def total_ms(self):
+        return sum(self.phases)
+
+    def __str__(self):
+        phases = ' '.join(f"{name}={ms}" for name, ms in zip(PHASES, self.phases))
+        return f"{self.method} {self.endpoint} {self.status_code} {phases} ms, {self.bytes_sent}/{self.bytes_received} B"
+
+
+class StaleConnection(OSError):
+    """The server closed a kept-alive connection before answering"""
+
+
+class HttpResponse:
+    """HTTP response with the subset of the urequests Response interface we use
+
+    A streamed response keeps the body on the socket until it is read with
+    iter_content(); the connection is reused only if the body was read to
+    the end before close().
+    """
+
+    def __init__(self, status_code, reason, headers, content, client=None, body=None):
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self._content = content
+        self._client = client
+        self._body = body
+
+    @property
+    def content(self):
+        if self._content is None:
+            self._content = b''.join(self.iter_content())
+        return self._content
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+    def json(self):
+        return ujson.loads(self.content)
+
+    def iter_content(self, chunk_size=256):
+        """Yields the body in chunks of at most chunk_size bytes"""
+        if self._body is None:
+            if self._content:
+                yield self._content
+            return
+        body = self._body
+        self._body = None
+        for chunk in body(chunk_size):
+            yield chunk
+        self._client._finish(self.headers)
+        self._client = None
+
+    def close(self):
+        if self._client is not None:
+            # Unread body left on the socket, the connection cannot be reused
+            self._client._abort()
+            self._client = None
+            self._body = None
+
+
+class HttpClient:
+    """Keeps one connection to the backend open between requests.
+
+    DNS results are cached for dns_ttl seconds and the TLS session is reused
+    on reconnect where the ssl module supports it. A request on a reused
+    connection is retried once on a fresh one only if it cannot have reached
+    the server: sending failed, or the connection hit EOF before any byte of
+    the status line. Any later failure (e.g. a read timeout) is raised, so a
+    POST is never sent twice.
+
+    If observer is set it is called with a RequestTiming after every
+    request, once the body has been read (or the request failed).
+    """
+
+    def __init__(self, base_url, timeout=10, dns_ttl=300, observer=None):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.dns_ttl = dns_ttl
+        self.observer = observer
+
+        scheme, _, rest = self.base_url.partition('://')
+        self.use_tls = scheme == 'https'
+        host = rest.split('/', 1)[0]
+        if ':' in host:
+            host, port = host.split(':', 1)
+            self.port = int(port)
+        else:
+            self.port = 443 if self.use_tls else 80
+        self.host = host
+
+        self._sock = None
+        self._stream = None
+        self._addr = None
+        self._addr_time = 0
+        self._tls_context = None
+        self._tls_session = None
+        # Streamed response whose body is still on the socket
+        self._open_response = None
+        # Timing of the request in progress
+        self._timing = None
+        self._body_start = 0
+
+        # Counters for diagnostics
+        self.connects = 0
+        self.requests = 0
+
+    # ==========================================
+    # Connection management
+    # ==========================================
+
+    def _resolve(self):
+        """Returns the cached server address, resolving it when stale"""
+        now = time.time()
+        if self._addr is None or now - self._addr_time > self.dns_ttl:
+            start = ticks_ms()
+            self._addr = socket.getaddrinfo(self.host, self.port, 0, socket.SOCK_STREAM)[0][-1]
+            self._addr_time = now
+            self._timing.add(PHASE_DNS, start)
+        return self._addr
+
+    def _wrap_tls(self, sock):
+        if not hasattr(ssl, 'SSLContext'):
+            return ssl.wrap_socket(sock, server_hostname=self.host)
+
+        if self._tls_context is None:
+            ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+            # Same as urequests on the device: no certificate verification
+            if hasattr(ctx, 'check_hostname'):
+                ctx.check_hostname = False
+            ctx.verify_mode = ssl.CERT_NONE
+            self._tls_context = ctx
+
+        if self._tls_session is not None:
+            try:
+                tls_sock = self._tls_context.wrap_socket(
+                    sock, server_hostname=self.host, session=self._tls_session)
+            except TypeError:
+                # No session resumption on this port
+                tls_sock = self._tls_context.wrap_socket(sock, server_hostname=self.host)
+        else:
+            tls_sock = self._tls_context.wrap_socket(sock, server_hostname=self.host)
+
+        self._tls_session = getattr(tls_sock, 'session', None)
+        return tls_sock
+
+    def _connect(self):
+        try:
+            addr = self._resolve()
+            start = ticks_ms()
+            sock = socket.socket()
+            sock.settimeout(self.timeout)
+            sock.connect(addr)
+            self._timing.add(PHASE_CONNECT, start)
+        except OSError:
+            # The cached address may be stale
+            self._addr = None
+            raise
+
+        if self.use_tls:
+            start = ticks_ms()
+            sock = self._wrap_tls(sock)
+            self._timing.add(PHASE_TLS, start)
+
+        self._sock = sock
+        self._stream = sock.makefile('rb') if hasattr(sock, 'makefile') else sock
+        self.connects += 1
+
+    def close(self):
+        """Closes the persistent connection"""
+        self._open_response = None
+        if self._stream is not None and self._stream is not self._sock:
+            try:
+                self._stream.close()
+            except OSError:
+                pass
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = None
+        self._stream = None
+
+    # ==========================================
+    # Requests
+    # ==========================================
+
+    def _send(self, data):
+        if hasattr(self._sock, 'sendall'):
+            self._sock.sendall(data)
+        else:
+            self._sock.write(data)
+
+    def _readline(self):
+        line = self._stream.readline()
+        if not line:
+            raise OSError("connection closed")
+        self._timing.bytes_received += len(line)
+        return line
+
+    def _iter_exact(self, length, chunk_size):
+        while length > 0:
+            chunk = self._stream.read(min(length, chunk_size))
+            if not chunk:
+                raise OSError("connection closed")
+            length -= len(chunk)
+            self._timing.bytes_received += len(chunk)
+            yield chunk
+
+    def _iter_chunked(self, chunk_size):
+        while True:
+            size = int(self._readline().split(b';', 1)[0].strip(), 16)
+            if size == 0:
+                # Skip trailers
+                while self._readline() not in (b'\r\n', b'\n'):
+                    pass
+                return
+            for chunk in self._iter_exact(size, chunk_size):
+                yield chunk
+            self._readline()
+
+    def _iter_until_close(self, chunk_size):
+        while True:
+            chunk = self._stream.read(chunk_size)
+            if not chunk:
+                return
+            self._timing.bytes_received += len(chunk)
+            yield chunk
+
+    def _report(self):
+        timing = self._timing
+        if timing is None:
+            return
+        self._timing = None
+        if self.observer is not None:
+            try:
+                self.observer(timing)
+            except Exception as e:
+                print(f"[HTTP] Observer error: {e}")
+
+    def _finish(self, headers):
+        self._open_response = None
+        self._timing.add(PHASE_BODY, self._body_start)
+        self._report()
+        if headers.get('connection', '').lower() == 'close':
+            self.close()
+
+    def _abort(self):
+        if self._timing is not None:
+            self._timing.add(PHASE_BODY, self._body_start)
+        self._report()
+        self.close()
+
+    def _read_response(self, method, request_start, stream=False):
+        line = self._stream.readline()
+        if not line:
+            raise StaleConnection("connection closed before response")
+        self._timing.bytes_received += len(line)
+        status_line = line.decode().split(' ', 2)
+        self._body_start = ticks_ms()
+        self._timing.add(PHASE_REQUEST, request_start)
+        status_code = int(status_line[1])
+        self._timing.status_code = status_code
+        reason = status_line[2].strip() if len(status_line) > 2 else ''
+
+        headers = {}
+        while True:
+            line = self._readline()
+            if line in (b'\r\n', b'\n'):
+                break
+            name, _, value = line.decode().partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if method == 'HEAD' or status_code in (204, 304) or 100 <= status_code < 200:
+            body = None
+        elif headers.get('transfer-encoding', '').lower() == 'chunked':
+            body = self._iter_chunked
+        elif 'content-length' in headers:
+            length = int(headers['content-length'])
+            body = lambda chunk_size: self._iter_exact(length, chunk_size)
+        else:
+            # Body delimited by connection close
+            body = self._iter_until_close
+            headers['connection'] = 'close'
+
+        if body is None:
+            self._finish(headers)
+            return HttpResponse(status_code, reason, headers, b'')
+        if stream:
+            self._open_response = HttpResponse(status_code, reason, headers, None, self, body)
+            return self._open_response
+
+        content = b''.join(body(1024))
+        self._finish(headers)
+        return HttpResponse(status_code, reason, headers, content)
+
+    def _build_request(self, method, path, body, headers):
+        lines = [
+            f"{method} {path} HTTP/1.1",
+            f"Host: {self.host}",
+            "Connection: keep-alive",
+        ]
+        if headers:
+            for name, value in headers.items():
+                if name.lower() not in ('host', 'connection', 'content-length'):
+                    lines.append(f"{name}: {value}")
+        lines.append(f"Content-Length: {len(body)}")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode() + body
+
+    def request(self, method, path, json=None, headers=None, data=None, stream=False):
+        """Sends a request over the persistent connection and returns HttpResponse
+
+        With stream=True only the status line and headers are read; the body
+        must be consumed with iter_content() or the response closed before
+        the next request.
+        """
+        if json is not None:
+            data = ujson.dumps(json)
+            headers = dict(headers) if headers else {}
+            headers.setdefault('Content-Type', 'application/json')
+        if data is None:
+            data = b''
+        elif isinstance(data, str):
+            data = data.encode()
+
+        if self._open_response is not None:
+            # The previous streamed body was never finished
+            self._open_response.close()
+
+        request = self._build_request(method, path, data, headers)
+        self.requests += 1
+        self._timing = timing = RequestTiming(method, path)
+
+        try:
+            for attempt in range(2):
+                reused = self._sock is not None
+                timing.reused = reused
+                if not reused:
+                    self._connect()
+                try:
+                    start = ticks_ms()
+                    self._send(request)
+                except OSError:
+                    self.close()
+                    if not reused or attempt:
+                        raise
+                    # The server dropped the idle connection, reconnect once
+                    continue
+                timing.bytes_sent += len(request)
+                try:
+                    return self._read_response(method, start, stream)
+                except StaleConnection:
+                    self.close()
+                    if not reused or attempt:
+                        raise
+                    # Closed before answering, the request was not processed
+                except OSError:
+                    # The server may have acted on the request, do not resend
+                    self.close()
+                    raise
+        except Exception:
+            # A malformed status line or header leaves the stream out of
+            # sync, so no failure may leave the connection open for reuse
+            self.close()
+            self._timing = timing
+            timing.status_code = 0
+            self._report()
+            raise
+
+    def get(self, path, headers=None, stream=False):
+        return self.request('GET', path, headers=headers, stream=stream)
+
+    def post(self, path, json=None, headers=None, data=None, stream=False):
+        return self.request('POST', path, json=json, headers=headers, data=data, stream=stream)
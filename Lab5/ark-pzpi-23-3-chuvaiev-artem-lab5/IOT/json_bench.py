@@ -0,0 +1,188 @@
+"""
+Host-side JSON response benchmark (CPython only, not copied to the board)
+Parses a synthetic /api/Package/courier body the buffered way and through
+json_stream.py, and reports peak memory (tracemalloc) and time per parse,
+then the bytes each Package record keeps alive with and without projection.
+The *_handler modes measure what get_courier_packages and
+get_delivered_lockers actually keep: the whole run as a list of projected
+records, since the handlers need the count, the joint placement plan needs
+every package and the keep-alive connection is reused for the confirmations
+
+    python json_bench.py
+    python json_bench.py --packages 5000 --chunk 512
+"""
+
+import argparse
+import json
+import random
+import sys
+import tracemalloc
+
+from api_models import Package, iter_lockers, iter_packages, parse_packages
+from bench_util import benchmark
+from config import API_PACKAGE_FIELDS
+
+
+def courier_body(packages=1000, seed=1):
+    """UTF-8 body shaped like the backend's PackageDto list, wrapped in data"""
+    rng = random.Random(seed)
+    items = []
+    for package_id in range(1, packages + 1):
+        items.append({
+            'id': package_id,
+            'height': rng.randint(50, 450),
+            'width': rng.randint(50, 450),
+            'depth': rng.randint(50, 450),
+            'weight': round(rng.uniform(0.1, 20.0), 2),
+            'status': 'InTransit',
+            'postBoxId': None,
+            'userId': rng.randint(1, 200),
+            'recipientName': f"Recipient {rng.randint(1, 200)}",
+            'trackingNumber': f"UA{rng.randint(10 ** 11, 10 ** 12 - 1)}"
+        })
+    return json.dumps({'data': items}).encode()
+
+
+def lockers_body(lockers=1000, seed=1):
+    """UTF-8 body shaped like the open-all-delivered response"""
+    rng = random.Random(seed)
+    items = [{'lockerId': rng.randint(1, 64), 'packageId': package_id}
+             for package_id in range(1, lockers + 1)]
+    return json.dumps({'data': items}).encode()
+
+
+def chunked(body, size):
+    """Socket-like reads: a fresh bytes object per chunk"""
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+
+# ==========================================
+# Parse modes
+# ==========================================
+
+def parse_buffered(body, chunk_size):
+    """Whole body as text, decoded tree printed and parsed, as before streaming"""
+    raw_data = json.loads(body.decode())
+    str(raw_data)
+    return parse_packages(raw_data)
+
+
+def parse_streamed_list(body, chunk_size):
+    """Streamed, kept as a list of full records"""
+    return list(iter_packages(chunked(body, chunk_size)))
+
+
+def parse_streamed_each(body, chunk_size):
+    """Streamed, one package alive at a time"""
+    count = 0
+    for package in iter_packages(chunked(body, chunk_size)):
+        count += 1
+    return count
+
+
+def courier_handler(body, chunk_size):
+    """Streamed and projected, kept as a list as get_courier_packages does"""
+    return list(iter_packages(chunked(body, chunk_size), API_PACKAGE_FIELDS))
+
+
+def lockers_handler(body, chunk_size):
+    """Streamed, kept as a list as get_delivered_lockers does"""
+    return list(iter_lockers(chunked(body, chunk_size)))
+
+
+MODES = {
+    'buffered': parse_buffered,
+    'streamed_list': parse_streamed_list,
+    'streamed_each': parse_streamed_each,
+    'courier_handler': courier_handler
+}
+
+LOCKER_MODES = {
+    'lockers_handler': lockers_handler
+}
+
+
+def peak_memory(func, *args):
+    """Peak bytes allocated by func(*args), the input itself excluded"""
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        result = func(*args)
+        peak = tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+    del result
+    return peak
+
+
+# ==========================================
+# Record size
+# ==========================================
+
+class DictPackage:
+    """Reference record: Package fields in a per-instance dict, as before __slots__"""
+
+    def __init__(self, data, fields=None):
+        Package.__init__(self, data, fields)
+
+
+RECORDS = {
+    'dict_all_fields': (DictPackage, None),
+    'slots_all_fields': (Package, None),
+    'slots_projected': (Package, ())
+}
+
+
+def retained_per_package(body, factory, fields):
+    """Bytes still allocated per record once the decoded tree is freed"""
+    tracemalloc.start()
+    try:
+        tree = json.loads(body.decode())
+        records = [factory(item, fields) for item in tree['data']]
+        del tree
+        retained = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return retained / len(records)
+
+
+def run_modes(modes, body, chunk_size, rounds, results):
+    for name, func in modes.items():
+        result = {'peak_bytes': peak_memory(func, body, chunk_size)}
+        result.update(benchmark(lambda: func(body, chunk_size), rounds, warmup=1))
+        results[name] = result
+        print(f"{name:<16} peak {result['peak_bytes'] / 1024:>8.1f} KB  "
+              f"median {result['median'] / 1000:>8.2f} ms")
+
+
+def run(packages=1000, chunk_size=256, rounds=10):
+    body = courier_body(packages)
+    print(f"Body: {packages} packages, {len(body) / 1024:.0f} KB, {chunk_size} B chunks")
+    results = {}
+    run_modes(MODES, body, chunk_size, rounds, results)
+
+    locker_body = lockers_body(packages)
+    print(f"Body: {packages} lockers, {len(locker_body) / 1024:.0f} KB")
+    run_modes(LOCKER_MODES, locker_body, chunk_size, rounds, results)
+
+    for name, (factory, fields) in RECORDS.items():
+        per_package = retained_per_package(body, factory, fields)
+        results[name] = {'retained_bytes_per_package': per_package}
+        print(f"{name:<16} retained {per_package:>6.0f} B/package")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="JSON response parsing benchmark")
+    parser.add_argument('--packages', type=int, default=1000)
+    parser.add_argument('--chunk', type=int, default=256, help="stream chunk size, bytes")
+    parser.add_argument('--rounds', type=int, default=10)
+    args = parser.parse_args(argv)
+    run(args.packages, args.chunk, args.rounds)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
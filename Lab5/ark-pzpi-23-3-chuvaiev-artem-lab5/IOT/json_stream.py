@@ -0,0 +1,137 @@
+"""
+Incremental JSON array reader
+Yields the elements of a (possibly wrapped) JSON array one at a time
+"""
+
+try:
+    import ujson
+except ImportError:
+    import json as ujson
+
+_QUOTE = 0x22
+_BACKSLASH = 0x5C
+_COMMA = 0x2C
+_OPEN_OBJECT = 0x7B
+_CLOSE_OBJECT = 0x7D
+_OPEN_ARRAY = 0x5B
+_CLOSE_ARRAY = 0x5D
+_WHITESPACE = b" \t\r\n"
+
+# Longest object key we remember while looking for the array
+_MAX_KEY_LENGTH = 32
+
+
+def iter_json_array(chunks, keys=('data', 'value')):
+    """Yields decoded elements of a JSON array read from an iterable of bytes.
+
+    The array is either the top-level value or the first top-level object
+    member whose name is in keys. Only one element is buffered at a time, so
+    memory use does not grow with the length of the array. The rest of the
+    input after the array is read and discarded so a streamed HTTP body is
+    always consumed to the end.
+    """
+    chunks = iter(chunks)
+    keys = tuple(k.encode() if isinstance(k, str) else k for k in keys)
+
+    depth = 0
+    in_string = False
+    escaped = False
+    top_is_object = False
+    # Depth at which array elements live, 0 until the array is found
+    item_depth = 0
+
+    key = bytearray()
+    key_active = False
+    last_key = None
+
+    parts = []
+    capturing = False
+    scalar = False
+
+    for chunk in chunks:
+        start = 0 if capturing else -1
+        i = 0
+        n = len(chunk)
+        while i < n:
+            c = chunk[i]
+
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif c == _BACKSLASH:
+                    escaped = True
+                elif c == _QUOTE:
+                    in_string = False
+                    if key_active:
+                        key_active = False
+                        last_key = bytes(key)
+                elif key_active and len(key) < _MAX_KEY_LENGTH:
+                    key.append(c)
+                i += 1
+                continue
+
+            if c == _QUOTE:
+                in_string = True
+                if item_depth:
+                    if depth == item_depth and not capturing:
+                        capturing = True
+                        scalar = True
+                        start = i
+                elif depth == 1 and top_is_object:
+                    key_active = True
+                    key = bytearray()
+
+            elif c == _OPEN_OBJECT or c == _OPEN_ARRAY:
+                if item_depth and depth == item_depth and not capturing:
+                    capturing = True
+                    scalar = False
+                    start = i
+                depth += 1
+                if not item_depth:
+                    if depth == 1:
+                        if c == _OPEN_ARRAY:
+                            item_depth = 1
+                        else:
+                            top_is_object = True
+                    elif depth == 2 and c == _OPEN_ARRAY and top_is_object and last_key in keys:
+                        item_depth = 2
+
+            elif c == _CLOSE_OBJECT or c == _CLOSE_ARRAY:
+                if capturing and scalar and depth == item_depth:
+                    parts.append(chunk[start:i])
+                    yield _decode(parts)
+                    parts = []
+                    capturing = False
+                depth -= 1
+                if capturing and depth == item_depth:
+                    parts.append(chunk[start:i + 1])
+                    yield _decode(parts)
+                    parts = []
+                    capturing = False
+                elif item_depth and depth < item_depth:
+                    for chunk in chunks:
+                        pass
+                    return
+
+            elif c == _COMMA:
+                if capturing and scalar and depth == item_depth:
+                    parts.append(chunk[start:i])
+                    yield _decode(parts)
+                    parts = []
+                    capturing = False
+
+            elif item_depth and depth == item_depth and not capturing and c not in _WHITESPACE:
+                # Number, true, false or null
+                capturing = True
+                scalar = True
+                start = i
+
+            i += 1
+
+        if capturing:
+            parts.append(chunk[start:])
+
+
+def _decode(parts):
+    data = parts[0] if len(parts) == 1 else b''.join(parts)
+    return ujson.loads(data)
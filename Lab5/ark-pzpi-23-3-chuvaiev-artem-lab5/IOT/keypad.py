@@ -0,0 +1,224 @@
+"""Interrupt-driven 4x4 matrix keypad driver for MicroPython"""
+
+import time
+
+try:
+    from time import ticks_ms, ticks_diff, sleep_us
+except ImportError:
+    # CPython fallback so the driver can be exercised on Linux
+    def ticks_ms():
+        return int(time.monotonic() * 1000)
+
+    def ticks_diff(end, start):
+        return end - start
+
+    def sleep_us(us):
+        time.sleep(us / 1000000)
+
+# Time for a driven row to settle on long keypad wires before the columns are read
+ROW_SETTLE_US = 80
+
+try:
+    from micropython import schedule
+except ImportError:
+    def schedule(func, arg):
+        func(arg)
+
+
+class KeyQueue:
+    """Fixed-size ring buffer of key events. Drops new events when full."""
+
+    def __init__(self, size):
+        self._buf = [None] * size
+        self._size = size
+        self._head = 0
+        self._count = 0
+
+    def put(self, key):
+        """Add an event. Returns False if the queue is full."""
+        if self._count == self._size:
+            return False
+        self._buf[(self._head + self._count) % self._size] = key
+        self._count += 1
+        return True
+
+    def get(self):
+        """Remove and return the oldest event, or None if empty."""
+        if self._count == 0:
+            return None
+        key = self._buf[self._head]
+        self._buf[self._head] = None
+        self._head = (self._head + 1) % self._size
+        self._count -= 1
+        return key
+
+    def clear(self):
+        """Drop all pending events."""
+        while self._count:
+            self.get()
+
+    def __len__(self):
+        return self._count
+
+
+# Key event kinds
+KEY_PRESS = 0
+KEY_LONG_PRESS = 1
+
+
+class Keypad:
+    """Matrix keypad that scans on column pin-change IRQs.
+
+    In the idle state all rows are driven high, so pressing any key raises
+    its (pulled-down) column pin and fires an IRQ. The IRQ handler only
+    schedules a matrix scan; the scan runs outside interrupt context and
+    feeds a per-key press/hold/release state machine, which pushes
+    (kind, key) events into a KeyQueue that the UI consumes. Nothing here
+    waits for a key to be released.
+    """
+
+    def __init__(self, row_pins, col_pins, keys, debounce_ms=30, queue_size=16,
+                 long_press_ms=800):
+        """Initialize the keypad.
+
+        Args:
+            row_pins: Output Pin objects, one per keypad row
+            col_pins: Input Pin objects with pull-down, one per column
+            keys: Key labels as a list of rows
+            debounce_ms: Release-to-press interval treated as contact bounce
+            queue_size: Capacity of the event ring buffer
+            long_press_ms: Hold time after which a long-press event is reported
+        """
+        self.row_pins = row_pins
+        self.col_pins = col_pins
+        self.keys = keys
+        self.debounce_ms = debounce_ms
+        self.long_press_ms = long_press_ms
+        self.events = KeyQueue(queue_size)
+
+        # key -> [pressed_at, long_press_reported] for keys currently down
+        self._down = {}
+        # key -> released_at, used to swallow contact bounce
+        self._released = {}
+        self._scan_pending = False
+        self._scan_cb = self._scan
+        self._arm()
+
+    def _arm(self):
+        """Drive all rows high and enable the column IRQs."""
+        for row_pin in self.row_pins:
+            row_pin.on()
+        for col_pin in self.col_pins:
+            col_pin.irq(trigger=col_pin.IRQ_RISING | col_pin.IRQ_FALLING,
+                        handler=self._on_irq)
+
+    def _disarm(self):
+        """Disable the column IRQs so the scan does not trigger itself."""
+        for col_pin in self.col_pins:
+            col_pin.irq(handler=None)
+
+    def _on_irq(self, pin):
+        """Pin-change IRQ handler. Defers the scan out of interrupt context."""
+        if self._scan_pending:
+            return
+        self._scan_pending = True
+        try:
+            schedule(self._scan_cb, None)
+        except RuntimeError:
+            # Schedule queue full, the next edge will retry
+            self._scan_pending = False
+
+    def _read_keys(self):
+        """Scan the whole matrix and return the list of pressed keys."""
+        pressed = []
+        self._disarm()
+        for row_pin in self.row_pins:
+            row_pin.off()
+        for row_idx, row_pin in enumerate(self.row_pins):
+            row_pin.on()
+            sleep_us(ROW_SETTLE_US)
+            for col_idx, col_pin in enumerate(self.col_pins):
+                if col_pin.value() == 1:
+                    pressed.append(self.keys[row_idx][col_idx])
+            row_pin.off()
+        self._arm()
+        return pressed
+
+    def _scan(self, _arg):
+        """Scan the matrix and advance the per-key state machine."""
+        pressed = self._read_keys()
+        self._scan_pending = False
+        now = ticks_ms()
+
+        for key in pressed:
+            state = self._down.get(key)
+            if state is None:
+                self._down[key] = [now, False]
+                released_at = self._released.pop(key, None)
+                if released_at is not None and ticks_diff(now, released_at) < self.debounce_ms:
+                    # Contact bounce, the press was already reported
+                    continue
+                self.events.put((KEY_PRESS, key))
+            elif not state[1] and ticks_diff(now, state[0]) >= self.long_press_ms:
+                state[1] = True
+                self.events.put((KEY_LONG_PRESS, key))
+
+        for key in list(self._down):
+            if key not in pressed:
+                del self._down[key]
+                self._released[key] = now
+
+    def poll(self):
+        """Rescan while keys are held so long presses are detected.
+
+        A held key produces no further pin edges, so the UI loop calls this
+        through get_event(). It returns immediately when no key is down.
+        """
+        if self._down and not self._scan_pending:
+            self._scan(None)
+
+    def get_event(self):
+        """Return the next (kind, key) event without blocking, or None."""
+        self.poll()
+        return self.events.get()
+
+    def get_key(self):
+        """Return the next pressed key without blocking, or None.
+
+        Long-press events are skipped; use get_event() to receive them.
+        """
+        while True:
+            event = self.get_event()
+            if event is None:
+                return None
+            if event[0] == KEY_PRESS:
+                return event[1]
+
+    def wait_event(self, timeout_ms=None):
+        """Wait for the next (kind, key) event.
+
+        Returns as soon as an event is queued, or None after timeout_ms.
+        """
+        start = ticks_ms()
+        while True:
+            event = self.get_event()
+            if event is not None:
+                return event
+            if timeout_ms is not None and ticks_diff(ticks_ms(), start) >= timeout_ms:
+                return None
+            time.sleep(0.005)
+
+    def wait_key(self, timeout_ms=None):
+        """Wait for the next pressed key, or None after timeout_ms."""
+        start = ticks_ms()
+        while True:
+            key = self.get_key()
+            if key is not None:
+                return key
+            if timeout_ms is not None and ticks_diff(ticks_ms(), start) >= timeout_ms:
+                return None
+            time.sleep(0.005)
+
+    def flush(self):
+        """Discard any queued key events."""
+        self.events.clear()
@@ -111,7 +111,11 @@ class LcdApi:
         self.hal_write_command(self.LCD_DDRAM | addr)
     
     def putchar(self, char):
-        """Write a single character to the LCD."""
+        """Write a single character to the LCD.
+        
+        The HD44780 auto-increments the DDRAM address after each data write,
+        so the address is only set again when the cursor wraps to a new line.
+        """
         if char == '\n':
             if self.implied_newline:
                 # Implicit \n, just ignore it
@@ -126,14 +130,44 @@ class LcdApi:
             self.cursor_x = 0
             self.cursor_y += 1
             self.implied_newline = (char != '\n')
-        if self.cursor_y >= self.num_lines:
-            self.cursor_y = 0
-        self.move_to(self.cursor_x, self.cursor_y)
+            if self.cursor_y >= self.num_lines:
+                self.cursor_y = 0
+            self.move_to(self.cursor_x, self.cursor_y)
     
     def putstr(self, string):
-        """Write a string to the LCD."""
+        """Write a string to the LCD.
+        
+        Characters up to the end of the current line are sent as one run
+        through hal_write_data_bytes, so the HAL can batch them. The cursor
+        is tracked in software and a DDRAM address command is only issued
+        on line wrap.
+        """
+        run = bytearray()
         for char in string:
-            self.putchar(char)
+            if char == '\n':
+                self._write_run(run)
+                run = bytearray()
+                self.putchar(char)
+                continue
+            run.append(ord(char))
+            if self.cursor_x + len(run) >= self.num_columns:
+                self._write_run(run)
+                run = bytearray()
+        self._write_run(run)
+    
+    def _write_run(self, run):
+        """Write a pending run of characters and advance the cursor."""
+        if not run:
+            return
+        self.hal_write_data_bytes(run)
+        self.cursor_x += len(run)
+        if self.cursor_x >= self.num_columns:
+            self.cursor_x = 0
+            self.cursor_y += 1
+            self.implied_newline = True
+            if self.cursor_y >= self.num_lines:
+                self.cursor_y = 0
+            self.move_to(self.cursor_x, self.cursor_y)
     
     def custom_char(self, location, charmap):
         """Create a custom character.
@@ -166,6 +200,11 @@ class LcdApi:
         """Write data to the LCD (HAL specific)."""
         raise NotImplementedError
     
+    def hal_write_data_bytes(self, data):
+        """Write a run of data bytes to the LCD (HAL specific)."""
+        for value in data:
+            self.hal_write_data(value)
+    
     def hal_sleep_us(self, usecs):
         """Sleep for the specified number of microseconds (HAL specific)."""
         time.sleep_us(usecs)
@@ -0,0 +1,213 @@
+"""
+Host-side LCD write benchmark (CPython only, not copied to the board)
+Drives i2c_lcd.py against a counting fake I2C bus and reports bus transactions,
+bytes and sleep time per screen update, next to reference drivers that write
+one nibble per transaction and/or re-send the DDRAM address after every write
+
+    python lcd_bench.py
+    python lcd_bench.py --rounds 50
+"""
+
+import argparse
+import sys
+
+import i2c_lcd
+import lcd_api
+from bench_util import benchmark
+from i2c_lcd import I2cLcd, MASK_BACKLIGHT, MASK_E, MASK_RS, SHIFT_DATA
+from lcd_framebuffer import LcdFrameBuffer
+
+LCD_ADDR = 0x27
+NUM_LINES = 2
+NUM_COLUMNS = 16
+
+
+# ==========================================
+# Fake hardware
+# ==========================================
+
+class VirtualClock:
+    """Stands in for the time module of the drivers and adds up requested sleeps"""
+
+    def __init__(self):
+        self.slept_us = 0
+
+    def sleep_ms(self, ms):
+        self.slept_us += ms * 1000
+
+    def sleep_us(self, us):
+        self.slept_us += us
+
+
+class CountingI2C:
+    """I2C bus that only counts writeto transactions and bytes"""
+
+    def __init__(self):
+        self.transactions = 0
+        self.bytes = 0
+
+    def writeto(self, addr, buf):
+        self.transactions += 1
+        self.bytes += len(buf)
+
+
+class UnbatchedI2cLcd(I2cLcd):
+    """Reference driver: one writeto per nibble frame with 1 ms sleeps in between"""
+
+    def _write_frames(self, value, rs):
+        for nibble in ((value >> 4) & 0x0f, value & 0x0f):
+            byte = rs | nibble << SHIFT_DATA
+            self.i2c.writeto(self.i2c_addr, bytearray([byte | MASK_E | MASK_BACKLIGHT]))
+            i2c_lcd.time.sleep_ms(1)
+            self.i2c.writeto(self.i2c_addr, bytearray([byte | MASK_BACKLIGHT]))
+            i2c_lcd.time.sleep_ms(1)
+
+    def hal_write_command(self, cmd):
+        self._write_frames(cmd, 0)
+        if cmd <= 3:
+            i2c_lcd.time.sleep_ms(5)
+
+    def hal_write_data(self, data):
+        self._write_frames(data, MASK_RS)
+
+    def hal_write_data_bytes(self, data):
+        for value in data:
+            self.hal_write_data(value)
+
+
+class SeekingMixin:
+    """Reference cursor handling: move_to after every character and every run"""
+
+    def putchar(self, char):
+        if char == '\n':
+            if not self.implied_newline:
+                self.cursor_x = self.num_columns
+        else:
+            self.hal_write_data(ord(char))
+            self.cursor_x += 1
+        if self.cursor_x >= self.num_columns:
+            self.cursor_x = 0
+            self.cursor_y += 1
+            self.implied_newline = (char != '\n')
+        if self.cursor_y >= self.num_lines:
+            self.cursor_y = 0
+        self.move_to(self.cursor_x, self.cursor_y)
+
+    def _write_run(self, run):
+        if not run:
+            return
+        self.hal_write_data_bytes(run)
+        self.cursor_x += len(run)
+        if self.cursor_x >= self.num_columns:
+            self.cursor_x = 0
+            self.cursor_y += 1
+            self.implied_newline = True
+        if self.cursor_y >= self.num_lines:
+            self.cursor_y = 0
+        self.move_to(self.cursor_x, self.cursor_y)
+
+
+class SeekingUnbatchedI2cLcd(SeekingMixin, UnbatchedI2cLcd):
+    """Reference driver as it was before both LCD changes"""
+
+    def putstr(self, string):
+        for char in string:
+            self.putchar(char)
+
+
+class SeekingI2cLcd(SeekingMixin, I2cLcd):
+    pass
+
+
+DRIVERS = {
+    'unbatched+seek': SeekingUnbatchedI2cLcd,
+    'unbatched': UnbatchedI2cLcd,
+    'batched+seek': SeekingI2cLcd,
+    'batched': I2cLcd
+}
+
+
+# ==========================================
+# Scenarios
+# ==========================================
+
+def print_two_lines(lcd):
+    """clear + two full lines, as lcd_print did before the framebuffer"""
+    lcd.clear()
+    lcd.move_to(0, 0)
+    lcd.putstr("Serial Number:")
+    lcd.move_to(0, 1)
+    lcd.putstr("> 1234567890ABCD")
+
+
+def putchar_line(lcd):
+    """One line written character by character"""
+    lcd.move_to(0, 0)
+    for char in "Serial Number:":
+        lcd.putchar(char)
+
+
+def keypad_digit(lcd):
+    """One digit typed on the input screen, drawn through the framebuffer"""
+    screen = LcdFrameBuffer(lcd)
+    screen.show("Serial Number:", "> 12")
+    # Only the update is counted, not drawing the screen
+    lcd.i2c.transactions = lcd.i2c.bytes = 0
+    i2c_lcd.time.slept_us = 0
+    screen.show("Serial Number:", "> 123")
+
+
+SCENARIOS = {
+    'print2': print_two_lines,
+    'putchar': putchar_line,
+    'keypad': keypad_digit
+}
+
+
+def make_lcd(driver):
+    """Returns (lcd, bus, clock) with the counters reset after initialization"""
+    clock = VirtualClock()
+    i2c_lcd.time = clock
+    lcd_api.time = clock
+    bus = CountingI2C()
+    lcd = DRIVERS[driver](bus, LCD_ADDR, NUM_LINES, NUM_COLUMNS)
+    bus.transactions = bus.bytes = 0
+    clock.slept_us = 0
+    return lcd, bus, clock
+
+
+def measure(driver, scenario):
+    """Bus cost of one run of the scenario"""
+    lcd, bus, clock = make_lcd(driver)
+    SCENARIOS[scenario](lcd)
+    return {
+        'transactions': bus.transactions,
+        'bytes': bus.bytes,
+        'sleep_ms': clock.slept_us / 1000.0
+    }
+
+
+def run(rounds=20):
+    results = {}
+    for scenario in SCENARIOS:
+        for driver in DRIVERS:
+            name = f"{scenario}[{driver}]"
+            result = measure(driver, scenario)
+            lcd = make_lcd(driver)[0]
+            result.update(benchmark(lambda: SCENARIOS[scenario](lcd), rounds))
+            results[name] = result
+            print(f"{name:<24} {result['transactions']:>5} writeto  {result['bytes']:>6} B  "
+                  f"sleep {result['sleep_ms']:>7.1f} ms  host median {result['median']:>8.1f} us")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="I2C LCD write benchmark")
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args(argv)
+    run(args.rounds)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
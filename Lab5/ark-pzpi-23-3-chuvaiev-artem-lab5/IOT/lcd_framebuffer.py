@@ -0,0 +1,75 @@
+"""Shadow framebuffer for LcdApi displays"""
+
+# Unchanged cells between two changed runs that are cheaper to rewrite
+# than to skip with an extra DDRAM address command
+MERGE_GAP = 1
+
+
+class LcdFrameBuffer:
+    """Keeps a copy of the LCD contents and only rewrites changed cells."""
+
+    def __init__(self, lcd):
+        """Initialize the framebuffer.
+
+        Args:
+            lcd: LcdApi instance to draw on
+        """
+        self.lcd = lcd
+        self.num_lines = lcd.num_lines
+        self.num_columns = lcd.num_columns
+        self.clear()
+
+    def clear(self):
+        """Clear the LCD and the shadow contents."""
+        self.lcd.clear()
+        self.lines = [' ' * self.num_columns for _ in range(self.num_lines)]
+
+    def invalidate(self):
+        """Forget the shadow contents so the next show() redraws every cell."""
+        self.lines = [None] * self.num_lines
+
+    def show(self, *lines):
+        """Display the given lines, padding or clearing the remaining rows."""
+        for row in range(self.num_lines):
+            text = lines[row] if row < len(lines) and lines[row] else ""
+            self.write_line(row, text)
+
+    def write_line(self, row, text):
+        """Write a single line, emitting move_to + data only for changed runs."""
+        new = text[:self.num_columns]
+        new = new + ' ' * (self.num_columns - len(new))
+        old = self.lines[row]
+
+        if old is None:
+            self.lcd.move_to(0, row)
+            self.lcd.putstr(new)
+        else:
+            for start, end in self._changed_runs(old, new):
+                self.lcd.move_to(start, row)
+                self.lcd.putstr(new[start:end])
+
+        self.lines[row] = new
+
+    def _changed_runs(self, old, new):
+        """Return (start, end) ranges of cells that differ between old and new."""
+        runs = []
+        col = 0
+        while col < self.num_columns:
+            if old[col] == new[col]:
+                col += 1
+                continue
+            start = col
+            end = col + 1
+            while end < self.num_columns:
+                if old[end] != new[end]:
+                    end += 1
+                    continue
+                gap_end = end
+                while gap_end < self.num_columns and old[gap_end] == new[gap_end]:
+                    gap_end += 1
+                if gap_end == self.num_columns or gap_end - end > MERGE_GAP:
+                    break
+                end = gap_end
+            runs.append((start, end))
+            col = end
+        return runs
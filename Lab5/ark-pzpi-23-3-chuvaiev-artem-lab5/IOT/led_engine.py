@@ -0,0 +1,182 @@
+"""Background LED pattern engine for MicroPython"""
+
+import time
+
+try:
+    from time import ticks_ms, ticks_diff, ticks_add
+except ImportError:
+    # CPython fallback so the engine can be exercised on Linux
+    def ticks_ms():
+        return int(time.monotonic() * 1000)
+
+    def ticks_diff(end, start):
+        return end - start
+
+    def ticks_add(ticks, delta):
+        return ticks + delta
+
+try:
+    from micropython import schedule
+except ImportError:
+    def schedule(func, arg):
+        func(arg)
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+# Pattern priorities
+PRIORITY_LOW = 0
+PRIORITY_NORMAL = 1
+PRIORITY_HIGH = 2
+
+
+class LedPattern:
+    """Blink pattern: count on/off cycles, optionally repeated forever."""
+
+    def __init__(self, count, on_ms, off_ms=None, priority=PRIORITY_NORMAL, repeat=False):
+        self.count = count
+        self.on_ms = on_ms
+        self.off_ms = on_ms if off_ms is None else off_ms
+        self.priority = priority
+        self.repeat = repeat
+
+    def duration_ms(self):
+        """Duration of one pass of the pattern"""
+        return self.count * (self.on_ms + self.off_ms)
+
+
+class _LedChannel:
+    """Playback state of one LED."""
+
+    def __init__(self, led):
+        self.led = led
+        self.pattern = None
+        self.step = 0
+        self.deadline = 0
+
+    def start(self, pattern, now):
+        self.pattern = pattern
+        self.step = 0
+        self.deadline = now
+        self.led.off()
+
+    def stop(self):
+        self.pattern = None
+        self.led.off()
+
+    def tick(self, now):
+        """Advance the pattern if its current phase has elapsed."""
+        pattern = self.pattern
+        while pattern is not None and ticks_diff(now, self.deadline) >= 0:
+            if self.step >= 2 * pattern.count:
+                if not pattern.repeat:
+                    self.stop()
+                    return
+                self.step = 0
+            if self.step % 2 == 0:
+                self.led.on()
+                self.deadline = ticks_add(self.deadline, pattern.on_ms)
+            else:
+                self.led.off()
+                self.deadline = ticks_add(self.deadline, pattern.off_ms)
+            self.step += 1
+
+
+class LedEngine:
+    """Plays LED patterns in the background.
+
+    The engine is advanced by tick(), driven either by a machine.Timer
+    (start_timer) or by an asyncio task (run). play() returns immediately;
+    a newer pattern preempts the one playing on the same LED unless the
+    current one has a higher priority.
+    """
+
+    def __init__(self, tick_ms=10):
+        self.tick_ms = tick_ms
+        self._channels = {}
+        self._timer = None
+        self._tick_pending = False
+        self._tick_cb = self._scheduled_tick
+
+    def _channel(self, led):
+        channel = self._channels.get(id(led))
+        if channel is None:
+            channel = _LedChannel(led)
+            self._channels[id(led)] = channel
+        return channel
+
+    def play(self, led, pattern):
+        """Start a pattern on the LED. Returns False if it was rejected."""
+        channel = self._channel(led)
+        current = channel.pattern
+        if current is not None and current.priority > pattern.priority:
+            return False
+        channel.start(pattern, ticks_ms())
+        channel.tick(channel.deadline)
+        return True
+
+    def blink(self, led, times, delay, priority=PRIORITY_NORMAL):
+        """Shortcut for blink_led-style patterns (delay in seconds)."""
+        delay_ms = int(delay * 1000)
+        return self.play(led, LedPattern(times, delay_ms, delay_ms, priority))
+
+    def stop(self, led=None):
+        """Stop the pattern on one LED, or on all LEDs."""
+        if led is not None:
+            self._channel(led).stop()
+            return
+        for channel in self._channels.values():
+            channel.stop()
+
+    def is_busy(self, led=None):
+        """True while a pattern is playing (on the given LED or any LED)."""
+        if led is not None:
+            return self._channel(led).pattern is not None
+        for channel in self._channels.values():
+            if channel.pattern is not None:
+                return True
+        return False
+
+    def tick(self, now=None):
+        """Advance all patterns. Cheap when nothing is playing."""
+        if now is None:
+            now = ticks_ms()
+        for channel in self._channels.values():
+            channel.tick(now)
+
+    def _scheduled_tick(self, _arg):
+        self._tick_pending = False
+        self.tick()
+
+    def _on_timer(self, _timer):
+        if self._tick_pending:
+            return
+        self._tick_pending = True
+        try:
+            schedule(self._tick_cb, None)
+        except RuntimeError:
+            self._tick_pending = False
+
+    def start_timer(self, timer_id=0):
+        """Drive the engine from a periodic hardware timer."""
+        from machine import Timer
+        self._timer = Timer(timer_id)
+        self._timer.init(period=self.tick_ms, mode=Timer.PERIODIC, callback=self._on_timer)
+
+    def stop_timer(self):
+        """Stop the hardware timer and switch all LEDs off."""
+        if self._timer is not None:
+            self._timer.deinit()
+            self._timer = None
+        self.stop()
+
+    async def run(self):
+        """Drive the engine from an asyncio task."""
+        try:
+            while True:
+                self.tick()
+                await asyncio.sleep(self.tick_ms / 1000)
+        finally:
+            self.stop()
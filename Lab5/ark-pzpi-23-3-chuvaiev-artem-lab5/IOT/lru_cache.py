@@ -0,0 +1,74 @@
+"""Bounded TTL + LRU cache"""
+
+import time
+
+
+class TtlLruCache:
+    """Small cache with per-entry expiry and least-recently-used eviction.
+
+    Capacity is expected to be small (tens of entries), so eviction scans
+    the entries instead of keeping a linked list.
+    """
+
+    def __init__(self, capacity, ttl, clock=time.time):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.clock = clock
+        # key -> [value, expires_at, last_used]
+        self._entries = {}
+        self._tick = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Returns (found, value). Expired entries count as misses."""
+        entry = self._entries.get(key)
+        if entry is not None and self.clock() >= entry[1]:
+            del self._entries[key]
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            return False, None
+
+        self._tick += 1
+        entry[2] = self._tick
+        self.hits += 1
+        return True, entry[0]
+
+    def put(self, key, value, ttl=None):
+        """Stores a value for ttl seconds (default: the cache TTL)"""
+        if ttl is None:
+            ttl = self.ttl
+        if ttl <= 0:
+            return
+        if key not in self._entries and len(self._entries) >= self.capacity:
+            self._evict()
+        self._tick += 1
+        self._entries[key] = [value, self.clock() + ttl, self._tick]
+
+    def _evict(self):
+        now = self.clock()
+        oldest_key = None
+        oldest_tick = None
+        for key, entry in self._entries.items():
+            if now >= entry[1]:
+                oldest_key = key
+                break
+            if oldest_tick is None or entry[2] < oldest_tick:
+                oldest_key = key
+                oldest_tick = entry[2]
+        if oldest_key is not None:
+            del self._entries[oldest_key]
+
+    def invalidate(self, key):
+        """Drops a single entry"""
+        self._entries.pop(key, None)
+
+    def clear(self):
+        """Drops all entries"""
+        self._entries = {}
+
+    def __len__(self):
+        return len(self._entries)
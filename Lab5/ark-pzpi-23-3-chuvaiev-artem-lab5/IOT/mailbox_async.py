@@ -0,0 +1,739 @@
+"""
+Cooperative asyncio runtime for the NFC Mailbox state machine
+Runs under uasyncio on the device and under CPython asyncio with fake hardware
+"""
+
+import time
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+from localization import get_text, set_language, get_language
+from keypad import KEY_PRESS, KEY_LONG_PRESS
+from states import *
+from config import (
+    OPERATION_TIMEOUT,
+    MAX_SERIAL_LENGTH,
+    NUMERIC_ONLY_INPUT,
+    MENU_DISPLAY_DURATION,
+    FEEDBACK_DISPLAY_DURATION,
+    API_BATCH_PLACE,
+    OUTBOX_ENABLED,
+)
+from outbox import OP_PLACE, OP_RECEIVE
+
+# Interval of the keypad polling task
+KEYPAD_POLL_INTERVAL = 0.005
+# Max key events kept for handlers that are not currently reading keys
+KEY_EVENT_BACKLOG = 16
+# How often the outbox task checks for due work
+OUTBOX_POLL_INTERVAL = 1
+# How often the serial console is checked for commands
+CONSOLE_POLL_INTERVAL = 0.2
+# How often the statistics task checks whether a snapshot is due
+STATS_SAVE_POLL_INTERVAL = 30
+
+
+class Device:
+    """Набір апаратних та мережевих залежностей для асинхронної машини станів"""
+
+    def __init__(self, lcd_print, keypad, led_success, led_error, led_engine, relay, stats,
+                 validate_nfc, get_courier_packages, place_package, place_packages_bulk,
+                 get_delivered_lockers, mark_package_received,
+                 calculate_optimal_locker, update_locker_state, clear_locker_state,
+                 outbox=None, poll_console=None, save_statistics=None, metrics_server=None,
+                 plan_placements=None, find_shared_locker=None, handle_outbox_rejections=None):
+        self.lcd_print = lcd_print
+        self.keypad = keypad
+        self.led_success = led_success
+        self.led_error = led_error
+        self.led_engine = led_engine
+        self.relay = relay
+        self.stats = stats
+
+        self.validate_nfc = validate_nfc
+        self.get_courier_packages = get_courier_packages
+        self.place_package = place_package
+        self.place_packages_bulk = place_packages_bulk
+        self.get_delivered_lockers = get_delivered_lockers
+        self.mark_package_received = mark_package_received
+
+        self.calculate_optimal_locker = calculate_optimal_locker
+        self.update_locker_state = update_locker_state
+        self.clear_locker_state = clear_locker_state
+        self.plan_placements = plan_placements
+        self.find_shared_locker = find_shared_locker
+
+        self.outbox = outbox
+        self.handle_outbox_rejections = handle_outbox_rejections
+        self.poll_console = poll_console
+        self.save_statistics = save_statistics
+        self.metrics_server = metrics_server
+
+
+class AsyncMailboxStateMachine:
+    """Асинхронна машина станів: обробники є корутинами.
+
+    LED-патерни (LedEngine), опитування клавіатури та API-виклики виконуються
+    як окремі задачі, а будь-яка інформаційна пауза переривається натисканням клавіші.
+    """
+
+    def __init__(self, device):
+        self.device = device
+        self.state = STATE_IDLE
+        self.serial_number = None
+        self.user_data = None
+        self.error_message = None
+        self.running = False
+        # (стан, задача) попереднього завантаження даних для наступного режиму
+        self.prefetched = None
+
+        self._events = []
+        self._event_flag = asyncio.Event()
+        self._tasks = []
+        # Усі API-виклики йдуть через одне keep-alive з'єднання - по черзі
+        self._api_lock = asyncio.Lock()
+
+    def transition_to(self, new_state, data=None):
+        """Перехід в новий стан"""
+        print(f"\n[STATE TRANSITION] {self.state} -> {new_state}")
+        self.state = new_state
+        if data:
+            print(f"[STATE DATA] {data}")
+
+    def stop(self):
+        """Зупиняє головний цикл після поточного обробника"""
+        self.running = False
+
+    # ==========================================
+    # Concurrent tasks
+    # ==========================================
+
+    async def _poll_keypad(self):
+        """Задача опитування клавіатури: переносить події у чергу машини станів"""
+        keypad = self.device.keypad
+        while True:
+            event = keypad.get_event()
+            if event is None:
+                await asyncio.sleep(KEYPAD_POLL_INTERVAL)
+                continue
+            if len(self._events) >= KEY_EVENT_BACKLOG:
+                self._events.pop(0)
+            self._events.append(event)
+            self._event_flag.set()
+
+    async def _drain_outbox(self):
+        """Задача фонової доставки підтверджень з outbox"""
+        outbox = self.device.outbox
+        while True:
+            if outbox.is_due():
+                await self.call_api(outbox.drain)
+                # Відкат стану - у потоці циклу подій, не в потоці executor
+                if self.device.handle_outbox_rejections is not None:
+                    self.device.handle_outbox_rejections()
+            await asyncio.sleep(OUTBOX_POLL_INTERVAL)
+
+    async def _poll_console(self):
+        """Задача читання команд з послідовної консолі"""
+        while True:
+            self.device.poll_console()
+            await asyncio.sleep(CONSOLE_POLL_INTERVAL)
+
+    async def _save_statistics(self):
+        """Задача періодичного збереження статистики на флеш"""
+        while True:
+            await asyncio.sleep(STATS_SAVE_POLL_INTERVAL)
+            self.device.save_statistics()
+
+    def blink(self, led, times, delay):
+        """Запускає блимання світлодіода у фоні (новий патерн заміщує старий)"""
+        self.device.led_engine.blink(led, times, delay)
+
+    async def call_api(self, func, *args):
+        """Виконує API-виклик; виклики серіалізуються, бо ділять один HttpClient
+
+        CPython: виклик іде в потоці executor, інші задачі працюють.
+        uasyncio: виклик блокує весь цикл подій на час запиту (справжньої
+        паралельності немає), лише перед ним екран і LED встигають оновитися.
+        """
+        async with self._api_lock:
+            loop = asyncio.get_event_loop()
+            if hasattr(loop, 'run_in_executor'):
+                future = loop.run_in_executor(None, lambda: func(*args))
+                try:
+                    return await asyncio.shield(future)
+                except asyncio.CancelledError:
+                    # Потік ще користується сокетом - тримаємо блокування до його завершення
+                    await asyncio.wait([future])
+                    raise
+            await asyncio.sleep(0)
+            return func(*args)
+
+    # ==========================================
+    # Keypad helpers
+    # ==========================================
+
+    def flush_keys(self):
+        """Відкидає накопичені події клавіатури"""
+        self.device.keypad.flush()
+        self._events.clear()
+        self._event_flag.clear()
+
+    async def next_event(self, timeout=None):
+        """Очікує наступну подію клавіатури (kind, key) або None після timeout"""
+        if not self._events:
+            self._event_flag.clear()
+            try:
+                if timeout is None:
+                    await self._event_flag.wait()
+                else:
+                    await asyncio.wait_for(self._event_flag.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        return self._events.pop(0)
+
+    async def next_key(self, timeout=None):
+        """Очікує наступне натискання клавіші або None після timeout"""
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+            event = await self.next_event(remaining)
+            if event is None:
+                return None
+            if event[0] == KEY_PRESS:
+                return event[1]
+
+    async def pause(self, seconds):
+        """Інформаційна пауза, яку можна перервати натисканням клавіші"""
+        return await self.next_key(seconds)
+
+    async def lcd_input(self, prompt, max_length=None, numeric_only=None):
+        if max_length is None:
+            max_length = MAX_SERIAL_LENGTH
+        if numeric_only is None:
+            numeric_only = NUMERIC_ONLY_INPUT
+        lcd_print = self.device.lcd_print
+        input_buffer = ""
+        lcd_print(prompt[:16], f"> {input_buffer}")
+
+        while True:
+            kind, key = await self.next_event()
+
+            if kind == KEY_LONG_PRESS:
+                # Утримання * очищує весь буфер
+                if key == '*' and input_buffer:
+                    input_buffer = ""
+                    lcd_print(prompt[:16], f"> {input_buffer}")
+                continue
+
+            if key == '#':
+                if len(input_buffer) > 0:
+                    return input_buffer
+                lcd_print(get_text("empty_input"), get_text("try_again"))
+                await self.pause(1)
+                lcd_print(prompt[:16], f"> {input_buffer}")
+
+            elif key == '*':
+                if len(input_buffer) > 0:
+                    input_buffer = input_buffer[:-1]
+                    lcd_print(prompt[:16], f"> {input_buffer}")
+
+            elif key == 'D':
+                return None
+
+            elif key in ['A', 'B', 'C']:
+                pass
+
+            else:
+                if numeric_only and key not in '0123456789':
+                    continue
+
+                if len(input_buffer) < max_length:
+                    input_buffer += key
+                    display_text = input_buffer
+                    if len(display_text) > 14:
+                        display_text = ".." + display_text[-12:]
+                    lcd_print(prompt[:16], f"> {display_text}")
+
+    async def lcd_menu(self, title, options):
+        lcd_print = self.device.lcd_print
+        while True:
+            lcd_print(title[:16], get_text("select_option"))
+            key = await self.pause(1)
+
+            for i in range(0, len(options), 2):
+                if key is None:
+                    line1 = f"{i+1}.{options[i][:14]}" if i < len(options) else ""
+                    line2 = f"{i+2}.{options[i+1][:14]}" if i+1 < len(options) else ""
+                    lcd_print(line1, line2)
+                    key = await self.next_key(MENU_DISPLAY_DURATION)
+
+                if key is not None:
+                    if key == 'D':
+                        return None
+                    if key.isdigit():
+                        choice = int(key) - 1
+                        if 0 <= choice < len(options):
+                            return choice
+                    key = None
+
+    async def wait_confirmation(self, timeout_text):
+        """Очікує # (підтвердження) або D (пропуск) з тайм-аутом"""
+        lcd_print = self.device.lcd_print
+        self.flush_keys()
+        deadline = time.time() + OPERATION_TIMEOUT
+
+        while True:
+            key = await self.next_key(max(0, deadline - time.time()))
+            if key is None:
+                lcd_print("Timeout!", get_text(timeout_text))
+                await self.pause(2)
+                return None
+            if key == '#':
+                return key
+            if key == 'D':
+                lcd_print(get_text("skipped"), "")
+                await self.pause(1)
+                return key
+
+    # ==========================================
+    # Main loop
+    # ==========================================
+
+    async def run(self):
+        """Головний цикл машини станів"""
+        handlers = {
+            STATE_IDLE: self.handle_idle,
+            STATE_MAIN_MENU: self.handle_main_menu,
+            STATE_INPUT_SERIAL: self.handle_input_serial,
+            STATE_COURIER_MODE: self.handle_courier_mode,
+            STATE_CLIENT_MODE: self.handle_client_mode,
+            STATE_PROCESSING: self.handle_processing,
+            STATE_ERROR: self.handle_error,
+        }
+        self.running = True
+        self._tasks = [
+            asyncio.create_task(self._poll_keypad()),
+            asyncio.create_task(self.device.led_engine.run()),
+        ]
+        if OUTBOX_ENABLED and self.device.outbox is not None:
+            self._tasks.append(asyncio.create_task(self._drain_outbox()))
+        if self.device.poll_console is not None:
+            self._tasks.append(asyncio.create_task(self._poll_console()))
+        if self.device.save_statistics is not None:
+            self._tasks.append(asyncio.create_task(self._save_statistics()))
+        if self.device.metrics_server is not None:
+            self._tasks.append(asyncio.create_task(self.device.metrics_server.serve()))
+
+        try:
+            while self.running:
+                try:
+                    handler = handlers.get(self.state)
+                    if handler is None:
+                        print(f"Unknown state: {self.state}")
+                        self.transition_to(STATE_IDLE)
+                    else:
+                        await handler()
+                    await asyncio.sleep(0)
+
+                except KeyboardInterrupt:
+                    print("\nShutting down...")
+                    self.device.lcd_print("System", get_text("shutting_down"))
+                    break
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f"Error in state machine: {e}")
+                    self.error_message = str(e)
+                    self.transition_to(STATE_ERROR)
+        finally:
+            for task in self._tasks:
+                task.cancel()
+            self._tasks = []
+
+    # ==========================================
+    # State handlers
+    # ==========================================
+
+    async def handle_idle(self):
+        """IDLE стан - очікування дії"""
+        self.device.lcd_print("NFC Mailbox", get_text("press_any_key"))
+        print("System ready. Waiting for input...")
+
+        self.flush_keys()
+        await self.next_key()
+
+        self.blink(self.device.led_success, 1, 0.1)
+        self.transition_to(STATE_MAIN_MENU)
+
+    async def handle_main_menu(self):
+        """MAIN MENU стан - головне меню"""
+        options = [
+            get_text("courier_mode"),
+            get_text("client_mode"),
+            "EN/UK",
+            "Statistics"
+        ]
+
+        choice = await self.lcd_menu(get_text("main_menu"), options)
+
+        if choice is None:
+            self.transition_to(STATE_IDLE)
+        elif choice == 0:
+            self.transition_to(STATE_INPUT_SERIAL, {"mode": "courier"})
+        elif choice == 1:
+            self.transition_to(STATE_INPUT_SERIAL, {"mode": "client"})
+        elif choice == 2:
+            current = get_language()
+            new_lang = "uk" if current == "en" else "en"
+            set_language(new_lang)
+            self.device.lcd_print("Language:", "EN" if new_lang == "en" else "Ukrainian")
+            await self.pause(2)
+        elif choice == 3:
+            await self.show_statistics()
+
+    async def handle_input_serial(self):
+        """INPUT SERIAL стан - введення серійного номера"""
+        device = self.device
+
+        device.lcd_print(get_text("enter_serial"), get_text("ok_back"))
+        await self.pause(1)
+
+        serial = await self.lcd_input(get_text("serial_number"), max_length=16)
+
+        if serial is None:
+            device.lcd_print(get_text("cancelled"), "")
+            await self.pause(1)
+            self.transition_to(STATE_MAIN_MENU)
+            return
+
+        self.serial_number = serial
+
+        device.lcd_print(get_text("validating"), get_text("please_wait"))
+        validation_result = await self.call_api(device.validate_nfc, serial)
+
+        if validation_result:
+            self.user_data = validation_result
+            device.stats.record_nfc_validation(True)
+
+            device.lcd_print(get_text("valid"), f"{get_text('user')} {validation_result.name[:8]}")
+            self.blink(device.led_success, 2, 0.2)
+
+            # Запит іде паралельно з показом "Valid!"
+            self.prefetch_for_role(validation_result)
+            await self.pause(FEEDBACK_DISPLAY_DURATION)
+
+            if validation_result.has_role('Courier'):
+                self.transition_to(STATE_COURIER_MODE)
+            elif validation_result.has_role('Client'):
+                self.transition_to(STATE_CLIENT_MODE)
+            else:
+                self.error_message = f"Unknown role: {validation_result.roles}"
+                self.transition_to(STATE_ERROR)
+        else:
+            device.stats.record_nfc_validation(False)
+            self.error_message = get_text("invalid")
+            self.transition_to(STATE_ERROR)
+
+    def prefetch_for_role(self, validation_result):
+        """Запускає завантаження списку посилок/комірок одразу після визначення ролі"""
+        self.cancel_prefetch()
+        device = self.device
+        if validation_result.has_role('Courier'):
+            task = asyncio.create_task(self.call_api(device.get_courier_packages, self.serial_number))
+            self.prefetched = (STATE_COURIER_MODE, task)
+        elif validation_result.has_role('Client'):
+            task = asyncio.create_task(self.call_api(device.get_delivered_lockers, self.serial_number))
+            self.prefetched = (STATE_CLIENT_MODE, task)
+
+    def cancel_prefetch(self):
+        """Скасовує незавершене попереднє завантаження"""
+        if self.prefetched is not None:
+            self.prefetched[1].cancel()
+            self.prefetched = None
+
+    async def take_prefetched(self, state):
+        """Очікує попереднє завантаження для стану. Повертає (found, result).
+
+        found=False - завантаження для стану не запускалось; невдалий результат
+        (None) повертається як є, щоб обробник не робив другий запит.
+        """
+        prefetched = self.prefetched
+        self.prefetched = None
+        if prefetched is None:
+            return False, None
+        if prefetched[0] != state:
+            prefetched[1].cancel()
+            return False, None
+        return True, await prefetched[1]
+
+    async def handle_courier_mode(self):
+        """COURIER MODE стан - режим кур'єра"""
+        device = self.device
+        lcd_print = device.lcd_print
+        lcd_print(get_text("courier_mode"), get_text("loading"))
+        operation_start = time.time()
+        print("\n" + "="*70)
+        print("COURIER MODE ACTIVATED")
+        print("="*70)
+
+        found, packages = await self.take_prefetched(STATE_COURIER_MODE)
+        if not found:
+            packages = await self.call_api(device.get_courier_packages, self.serial_number)
+
+        if not packages or len(packages) == 0:
+            lcd_print(get_text("no_packages"), get_text("to_deliver"))
+            self.blink(device.led_error, 2, 0.3)
+            await self.pause(2)
+            self.transition_to(STATE_MAIN_MENU)
+            return
+
+        lcd_print(f"{get_text('found')} {len(packages)} {get_text('pkg')}", get_text("processing"))
+        print(f"\nFound {len(packages)} packages to deliver")
+        plan = device.plan_placements(packages) if device.plan_placements is not None else None
+        await self.pause(2)
+
+        pending = []
+        for idx, package in enumerate(packages):
+            lcd_print(f"{get_text('package')} {idx+1}/{len(packages)}", f"ID: {package.id}")
+            await self.pause(2)
+
+            print(f"\n{'='*50}")
+            print(f"Processing package ID: {package.id}")
+            print(f"Dimensions: {package.height}x{package.width}x{package.depth} mm")
+
+            optimal = None
+            if device.find_shared_locker is not None:
+                optimal = device.find_shared_locker(package)
+            if optimal is None:
+                if plan is not None:
+                    optimal = plan[idx]
+                else:
+                    optimal = device.calculate_optimal_locker(
+                        package.height,
+                        package.width,
+                        package.depth
+                    )
+
+            if optimal:
+                locker_id = optimal['lockerId']
+
+                lcd_print(f"{get_text('use_locker')} #{locker_id}", f"{get_text('eff')} {optimal['efficiency']:.0f}%")
+                self.blink(device.led_success, 3, 0.3)
+                await self.pause(3)
+
+                lcd_print(f"{get_text('place_in')} #{locker_id}", get_text("done"))
+                key = await self.wait_confirmation("auto_skip")
+
+                # Порядок: outbox (якщо увімкнено) -> пакетне підтвердження наприкінці -> окремий запит.
+                # З outbox пакетний маршрут теж використовується: записи, накопичені за сеанс,
+                # надсилаються одним place-bulk під час наступного спорожнення outbox.
+                if key == '#' and OUTBOX_ENABLED and device.outbox is not None:
+                    # Підтвердження записано на флеш, доставка - у фоні
+                    device.outbox.enqueue(OP_PLACE, {
+                        "packageId": package.id,
+                        "postBoxId": locker_id,
+                        "serialNumber": self.serial_number
+                    })
+                    device.update_locker_state(locker_id, package.volume, package)
+                    device.stats.record_package_delivered(optimal['efficiency'], optimal['utilization'])
+
+                    lcd_print(get_text("success"), f"{get_text('locker')} #{locker_id}")
+                    self.blink(device.led_success, 5, 0.2)
+                    await self.pause(2)
+                elif key == '#' and API_BATCH_PLACE:
+                    # Підтвердження буде надіслано одним запитом наприкінці
+                    pending.append((package, optimal))
+                    device.update_locker_state(locker_id, package.volume, package)
+
+                    lcd_print(get_text("success"), f"{get_text('locker')} #{locker_id}")
+                    self.blink(device.led_success, 5, 0.2)
+                    await self.pause(2)
+                elif key == '#':
+                    lcd_print(get_text("confirming"), "")
+                    if await self.call_api(device.place_package, package.id, locker_id, self.serial_number):
+                        device.update_locker_state(locker_id, package.volume, package)
+                        device.stats.record_package_delivered(optimal['efficiency'], optimal['utilization'])
+
+                        lcd_print(get_text("success"), f"{get_text('locker')} #{locker_id}")
+                        self.blink(device.led_success, 5, 0.2)
+                        await self.pause(2)
+                    else:
+                        lcd_print(get_text("api_error"), get_text("failed_to_save"))
+                        self.blink(device.led_error, 3, 0.3)
+                        await self.pause(2)
+            else:
+                lcd_print(get_text("no_locker"), get_text("available"))
+                self.blink(device.led_error, 5, 0.2)
+                await self.pause(2)
+
+        if pending:
+            await self.commit_placements(pending)
+
+        device.stats.record_operation_time(time.time() - operation_start)
+        lcd_print(get_text("all_done"), f"{len(packages)} {get_text('delivered')}")
+        self.blink(device.led_success, 10, 0.1)
+        await self.pause(3)
+
+        self.transition_to(STATE_MAIN_MENU)
+
+    async def commit_placements(self, pending):
+        """Надсилає накопичені розміщення одним пакетним запитом
+
+        Комірки вже позначені зайнятими; для відхилених сервером пакунків стан відкочується.
+        """
+        device = self.device
+        device.lcd_print(get_text("confirming"), f"{len(pending)} {get_text('pkg')}")
+        placements = [(package.id, optimal['lockerId']) for package, optimal in pending]
+        results = await self.call_api(device.place_packages_bulk, placements, self.serial_number)
+
+        failed = 0
+        for (package, optimal), ok in zip(pending, results):
+            if ok:
+                device.stats.record_package_delivered(optimal['efficiency'], optimal['utilization'])
+            else:
+                failed += 1
+                print(f"[API] Package {package.id} was not saved")
+                device.clear_locker_state(optimal['lockerId'], package.id)
+
+        if failed:
+            device.lcd_print(f"{get_text('api_error')} {failed}", get_text("failed_to_save"))
+            self.blink(device.led_error, 3, 0.3)
+            await self.pause(2)
+
+    async def handle_client_mode(self):
+        """CLIENT MODE стан - режим клієнта"""
+        device = self.device
+        lcd_print = device.lcd_print
+        lcd_print(get_text("client_mode"), get_text("loading"))
+        operation_start = time.time()
+        print("\n=== CLIENT MODE ===")
+
+        found, lockers = await self.take_prefetched(STATE_CLIENT_MODE)
+        if not found:
+            lockers = await self.call_api(device.get_delivered_lockers, self.serial_number)
+
+        if not lockers or len(lockers) == 0:
+            lcd_print(get_text("no_packages"), get_text("available"))
+            self.blink(device.led_error, 2, 0.3)
+            await self.pause(2)
+            self.transition_to(STATE_MAIN_MENU)
+            return
+
+        lcd_print(f"{get_text('found')} {len(lockers)} {get_text('pkg')}", get_text("opening"))
+        print(f"Found {len(lockers)} lockers with packages")
+        await self.pause(2)
+
+        for idx, locker_package in enumerate(lockers):
+            locker_id = locker_package.locker_id
+            package_id = locker_package.package_id
+
+            lcd_print(f"{get_text('locker')} {idx+1}/{len(lockers)}", f"#{locker_id} {get_text('opening')}")
+            await self.pause(1)
+
+            print(f"Opening locker {locker_id}...")
+            device.relay.on()
+            self.blink(device.led_success, 2, 0.3)
+
+            lcd_print(f"{get_text('take_from')} #{locker_id}", get_text("done"))
+            key = await self.wait_confirmation("auto_close")
+
+            device.relay.off()
+
+            if key == '#' and OUTBOX_ENABLED and device.outbox is not None and package_id:
+                # Підтвердження записано на флеш, доставка - у фоні
+                device.outbox.enqueue(OP_RECEIVE, {
+                    "packageId": package_id,
+                    "serialNumber": self.serial_number
+                })
+                device.clear_locker_state(locker_id, package_id)
+                device.stats.record_package_received()
+
+                lcd_print(get_text("received"), f"{get_text('locker')} #{locker_id}")
+                self.blink(device.led_success, 3, 0.2)
+                await self.pause(2)
+            elif key == '#':
+                lcd_print(get_text("confirming"), "")
+                if package_id and await self.call_api(device.mark_package_received, package_id, self.serial_number):
+                    device.clear_locker_state(locker_id, package_id)
+                    device.stats.record_package_received()
+
+                    lcd_print(get_text("received"), f"{get_text('locker')} #{locker_id}")
+                    self.blink(device.led_success, 3, 0.2)
+                    await self.pause(2)
+                else:
+                    lcd_print(get_text("api_error"), get_text("try_again_later"))
+                    self.blink(device.led_error, 3, 0.3)
+                    await self.pause(2)
+
+        device.stats.record_operation_time(time.time() - operation_start)
+        lcd_print(get_text("all_done"), get_text("have_nice_day"))
+        self.blink(device.led_success, 10, 0.1)
+        await self.pause(3)
+
+        self.transition_to(STATE_MAIN_MENU)
+
+    async def handle_processing(self):
+        """PROCESSING стан - обробка"""
+        self.device.lcd_print(get_text("processing"), get_text("please_wait"))
+        await self.pause(2)
+        self.transition_to(STATE_MAIN_MENU)
+
+    async def handle_error(self):
+        """ERROR стан - обробка помилок"""
+        error_msg = self.error_message or get_text("unknown_error")
+        self.device.lcd_print(get_text("error"), error_msg[:16])
+        self.blink(self.device.led_error, 3, 0.3)
+        print(f"\nERROR: {error_msg}")
+        await self.pause(3)
+
+        self.error_message = None
+        self.serial_number = None
+        self.user_data = None
+        self.cancel_prefetch()
+
+        self.transition_to(STATE_MAIN_MENU)
+
+    async def show_statistics(self):
+        """Відображає статистику на LCD"""
+        stats = self.device.stats
+        lcd_print = self.device.lcd_print
+        stats.print_summary()
+        stats.print_api_report()
+
+        summary = stats.get_summary()
+
+        lcd_print("Statistics:", "")
+        await self.pause(1)
+        lcd_print(f"Uptime:{summary['uptime_hours']:.1f}h", f"Valid:{summary['nfc_success_rate']:.0f}%")
+        await self.pause(3)
+
+        lcd_print(f"Delivered:{stats.packages_delivered}", f"Received:{stats.packages_received}")
+        await self.pause(3)
+
+        lcd_print(*stats.get_lcd_window_summary(stats.last_hour, "1h"))
+        await self.pause(3)
+        lcd_print(*stats.get_lcd_window_summary(stats.last_day, "24h"))
+        await self.pause(3)
+
+        if summary['avg_efficiency'] > 0:
+            lcd_print(f"AvgEff:{summary['avg_efficiency']:.0f}%", f"AvgUtil:{summary['avg_utilization']:.0f}%")
+            await self.pause(3)
+
+        latency = stats.get_lcd_latency_summary()
+        if latency:
+            lcd_print(*latency)
+            await self.pause(3)
+
+        lcd_print(f"Lockers:{stats.lockers_opened}", "")
+        await self.pause(3)
+
+        lcd_print("Press any key", "to continue...")
+        self.flush_keys()
+        await self.next_key()
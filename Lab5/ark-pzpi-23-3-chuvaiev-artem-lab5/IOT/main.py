@@ -1,17 +1,27 @@
 print("=== NFC Mailbox System Starting ===")
 
 import network
+import sys
 import time
-import urequests
 import ujson
 from machine import Pin, SPI, I2C
 from api_models import (
     parse_validation_response,
-    parse_packages,
-    parse_lockers
+    iter_packages,
+    iter_lockers,
+    parse_bulk_place_results
 )
 from localization import get_text, set_language, get_language
 from statistics import SystemStatistics
+from keypad import Keypad, KEY_LONG_PRESS
+from states import *
+from led_engine import LedEngine
+from http_client import HttpClient, PHASES
+from outbox import Outbox, OP_PLACE, OP_RECEIVE
+from lru_cache import TtlLruCache
+from stats_store import StatsStore
+from metrics_server import MetricsServer
+from placement import LockerIndex, LockerContents, VectorScorer, find_locker_linear
 from config import *
 
 # ==========================================
@@ -20,39 +30,38 @@ from config import *
 try:
     from lcd_api import LcdApi
     from i2c_lcd import I2cLcd
+    from lcd_framebuffer import LcdFrameBuffer
     
     i2c = I2C(0, scl=Pin(LCD_SCL_PIN), sda=Pin(LCD_SDA_PIN), freq=LCD_I2C_FREQ)
     lcd = I2cLcd(i2c, LCD_I2C_ADDRESS, LCD_ROWS, LCD_COLS)
+    screen = LcdFrameBuffer(lcd)
     LCD_AVAILABLE = True
     print("LCD Display initialized")
 except Exception as e:
     print(f"LCD not available: {e}")
     LCD_AVAILABLE = False
     lcd = None
+    screen = None
 
 # ==========================================
 # Keypad Configuration (4x4 Matrix)
 # ==========================================
 row_pins = [Pin(pin, Pin.OUT) for pin in KEYPAD_ROWS]
 col_pins = [Pin(pin, Pin.IN, Pin.PULL_DOWN) for pin in KEYPAD_COLS]
+keypad = Keypad(row_pins, col_pins, KEYPAD_KEYS, KEYPAD_DEBOUNCE_MS, KEYPAD_QUEUE_SIZE,
+                KEYPAD_LONG_PRESS_MS)
 
-def read_keypad():
-    """Считывает нажатую клавишу с матричной клавиатуры"""
-    for row_idx, row_pin in enumerate(row_pins):
-        row_pin.on()
-        time.sleep(0.001)
-        
-        for col_idx, col_pin in enumerate(col_pins):
-            if col_pin.value() == 1:
-                key = KEYPAD_KEYS[row_idx][col_idx]
-                row_pin.off()
-                while col_pin.value() == 1:
-                    time.sleep(0.01)
-                return key
-        
-        row_pin.off()
-    
-    return None
+def read_keypad(timeout=0):
+    """Повертає наступну клавішу з черги подій (чекає до timeout секунд)"""
+    if timeout:
+        return keypad.wait_key(int(timeout * 1000))
+    return keypad.get_key()
+
+def read_key_event(timeout=0):
+    """Повертає наступну подію клавіатури (kind, key) або None"""
+    if timeout:
+        return keypad.wait_event(int(timeout * 1000))
+    return keypad.get_event()
 
 # ==========================================
 # LCD Helper Functions
@@ -61,17 +70,13 @@ def read_keypad():
 def lcd_clear():
     """Очищает LCD дисплей"""
     if LCD_AVAILABLE:
-        lcd.clear()
+        screen.clear()
 
 def lcd_print(line1, line2=""):
     """Выводит текст на LCD дисплей (2 строки по 16 символов)"""
     if LCD_AVAILABLE:
-        lcd.clear()
-        lcd.move_to(0, 0)
-        lcd.putstr(line1[:16]) 
-        if line2:
-            lcd.move_to(0, 1)
-            lcd.putstr(line2[:16])
+        # Перемальовуються лише змінені символи, без очищення екрана
+        screen.show(line1[:16], line2[:16])
     print(f"LCD: {line1}")
     if line2:
         print(f"     {line2}")
@@ -85,7 +90,17 @@ def lcd_input(prompt, max_length=None, numeric_only=None):
     lcd_print(prompt[:16], f"> {input_buffer}")
     
     while True:
-        key = read_keypad()
+        event = read_key_event(0.1)
+        if not event:
+            continue
+        
+        kind, key = event
+        if kind == KEY_LONG_PRESS:
+            # Утримання * очищує весь буфер
+            if key == '*' and input_buffer:
+                input_buffer = ""
+                lcd_print(prompt[:16], f"> {input_buffer}")
+            continue
         
         if key:
             if key == '#':
@@ -117,13 +132,14 @@ def lcd_input(prompt, max_length=None, numeric_only=None):
                     if len(display_text) > 14:
                         display_text = ".." + display_text[-12:]
                     lcd_print(prompt[:16], f"> {display_text}")
-        
-        time.sleep(0.1)
 
 def lcd_menu(title, options):
     while True:
         lcd_print(title[:16], get_text("select_option"))
         time.sleep(1)
+        service_outbox()
+        save_statistics()
+        service_metrics()
         
         for i in range(0, len(options), 2):
             line1 = f"{i+1}.{options[i][:14]}" if i < len(options) else ""
@@ -132,7 +148,9 @@ def lcd_menu(title, options):
             
             start_time = time.time()
             while time.time() - start_time < MENU_DISPLAY_DURATION:  
-                key = read_keypad()
+                # Меню може висіти хвилинами - сервер метрик має відповідати й тут
+                service_metrics()
+                key = read_keypad(KEY_DEBOUNCE_DELAY)
                 if key:
                     if key == 'D':
                         return None
@@ -141,8 +159,6 @@ def lcd_menu(title, options):
                         choice = int(key) - 1
                         if 0 <= choice < len(options):
                             return choice
-                
-                time.sleep(KEY_DEBOUNCE_DELAY)
 
 # ==========================================
 # WiFi Configuration
@@ -167,52 +183,109 @@ LED_SUCCESS = Pin(LED_SUCCESS_PIN, Pin.OUT)
 LED_ERROR = Pin(LED_ERROR_PIN, Pin.OUT)   
 RELAY = Pin(RELAY_PIN, Pin.OUT)
 
+led_engine = LedEngine()
+if not ASYNC_RUNTIME:
+    led_engine.start_timer(LED_TIMER_ID)
+
 print(f"Loaded {len(LOCKER_DATABASE)} lockers into local database")
 
+# Геометрія комірок рахується один раз; вільні комірки ведуться інкрементно
+locker_index = LockerIndex(LOCKER_DATABASE, OPTIMAL_UTILIZATION_MIN, OPTIMAL_UTILIZATION_MAX)
+# Пакунки, покладені з моменту запуску: locker id -> {package id: об'єм}
+locker_contents = LockerContents()
+# Альтернативний рушій: колонки array('i'), оцінка всіх комірок за один прохід
+locker_scorer = None
+if PLACEMENT_ENGINE == 'vector':
+    locker_scorer = VectorScorer(LOCKER_DATABASE, OPTIMAL_UTILIZATION_MIN, OPTIMAL_UTILIZATION_MAX)
+
 # ==========================================
 # STATISTICS MODULE
 # ==========================================
-stats = SystemStatistics()
+stats_store = None
+if STATS_PERSIST_ENABLED:
+    stats_store = StatsStore(STATS_SLOT_PATHS, STATS_SAVE_INTERVAL, STATS_MAX_ENDPOINTS, STATS_SAVE_WINDOWS)
+stats = SystemStatistics(stats_store)
 print("Statistics module initialized")
 
+def save_statistics(force=False):
+    """Зберігає статистику на флеш (періодично або примусово при завершенні)"""
+    if stats_store is None:
+        return
+    if force:
+        try:
+            stats_store.save(stats)
+        except OSError as e:
+            print(f"[STATS] Snapshot write failed: {e}")
+    else:
+        stats_store.maybe_save(stats)
+
+# HTTP-ендпоінт /metrics для моніторингу (Prometheus)
+metrics_server = MetricsServer(stats, METRICS_PORT) if METRICS_ENABLED else None
+
+def service_metrics():
+    """Відповідає на запит /metrics, якщо він очікує (лише для синхронного режиму)"""
+    if metrics_server is None:
+        return
+    try:
+        metrics_server.poll()
+    except OSError as e:
+        print(f"[METRICS] Server error: {e}")
+
 # ==========================================
 # Helper Functions
 # ==========================================
 
 def blink_led(led, times=None, delay=None):
+    """Запускає блимання у фоні та одразу повертає керування"""
     if times is None:
         times = LED_SUCCESS_BLINK_COUNT
     if delay is None:
         delay = LED_BLINK_DELAY
-    for _ in range(times):
-        led.on()
-        time.sleep(delay)
-        led.off()
-        time.sleep(delay)
+    led_engine.blink(led, times, delay)
 
-def update_locker_state(locker_id, package_volume):
+def update_locker_state(locker_id, package_volume, package=None):
     """Оновлює стан комірки в локальній базі даних"""
-    for locker in LOCKER_DATABASE:
-        if locker['id'] == locker_id:
-            locker['currentUsage'] += package_volume
-            utilization = (locker['currentUsage'] / locker['maxVolume']) * 100
-            print(f"[DB UPDATE] Locker {locker_id}: usage = {locker['currentUsage']}/{locker['maxVolume']} ({utilization:.2f}%)")
-            locker['status'] = 'occupied'
-            print(f"[DB UPDATE] Locker {locker_id}: status changed to 'occupied'")
-            return True
+    locker = locker_index.get(locker_id)
+    if locker is not None:
+        if package is not None and LOCKER_COLOCATION:
+            # Вільне місце комірки для наступних пакунків того ж отримувача
+            locker_index.place(locker_id, package.height, package.width, package.depth, package.recipient_id)
+        if package is not None:
+            locker_contents.add(locker_id, package.id, package_volume)
+        locker['currentUsage'] += package_volume
+        utilization = (locker['currentUsage'] / locker['maxVolume']) * 100
+        print(f"[DB UPDATE] Locker {locker_id}: usage = {locker['currentUsage']}/{locker['maxVolume']} ({utilization:.2f}%)")
+        locker['status'] = 'occupied'
+        locker_index.mark_occupied(locker_id)
+        if locker_scorer is not None:
+            locker_scorer.mark_occupied(locker_id)
+        print(f"[DB UPDATE] Locker {locker_id}: status changed to 'occupied'")
+        return True
     
     print(f"[DB ERROR] Locker {locker_id} not found in database")
     return False
 
-def clear_locker_state(locker_id):
-    """Очищує стан комірки"""
-    for locker in LOCKER_DATABASE:
-        if locker['id'] == locker_id:
-            old_usage = locker['currentUsage']
-            locker['currentUsage'] = 0
-            locker['status'] = 'available'
-            print(f"[DB UPDATE] Locker {locker_id}: cleared (was {old_usage} mm³)")
+def clear_locker_state(locker_id, package_id=None):
+    """Забирає пакунок з комірки; комірка звільняється, коли в ній нічого не лишилось
+
+    Якщо вміст комірки невідомий (заповнена до запуску), вона очищується повністю.
+    """
+    locker = locker_index.get(locker_id)
+    if locker is not None:
+        package_volume = locker_contents.remove(locker_id, package_id)
+        if package_volume is not None:
+            locker['currentUsage'] -= package_volume
+            print(f"[DB UPDATE] Locker {locker_id}: package {package_id} removed, {locker_contents.count(locker_id)} left "
+                  f"(usage = {locker['currentUsage']}/{locker['maxVolume']})")
             return True
+        old_usage = locker['currentUsage']
+        locker['currentUsage'] = 0
+        locker['status'] = 'available'
+        locker_index.mark_free(locker_id)
+        if locker_scorer is not None:
+            locker_scorer.mark_free(locker_id)
+        print(f"[DB UPDATE] Locker {locker_id}: cleared (was {old_usage} mm³)")
+        return True
     
     print(f"[DB ERROR] Locker {locker_id} not found in database")
     return False
@@ -233,78 +306,77 @@ def open_locker(locker_number, duration=None):
 
 def calculate_optimal_locker(package_height, package_width, package_depth, available_lockers=None):
     """Алгоритм оптимального розміщення"""
-    if available_lockers is None:
-        available_lockers = [locker for locker in LOCKER_DATABASE if locker['status'] == 'available']
-    
     print("\n=== OPTIMAL PLACEMENT CALCULATION ===")
     package_volume = package_height * package_width * package_depth
     print(f"Package volume: {package_volume} mm³")
     
-    sorted_lockers = sorted(available_lockers, key=lambda x: x['currentUsage'])
-    
-    best_locker = None
-    best_efficiency = -1
-    
-    for locker in sorted_lockers:
-        locker_id = locker['id']
-        max_volume = locker['maxVolume']
-        current_usage = locker['currentUsage']
-        
-        locker_height = locker.get('height', 0)
-        locker_width = locker.get('width', 0)
-        locker_depth = locker.get('depth', 0)
-        
-        available_space = max_volume - current_usage
-        
-        if current_usage > 0:
-            continue
-        
-        package_dims = sorted([package_height, package_width, package_depth])
-        locker_dims = sorted([locker_height, locker_width, locker_depth])
-        
-        dimensions_fit = all(p <= l for p, l in zip(package_dims, locker_dims))
-        
-        if not dimensions_fit:
-            continue
-        
-        if available_space >= package_volume:
-            new_usage = current_usage + package_volume
-            utilization_percent = (new_usage / max_volume) * 100.0
-            
-            if OPTIMAL_UTILIZATION_MIN <= utilization_percent <= OPTIMAL_UTILIZATION_MAX:
-                efficiency_score = 100.0
-            elif utilization_percent < OPTIMAL_UTILIZATION_MIN:
-                efficiency_score = 70.0 + (utilization_percent / OPTIMAL_UTILIZATION_MIN) * 30.0
-            else:
-                penalty = ((utilization_percent - OPTIMAL_UTILIZATION_MAX) / 15.0) * 30.0
-                efficiency_score = 100.0 - penalty
-            
-            efficiency_score = max(0.0, min(100.0, efficiency_score))
-            
-            if efficiency_score > best_efficiency:
-                best_efficiency = efficiency_score
-                best_locker = {
-                    'lockerId': locker_id,
-                    'utilization': utilization_percent,
-                    'efficiency': efficiency_score,
-                    'volume': package_volume
-                }
+    if available_lockers is None:
+        if locker_scorer is not None:
+            return locker_scorer.find(package_height, package_width, package_depth)
+        # Вільні комірки з індексу розмірних класів
+        return locker_index.find(package_height, package_width, package_depth)
     
-    return best_locker
+    return find_locker_linear(available_lockers, package_height, package_width, package_depth,
+                              OPTIMAL_UTILIZATION_MIN, OPTIMAL_UTILIZATION_MAX)
+
+def find_shared_locker(package):
+    """Шукає частково заповнену комірку того ж отримувача, куди пакунок поміщається"""
+    if not LOCKER_COLOCATION:
+        return None
+    if package.recipient_id is None:
+        # Без id отримувача спільне розміщення небезпечне
+        return None
+    optimal = locker_index.find_shared(package.height, package.width, package.depth, package.recipient_id)
+    if optimal:
+        print(f"[COLOCATION] Package {package.id} fits into locker {optimal['lockerId']} with other packages of user {package.recipient_id}")
+    return optimal
+
+def plan_placements(packages):
+    """Підбирає комірки одразу для всіх пакунків кур'єра (максимум розміщених, потім ефективність)"""
+    start = time.ticks_ms()
+    plan = locker_index.plan([(p.height, p.width, p.depth) for p in packages])
+    placed = sum(1 for placement in plan if placement)
+    print(f"[PLAN] {placed}/{len(packages)} packages placed, planned in {time.ticks_diff(time.ticks_ms(), start)} ms")
+    return plan
 
 # ==========================================
 # API Functions
 # ==========================================
 
+def record_api_timing(timing):
+    """Записує фази, код відповіді та обсяг даних кожного запиту до API"""
+    stats.record_api_call(timing.endpoint, timing.status_code, dict(zip(PHASES, timing.phases)),
+                          timing.bytes_sent, timing.bytes_received)
+    if API_LOG_TIMING:
+        print(f"[API] {timing}")
+
+# Одне постійне keep-alive з'єднання з бекендом для всіх запитів
+api_client = HttpClient(API_BASE_URL, API_TIMEOUT, API_DNS_TTL, observer=record_api_timing)
+
+# Кеш результатів валідації NFC: serial -> ValidationResponse або None
+validation_cache = TtlLruCache(VALIDATION_CACHE_SIZE, VALIDATION_CACHE_TTL)
+# Відповіді, що справді означають відхилену картку; 408/429 та інші - тимчасові
+NEGATIVE_CACHE_STATUSES = (401, 403, 404)
+
+def check_auth_status(status_code, serial_number):
+    """Скидає кешовану валідацію, якщо бекенд відхилив картку (401/403)"""
+    if status_code in (401, 403):
+        print(f"[CACHE] Invalidating validation for {serial_number}")
+        validation_cache.invalidate(serial_number)
+
 def validate_nfc(serial_number):
-    """Валідує NFC картку через API"""
+    """Валідує NFC картку через API (з кешем результатів)"""
+    found, cached = validation_cache.get(serial_number)
+    stats.record_validation_cache(found)
+    if found:
+        print(f"[CACHE] Validation hit for {serial_number}")
+        return cached
+    
     try:
-        url = f"{API_BASE_URL}/api/Nfc/validate"
-        headers = {'Content-Type': 'application/json'}
         payload = {"serialNumber": serial_number}
         
         print(f"Validating NFC: {serial_number}")
-        response = urequests.post(url, json=payload, headers=headers)
+        response = api_client.post("/api/Nfc/validate", json=payload)
         
         if response.status_code == 200:
             raw_data = ujson.loads(response.text)
@@ -312,11 +384,18 @@ def validate_nfc(serial_number):
             
             print(f"[API] Raw response: {raw_data}")
             
-            parsed = parse_validation_response(raw_data)
+            parsed = parse_validation_response(raw_data, API_VALIDATION_FIELDS)
+            if parsed:
+                validation_cache.put(serial_number, parsed)
+            else:
+                validation_cache.put(serial_number, None, VALIDATION_CACHE_NEGATIVE_TTL)
             return parsed
         else:
             print(f"Validation failed: {response.status_code}")
             response.close()
+            if response.status_code in NEGATIVE_CACHE_STATUSES:
+                # Картку відхилено - коротко кешуємо негативний результат
+                validation_cache.put(serial_number, None, VALIDATION_CACHE_NEGATIVE_TTL)
             return None
             
     except Exception as e:
@@ -326,16 +405,18 @@ def validate_nfc(serial_number):
 def get_courier_packages(serial_number):
     """Отримує список пакунків для кур'єра"""
     try:
-        url = f"{API_BASE_URL}/api/Package/courier?serialNumber={serial_number}"
-        response = urequests.get(url)
+        response = api_client.get(f"/api/Package/courier?serialNumber={serial_number}", stream=True)
+        check_auth_status(response.status_code, serial_number)
         
         if response.status_code == 200:
-            raw_data = ujson.loads(response.text)
+            # Розбираємо відповідь по одному пакунку, не тримаючи весь JSON у пам'яті.
+            # Список записів (лише потрібні поля) зберігається: режиму кур'єра потрібна
+            # їх кількість і спільний план розміщення, а підтвердження йдуть тим самим
+            # keep-alive з'єднанням, тож потік не можна тримати відкритим (див. json_bench.py)
+            packages = list(iter_packages(response.iter_content(API_STREAM_CHUNK_SIZE), API_PACKAGE_FIELDS))
             response.close()
             
-            print(f"[API] Raw packages: {raw_data}")
-            
-            packages = parse_packages(raw_data)
+            print(f"[API] Received {len(packages)} packages")
             return packages
         else:
             response.close()
@@ -348,15 +429,14 @@ def get_courier_packages(serial_number):
 def place_package(package_id, postbox_id, serial_number):
     """Відмічає пакунок як розміщений"""
     try:
-        url = f"{API_BASE_URL}/api/Package/place"
-        headers = {'Content-Type': 'application/json'}
         payload = {
             "packageId": package_id,
             "postBoxId": postbox_id,
             "serialNumber": serial_number
         }
         
-        response = urequests.post(url, json=payload, headers=headers)
+        response = api_client.post("/api/Package/place", json=payload)
+        check_auth_status(response.status_code, serial_number)
         
         if response.status_code == 200:
             response.close()
@@ -369,22 +449,83 @@ def place_package(package_id, postbox_id, serial_number):
         print(f"API Error: {e}")
         return False
 
+# None - ще невідомо, чи підтримує бекенд пакетний маршрут
+bulk_place_supported = None
+
+def post_place_bulk(placements, serial_number, idempotency_keys=None):
+    """Надсилає пакетний запит розміщення. Повертає (status_code, raw_data).
+    
+    Запам'ятовує, чи підтримує бекенд маршрут place-bulk.
+    """
+    global bulk_place_supported
+    items = []
+    for idx, (package_id, postbox_id) in enumerate(placements):
+        item = {"packageId": package_id, "postBoxId": postbox_id}
+        if idempotency_keys:
+            item["idempotencyKey"] = idempotency_keys[idx]
+        items.append(item)
+    payload = {"serialNumber": serial_number, "placements": items}
+    
+    response = api_client.post("/api/Package/place-bulk", json=payload)
+    status_code = response.status_code
+    raw_data = None
+    check_auth_status(status_code, serial_number)
+    
+    if status_code in (404, 405):
+        print("[API] Bulk place route not available, falling back to single requests")
+        bulk_place_supported = False
+    elif status_code == 200:
+        bulk_place_supported = True
+        raw_data = ujson.loads(response.text) if response.content else None
+    else:
+        print(f"[API] Bulk place failed: {status_code}")
+    
+    response.close()
+    return status_code, raw_data
+
+def place_packages_bulk(placements, serial_number):
+    """Відмічає кілька пакунків як розміщені одним запитом.
+    
+    placements - список пар (package_id, postbox_id). Повертає список bool
+    у тому ж порядку. Якщо бекенд не має пакетного маршруту або не повернув
+    результатів по пакунках, виконує окремі виклики place_package.
+    """
+    if not placements:
+        return []
+    
+    if bulk_place_supported is not False:
+        try:
+            status_code, raw_data = post_place_bulk(placements, serial_number)
+        except Exception as e:
+            print(f"API Error: {e}")
+            return [False] * len(placements)
+        
+        if status_code == 200:
+            results = parse_bulk_place_results(raw_data, placements)
+            if results is not None:
+                return results
+            # Відповідь без результатів по пакунках - не вважаємо їх збереженими
+            print("[API] Bulk place response has no per-item results, confirming one by one")
+        elif status_code not in (404, 405):
+            return [False] * len(placements)
+    
+    return [place_package(package_id, postbox_id, serial_number)
+            for package_id, postbox_id in placements]
+
 def get_delivered_lockers(serial_number):
     """Отримує список комірок з доставленими пакунками"""
     try:
-        url = f"{API_BASE_URL}/api/Package/locker/open-all-delivered"
-        headers = {'Content-Type': 'application/json'}
         payload = {"serialNumber": serial_number}
         
-        response = urequests.post(url, json=payload, headers=headers)
+        response = api_client.post("/api/Package/locker/open-all-delivered", json=payload, stream=True)
+        check_auth_status(response.status_code, serial_number)
         
         if response.status_code == 200:
-            raw_data = ujson.loads(response.text)
+            # Список зберігається з тієї ж причини, що й у get_courier_packages
+            lockers = list(iter_lockers(response.iter_content(API_STREAM_CHUNK_SIZE)))
             response.close()
             
-            print(f"[API] Raw lockers: {raw_data}")
-            
-            lockers = parse_lockers(raw_data)
+            print(f"[API] Received {len(lockers)} lockers")
             return lockers
         else:
             response.close()
@@ -397,13 +538,13 @@ def get_delivered_lockers(serial_number):
 def mark_package_received(package_id, serial_number):
     """Відмічає посилку як отриману"""
     try:
-        url = f"{API_BASE_URL}/api/Package/{package_id}/receive?serialNumber={serial_number}"
+        path = f"/api/Package/{package_id}/receive?serialNumber={serial_number}"
         
         print(f"[API] Marking package {package_id} as received")
-        print(f"[API] URL: {url}")
+        print(f"[API] URL: {API_BASE_URL}{path}")
         
-        headers = {'Content-Length': '0'}
-        response = urequests.post(url, headers=headers)
+        response = api_client.post(path)
+        check_auth_status(response.status_code, serial_number)
         
         print(f"[API] Response status: {response.status_code}")
         
@@ -425,16 +566,164 @@ def mark_package_received(package_id, serial_number):
         return False
 
 # ==========================================
-# STATE MACHINE
+# Offline Outbox
 # ==========================================
 
-STATE_IDLE = "IDLE"
-STATE_MAIN_MENU = "MAIN_MENU"
-STATE_INPUT_SERIAL = "INPUT_SERIAL"
-STATE_COURIER_MODE = "COURIER_MODE"
-STATE_CLIENT_MODE = "CLIENT_MODE"
-STATE_PROCESSING = "PROCESSING"
-STATE_ERROR = "ERROR"
+def outbox_result(status_code):
+    """True - доставлено, False - повторити пізніше, None - відхилено назавжди"""
+    if 200 <= status_code < 300:
+        return True
+    if status_code in (408, 429) or status_code >= 500:
+        return False
+    return None
+
+def send_outbox_entry(entry):
+    """Доставляє один запис outbox з ключем ідемпотентності (помилки мережі - виняток)"""
+    headers = {'Idempotency-Key': entry.key}
+    args = entry.args
+    if entry.op == OP_PLACE:
+        payload = {
+            "packageId": args['packageId'],
+            "postBoxId": args['postBoxId'],
+            "serialNumber": args['serialNumber']
+        }
+        response = api_client.post("/api/Package/place", json=payload, headers=headers)
+    elif entry.op == OP_RECEIVE:
+        path = f"/api/Package/{args['packageId']}/receive?serialNumber={args['serialNumber']}"
+        response = api_client.post(path, headers=headers)
+    else:
+        print(f"[OUTBOX] Unknown operation: {entry.op}")
+        return None
+    
+    response.close()
+    check_auth_status(response.status_code, args['serialNumber'])
+    return outbox_result(response.status_code)
+
+def send_outbox_entries(entries):
+    """Відправник для Outbox: розміщення йдуть пакетом, решта - поодинці.
+    
+    Перша ж помилка мережі завершує раунд: решта записів - False (повтор пізніше),
+    щоб офлайн-спроба коштувала один timeout, а не по одному на кожен запис.
+    """
+    results = {}
+    offline = False
+    
+    places = [entry for entry in entries if entry.op == OP_PLACE]
+    if API_BATCH_PLACE and bulk_place_supported is not False and len(places) > 1:
+        groups = {}
+        for entry in places:
+            groups.setdefault(entry.args['serialNumber'], []).append(entry)
+        
+        for serial_number, group in groups.items():
+            placements = [(entry.args['packageId'], entry.args['postBoxId']) for entry in group]
+            try:
+                status_code, raw_data = post_place_bulk(
+                    placements, serial_number, [entry.key for entry in group])
+            except Exception as e:
+                print(f"[OUTBOX] API Error: {e}")
+                offline = True
+                break
+            
+            if status_code in (404, 405):
+                break
+            if status_code == 200:
+                oks = parse_bulk_place_results(raw_data, placements)
+                if oks is None:
+                    # Результат невідомий - записи підуть окремими запитами з тими ж ключами
+                    print("[OUTBOX] Bulk place response has no per-item results")
+                    continue
+                # Відмова для окремої посилки - бізнес-помилка, повтор не допоможе
+                group_results = [True if ok else None for ok in oks]
+            else:
+                group_results = [outbox_result(status_code)] * len(group)
+            
+            for entry, result in zip(group, group_results):
+                results[entry.key] = result
+    
+    for entry in entries:
+        if entry.key in results:
+            continue
+        if offline:
+            results[entry.key] = False
+            continue
+        try:
+            results[entry.key] = send_outbox_entry(entry)
+        except Exception as e:
+            print(f"[OUTBOX] API Error: {e}")
+            offline = True
+            results[entry.key] = False
+    
+    return [results[entry.key] for entry in entries]
+
+def handle_outbox_rejections():
+    """Відкочує локальний стан для підтверджень, які сервер відхилив остаточно"""
+    rejected = outbox.take_rejected()
+    for entry in rejected:
+        args = entry.args
+        if entry.op == OP_PLACE:
+            # Сервер не прийняв розміщення - комірка не повинна лишатися зайнятою
+            clear_locker_state(args['postBoxId'], args['packageId'])
+            print(f"[OUTBOX] ALERT: placement of package {args['packageId']} in locker {args['postBoxId']} "
+                  f"was rejected by the server, local state rolled back")
+        else:
+            # Пакунок уже забрано фізично - потрібне втручання оператора
+            print(f"[OUTBOX] ALERT: {entry.op} of package {args.get('packageId')} was rejected by the server")
+    if rejected:
+        blink_led(LED_ERROR, 5, 0.2)
+
+outbox = Outbox(OUTBOX_PATH, send_outbox_entries, OUTBOX_BACKOFF_BASE, OUTBOX_BACKOFF_MAX,
+                OUTBOX_COMPACT_AFTER)
+
+def service_outbox():
+    """Доставляє накопичені підтвердження, якщо минув інтервал очікування"""
+    if OUTBOX_ENABLED and outbox.is_due():
+        outbox.drain()
+        handle_outbox_rejections()
+
+# ==========================================
+# Serial Console Commands
+# ==========================================
+
+console_buffer = ""
+console_poll = None
+
+if CONSOLE_COMMANDS:
+    try:
+        import select
+        console_poll = select.poll()
+        console_poll.register(sys.stdin, select.POLLIN)
+    except Exception as e:
+        print(f"Console commands not available: {e}")
+        console_poll = None
+
+def run_console_command(command):
+    """Виконує команду, введену в послідовній консолі"""
+    if command == "api":
+        stats.print_api_report()
+    elif command == "stats":
+        stats.print_summary()
+    elif command:
+        print("Commands: api - API calls by endpoint, stats - statistics summary")
+
+def poll_console():
+    """Неблокуюче читання команд з консолі (api, stats)"""
+    global console_buffer
+    if console_poll is None:
+        return
+    while console_poll.poll(0):
+        char = sys.stdin.read(1)
+        if not char:
+            return
+        if char in "\r\n":
+            command = console_buffer.strip().lower()
+            console_buffer = ""
+            run_console_command(command)
+        elif len(console_buffer) < 32:
+            console_buffer += char
+
+# ==========================================
+# STATE MACHINE
+# ==========================================
 
 class MailboxStateMachine:
     """Машина состояний для системы почтовых ящиков"""
@@ -444,6 +733,8 @@ class MailboxStateMachine:
         self.serial_number = None
         self.user_data = None
         self.error_message = None
+        # (стан, результат) попередньо завантажених даних для наступного режиму
+        self.prefetched = None
         
     def transition_to(self, new_state, data=None):
         """Переход в новое состояние"""
@@ -497,10 +788,14 @@ class MailboxStateMachine:
         lcd_print("NFC Mailbox", get_text("press_any_key"))
         print("System ready. Waiting for input...")
         
+        keypad.flush()
         key = None
         while not key:
-            key = read_keypad()
-            time.sleep(0.1)
+            service_outbox()
+            save_statistics()
+            service_metrics()
+            poll_console()
+            key = read_keypad(0.1)
         
         blink_led(LED_SUCCESS, 1, 0.1)
         self.transition_to(STATE_MAIN_MENU)
@@ -558,8 +853,12 @@ class MailboxStateMachine:
             stats.record_nfc_validation(True)
             
             lcd_print(get_text("valid"), f"{get_text('user')} {validation_result.name[:8]}")
+            display_start = time.time()
             blink_led(LED_SUCCESS, 2, 0.2)
-            time.sleep(2)
+            
+            # Завантажуємо дані режиму, поки показано "Valid!", і чекаємо лише залишок паузи
+            self.prefetch_for_role(validation_result)
+            time.sleep(max(0, FEEDBACK_DISPLAY_DURATION - (time.time() - display_start)))
             
             if validation_result.has_role('Courier'):
                 self.transition_to(STATE_COURIER_MODE)
@@ -573,14 +872,37 @@ class MailboxStateMachine:
             self.error_message = get_text("invalid")
             self.transition_to(STATE_ERROR)
     
+    def prefetch_for_role(self, validation_result):
+        """Завантажує список посилок/комірок одразу після визначення ролі"""
+        if validation_result.has_role('Courier'):
+            self.prefetched = (STATE_COURIER_MODE, get_courier_packages(self.serial_number))
+        elif validation_result.has_role('Client'):
+            self.prefetched = (STATE_CLIENT_MODE, get_delivered_lockers(self.serial_number))
+        else:
+            self.prefetched = None
+    
+    def take_prefetched(self, state):
+        """Повертає (found, result) попередньо завантажених даних для стану.
+        
+        Невдалий результат (None) повертається як є, щоб обробник не робив другий запит.
+        """
+        prefetched = self.prefetched
+        self.prefetched = None
+        if prefetched is None or prefetched[0] != state:
+            return False, None
+        return True, prefetched[1]
+    
     def handle_courier_mode(self):
         """COURIER MODE состояние - режим курьера"""
         lcd_print(get_text("courier_mode"), get_text("loading"))
+        operation_start = time.time()
         print("\n" + "="*70)
         print("COURIER MODE ACTIVATED")
         print("="*70)
         
-        packages = get_courier_packages(self.serial_number)
+        found, packages = self.take_prefetched(STATE_COURIER_MODE)
+        if not found:
+            packages = get_courier_packages(self.serial_number)
         
         if not packages or len(packages) == 0:
             lcd_print(get_text("no_packages"), get_text("to_deliver"))
@@ -591,8 +913,10 @@ class MailboxStateMachine:
         
         lcd_print(f"{get_text('found')} {len(packages)} {get_text('pkg')}", get_text("processing"))
         print(f"\nFound {len(packages)} packages to deliver")
+        plan = plan_placements(packages) if BATCH_PLACEMENT else None
         time.sleep(2)
         
+        pending = []
         for idx, package in enumerate(packages):
             lcd_print(f"{get_text('package')} {idx+1}/{len(packages)}", f"ID: {package.id}")
             time.sleep(2)
@@ -601,11 +925,16 @@ class MailboxStateMachine:
             print(f"Processing package ID: {package.id}")
             print(f"Dimensions: {package.height}x{package.width}x{package.depth} mm")
             
-            optimal = calculate_optimal_locker(
-                package.height, 
-                package.width, 
-                package.depth
-            )
+            optimal = find_shared_locker(package)
+            if optimal is None:
+                if plan is not None:
+                    optimal = plan[idx]
+                else:
+                    optimal = calculate_optimal_locker(
+                        package.height, 
+                        package.width, 
+                        package.depth
+                    )
             
             if optimal:
                 locker_id = optimal['lockerId']
@@ -617,6 +946,7 @@ class MailboxStateMachine:
                 lcd_print(f"{get_text('place_in')} #{locker_id}", get_text("done"))
                 
                 # Чекаємо підтвердження з timeout
+                keypad.flush()
                 key = None
                 timeout_start = time.time()
                 timeout_duration = OPERATION_TIMEOUT
@@ -627,17 +957,40 @@ class MailboxStateMachine:
                         time.sleep(2)
                         break
                         
-                    key = read_keypad()
+                    key = read_keypad(0.1)
                     if key == 'D':
                         lcd_print(get_text("skipped"), "")
                         time.sleep(1)
                         break
-                    time.sleep(0.1)
                 
-                if key == '#':
+                # Порядок: outbox (якщо увімкнено) -> пакетне підтвердження наприкінці -> окремий запит.
+                # З outbox пакетний маршрут теж використовується: записи, накопичені за сеанс,
+                # надсилаються одним place-bulk під час наступного спорожнення outbox.
+                if key == '#' and OUTBOX_ENABLED:
+                    # Підтвердження записано на флеш, доставка - у фоні
+                    outbox.enqueue(OP_PLACE, {
+                        "packageId": package.id,
+                        "postBoxId": locker_id,
+                        "serialNumber": self.serial_number
+                    })
+                    update_locker_state(locker_id, package.volume, package)
+                    stats.record_package_delivered(optimal['efficiency'], optimal['utilization'])
+                    
+                    lcd_print(get_text("success"), f"{get_text('locker')} #{locker_id}")
+                    blink_led(LED_SUCCESS, 5, 0.2)
+                    time.sleep(2)
+                elif key == '#' and API_BATCH_PLACE:
+                    # Підтвердження буде надіслано одним запитом наприкінці
+                    pending.append((package, optimal))
+                    update_locker_state(locker_id, package.volume, package)
+                    
+                    lcd_print(get_text("success"), f"{get_text('locker')} #{locker_id}")
+                    blink_led(LED_SUCCESS, 5, 0.2)
+                    time.sleep(2)
+                elif key == '#':
                     lcd_print(get_text("confirming"), "")
                     if place_package(package.id, locker_id, self.serial_number):
-                        update_locker_state(locker_id, package.volume)
+                        update_locker_state(locker_id, package.volume, package)
                         stats.record_package_delivered(optimal['efficiency'], optimal['utilization'])
                         
                         lcd_print(get_text("success"), f"{get_text('locker')} #{locker_id}")
@@ -652,18 +1005,48 @@ class MailboxStateMachine:
                 blink_led(LED_ERROR, 5, 0.2)
                 time.sleep(2)
         
+        if pending:
+            self.commit_placements(pending)
+        
+        stats.record_operation_time(time.time() - operation_start)
         lcd_print(get_text("all_done"), f"{len(packages)} {get_text('delivered')}")
         blink_led(LED_SUCCESS, 10, 0.1)
         time.sleep(3)
         
         self.transition_to(STATE_MAIN_MENU)
     
+    def commit_placements(self, pending):
+        """Надсилає накопичені розміщення одним пакетним запитом
+
+        Комірки вже позначені зайнятими; для відхилених сервером пакунків стан відкочується.
+        """
+        lcd_print(get_text("confirming"), f"{len(pending)} {get_text('pkg')}")
+        placements = [(package.id, optimal['lockerId']) for package, optimal in pending]
+        results = place_packages_bulk(placements, self.serial_number)
+        
+        failed = 0
+        for (package, optimal), ok in zip(pending, results):
+            if ok:
+                stats.record_package_delivered(optimal['efficiency'], optimal['utilization'])
+            else:
+                failed += 1
+                print(f"[API] Package {package.id} was not saved")
+                clear_locker_state(optimal['lockerId'], package.id)
+        
+        if failed:
+            lcd_print(f"{get_text('api_error')} {failed}", get_text("failed_to_save"))
+            blink_led(LED_ERROR, 3, 0.3)
+            time.sleep(2)
+    
     def handle_client_mode(self):
         """CLIENT MODE состояние - режим клиента"""
         lcd_print(get_text("client_mode"), get_text("loading"))
+        operation_start = time.time()
         print("\n=== CLIENT MODE ===")
         
-        lockers = get_delivered_lockers(self.serial_number)
+        found, lockers = self.take_prefetched(STATE_CLIENT_MODE)
+        if not found:
+            lockers = get_delivered_lockers(self.serial_number)
         
         if not lockers or len(lockers) == 0:
             lcd_print(get_text("no_packages"), get_text("available"))
@@ -690,6 +1073,7 @@ class MailboxStateMachine:
             lcd_print(f"{get_text('take_from')} #{locker_id}", get_text("done"))
             
             # Чекаємо підтвердження з timeout
+            keypad.flush()
             key = None
             timeout_start = time.time()
             timeout_duration = OPERATION_TIMEOUT
@@ -700,19 +1084,30 @@ class MailboxStateMachine:
                     time.sleep(2)
                     break
                     
-                key = read_keypad()
+                key = read_keypad(0.1)
                 if key == 'D':
                     lcd_print(get_text("skipped"), "")
                     time.sleep(1)
                     break
-                time.sleep(0.1)
             
             RELAY.off()
             
-            if key == '#':
+            if key == '#' and OUTBOX_ENABLED and package_id:
+                # Підтвердження записано на флеш, доставка - у фоні
+                outbox.enqueue(OP_RECEIVE, {
+                    "packageId": package_id,
+                    "serialNumber": self.serial_number
+                })
+                clear_locker_state(locker_id, package_id)
+                stats.record_package_received()
+                
+                lcd_print(get_text("received"), f"{get_text('locker')} #{locker_id}")
+                blink_led(LED_SUCCESS, 3, 0.2)
+                time.sleep(2)
+            elif key == '#':
                 lcd_print(get_text("confirming"), "")
                 if package_id and mark_package_received(package_id, self.serial_number):
-                    clear_locker_state(locker_id)
+                    clear_locker_state(locker_id, package_id)
                     stats.record_package_received()
                     
                     lcd_print(get_text("received"), f"{get_text('locker')} #{locker_id}")
@@ -723,6 +1118,7 @@ class MailboxStateMachine:
                     blink_led(LED_ERROR, 3, 0.3)
                     time.sleep(2)
         
+        stats.record_operation_time(time.time() - operation_start)
         lcd_print(get_text("all_done"), get_text("have_nice_day"))
         blink_led(LED_SUCCESS, 10, 0.1)
         time.sleep(3)
@@ -746,12 +1142,14 @@ class MailboxStateMachine:
         self.error_message = None
         self.serial_number = None
         self.user_data = None
+        self.prefetched = None
         
         self.transition_to(STATE_MAIN_MENU)
     
     def show_statistics(self):
         """Відображає статистику на LCD"""
         stats.print_summary()
+        stats.print_api_report()
         
         summary = stats.get_summary()
         
@@ -765,20 +1163,32 @@ class MailboxStateMachine:
         lcd_print(f"Delivered:{stats.packages_delivered}", f"Received:{stats.packages_received}")
         time.sleep(3)
         
-        # Screen 3: Efficiency & Utilization
+        # Screen 3: Recent windows
+        lcd_print(*stats.get_lcd_window_summary(stats.last_hour, "1h"))
+        time.sleep(3)
+        lcd_print(*stats.get_lcd_window_summary(stats.last_day, "24h"))
+        time.sleep(3)
+        
+        # Screen 4: Efficiency & Utilization
         if summary['avg_efficiency'] > 0:
             lcd_print(f"AvgEff:{summary['avg_efficiency']:.0f}%", f"AvgUtil:{summary['avg_utilization']:.0f}%")
             time.sleep(3)
         
-        # Screen 4: Lockers opened
+        # Screen 5: Operation time percentiles
+        latency = stats.get_lcd_latency_summary()
+        if latency:
+            lcd_print(*latency)
+            time.sleep(3)
+        
+        # Screen 6: Lockers opened
         lcd_print(f"Lockers:{stats.lockers_opened}", "")
         time.sleep(3)
         
         lcd_print("Press any key", "to continue...")
+        keypad.flush()
         key = None
         while not key:
-            key = read_keypad()
-            time.sleep(0.1)
+            key = read_keypad(0.1)
 
 # ==========================================
 # Main Entry Point
@@ -791,10 +1201,47 @@ print("=== System Ready ===")
 lcd_print(get_text("system_ready"), get_text("starting"))
 time.sleep(2)
 
-state_machine = MailboxStateMachine()
-state_machine.run()
+if ASYNC_RUNTIME:
+    import uasyncio as asyncio
+    from mailbox_async import Device, AsyncMailboxStateMachine
+    
+    device = Device(
+        lcd_print=lcd_print,
+        keypad=keypad,
+        led_success=LED_SUCCESS,
+        led_error=LED_ERROR,
+        led_engine=led_engine,
+        relay=RELAY,
+        stats=stats,
+        validate_nfc=validate_nfc,
+        get_courier_packages=get_courier_packages,
+        place_package=place_package,
+        place_packages_bulk=place_packages_bulk,
+        get_delivered_lockers=get_delivered_lockers,
+        mark_package_received=mark_package_received,
+        calculate_optimal_locker=calculate_optimal_locker,
+        find_shared_locker=find_shared_locker if LOCKER_COLOCATION else None,
+        plan_placements=plan_placements if BATCH_PLACEMENT else None,
+        update_locker_state=update_locker_state,
+        clear_locker_state=clear_locker_state,
+        outbox=outbox,
+        handle_outbox_rejections=handle_outbox_rejections,
+        poll_console=poll_console,
+        save_statistics=save_statistics,
+        metrics_server=metrics_server
+    )
+    try:
+        asyncio.run(AsyncMailboxStateMachine(device).run())
+    except KeyboardInterrupt:
+        print("\nShutting down...")
+        lcd_print("System", get_text("shutting_down"))
+else:
+    state_machine = MailboxStateMachine()
+    state_machine.run()
 
 # Cleanup
+save_statistics(force=True)
+led_engine.stop_timer()
 LED_SUCCESS.off()
 LED_ERROR.off()
 RELAY.off()
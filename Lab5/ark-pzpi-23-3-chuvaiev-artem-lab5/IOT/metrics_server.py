@@ -0,0 +1,311 @@
+"""
+Prometheus-style metrics endpoint for SystemStatistics
+Serves GET /metrics from the asyncio runtime or by polling from the blocking one
+"""
+
+try:
+    import usocket as socket
+except ImportError:
+    import socket
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+import errno
+import time
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+QUANTILES = (50, 90, 99)
+PREFIX = "nfc_mailbox_"
+
+# Longest request head we read before answering
+_MAX_REQUEST_LINES = 32
+_MAX_REQUEST_BYTES = 2048
+_RECV_SIZE = 512
+
+# errno values a non-blocking socket raises when no data is ready
+_WOULD_BLOCK = (errno.EAGAIN, getattr(errno, 'EWOULDBLOCK', errno.EAGAIN))
+
+# Seconds between attempts to open the listening socket after a failure
+LISTEN_RETRY_INTERVAL = 30
+
+
+def _line(name, value, labels=None):
+    if labels:
+        label_text = ','.join(f'{key}="{val}"' for key, val in labels)
+        return f"{PREFIX}{name}{{{label_text}}} {value}\n"
+    return f"{PREFIX}{name} {value}\n"
+
+
+def _meta(name, kind, help_text):
+    return f"# HELP {PREFIX}{name} {help_text}\n# TYPE {PREFIX}{name} {kind}\n"
+
+
+def _summary(name, histogram, labels=()):
+    for p in QUANTILES:
+        yield _line(name, histogram.percentile(p), labels + (('quantile', p / 100),))
+    yield _line(name + "_sum", histogram.total, labels)
+    yield _line(name + "_count", histogram.count, labels)
+
+
+def render_metrics(stats):
+    """Yields the metrics of stats as Prometheus text exposition lines"""
+    yield _meta("uptime_seconds", "gauge", "Seconds since boot")
+    yield _line("uptime_seconds", round(stats.get_uptime()))
+
+    yield _meta("nfc_validations_total", "counter", "NFC validations by result")
+    yield _line("nfc_validations_total", stats.nfc_validations_success, (('result', 'success'),))
+    yield _line("nfc_validations_total", stats.nfc_validations_failed, (('result', 'failed'),))
+
+    yield _meta("validation_cache_lookups_total", "counter", "NFC validation cache lookups")
+    yield _line("validation_cache_lookups_total", stats.validation_cache_hits, (('result', 'hit'),))
+    yield _line("validation_cache_lookups_total", stats.validation_cache_misses, (('result', 'miss'),))
+
+    yield _meta("packages_delivered_total", "counter", "Packages placed by couriers")
+    yield _line("packages_delivered_total", stats.packages_delivered)
+    yield _meta("packages_received_total", "counter", "Packages picked up by clients")
+    yield _line("packages_received_total", stats.packages_received)
+    yield _meta("lockers_opened_total", "counter", "Locker relay activations")
+    yield _line("lockers_opened_total", stats.lockers_opened)
+
+    yield _meta("placement_efficiency_percent", "gauge", "Average and std deviation of placement efficiency")
+    yield _line("placement_efficiency_percent", stats.get_average_efficiency(), (('stat', 'mean'),))
+    yield _line("placement_efficiency_percent", stats.get_std_deviation_efficiency(), (('stat', 'stddev'),))
+    yield _meta("locker_utilization_percent", "gauge", "Average locker utilization after placement")
+    yield _line("locker_utilization_percent", stats.get_average_utilization())
+
+    yield _meta("operation_duration_seconds", "summary", "Courier and client run durations")
+    for line in _summary("operation_duration_seconds", stats.operation_latency):
+        yield line
+
+    if stats.api_calls:
+        yield _meta("api_request_duration_seconds", "summary", "Backend request latency by endpoint")
+        for endpoint, histogram in stats.api_latency.items():
+            for line in _summary("api_request_duration_seconds", histogram, (('endpoint', endpoint),)):
+                yield line
+
+        yield _meta("api_requests_total", "counter", "Backend requests by endpoint and status (0 = failed)")
+        for endpoint, endpoint_stats in stats.api_calls.items():
+            for code, count in endpoint_stats.status_codes.items():
+                yield _line("api_requests_total", count, (('endpoint', endpoint), ('status', code)))
+
+        yield _meta("api_phase_avg_milliseconds", "gauge", "Average request phase duration by endpoint")
+        for endpoint, endpoint_stats in stats.api_calls.items():
+            for phase, accumulator in endpoint_stats.phases.items():
+                yield _line("api_phase_avg_milliseconds", accumulator.get_average(),
+                            (('endpoint', endpoint), ('phase', phase)))
+
+        yield _meta("api_bytes_total", "counter", "Bytes exchanged with the backend by endpoint")
+        for endpoint, endpoint_stats in stats.api_calls.items():
+            yield _line("api_bytes_total", endpoint_stats.bytes_sent, (('endpoint', endpoint), ('direction', 'sent')))
+            yield _line("api_bytes_total", endpoint_stats.bytes_received, (('endpoint', endpoint), ('direction', 'received')))
+
+    yield _meta("window_nfc_success_percent", "gauge", "NFC success rate over the rolling window")
+    windows = (('1h', stats.get_window_summary(stats.last_hour)),
+               ('24h', stats.get_window_summary(stats.last_day)))
+    for label, window in windows:
+        yield _line("window_nfc_success_percent", window['nfc_success_rate'], (('window', label),))
+    yield _meta("window_packages", "gauge", "Packages delivered and received over the rolling window")
+    for label, window in windows:
+        yield _line("window_packages", window['packages_delivered'], (('window', label), ('kind', 'delivered')))
+        yield _line("window_packages", window['packages_received'], (('window', label), ('kind', 'received')))
+    yield _meta("window_api_avg_seconds", "gauge", "Average backend latency over the rolling window")
+    for label, window in windows:
+        yield _line("window_api_avg_seconds", window['avg_api_latency'], (('window', label),))
+
+
+def _would_block(error):
+    return bool(error.args) and error.args[0] in _WOULD_BLOCK
+
+
+def _response_head(status):
+    if status == 200:
+        return f"HTTP/1.0 200 OK\r\nContent-Type: {CONTENT_TYPE}\r\nConnection: close\r\n\r\n"
+    return "HTTP/1.0 404 Not Found\r\nContent-Type: text/plain\r\nConnection: close\r\n\r\nNot Found\n"
+
+
+def _route(request_line):
+    parts = request_line.split()
+    if len(parts) >= 2 and parts[0] == 'GET' and parts[1].split('?', 1)[0] == '/metrics':
+        return 200
+    return 404
+
+
+class MetricsServer:
+    """Serves render_metrics(stats) over HTTP on the given port.
+
+    The async runtime runs serve() as a task. The blocking runtime calls
+    poll() from its idle loops; poll() never waits on a socket and serves
+    one scrape at a time, a piece per call.
+    """
+
+    def __init__(self, stats, port=9100, host='0.0.0.0', client_timeout=2):
+        self.stats = stats
+        self.port = port
+        self.host = host
+        self.client_timeout = client_timeout
+        self._listener = None
+        self._retry_at = None
+
+        # Scrape in progress in the blocking runtime
+        self._client = None
+        self._request = b''
+        self._response = None
+        self._deadline = 0
+
+        # Counters for diagnostics
+        self.scrapes = 0
+
+    # ==========================================
+    # asyncio runtime
+    # ==========================================
+
+    async def _handle(self, reader, writer):
+        try:
+            request_line = (await reader.readline()).decode()
+            for _ in range(_MAX_REQUEST_LINES):
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+
+            status = _route(request_line)
+            writer.write(_response_head(status).encode())
+            if status == 200:
+                self.scrapes += 1
+                for line in render_metrics(self.stats):
+                    writer.write(line.encode())
+                    await writer.drain()
+            await writer.drain()
+        except Exception as e:
+            print(f"[METRICS] Request error: {e}")
+        finally:
+            writer.close()
+            if hasattr(writer, 'wait_closed'):
+                try:
+                    await writer.wait_closed()
+                except Exception:
+                    pass
+
+    async def serve(self):
+        """Task that serves scrapes until cancelled"""
+        server = await asyncio.start_server(self._handle, self.host, self.port)
+        print(f"[METRICS] Serving on port {self.port}")
+        try:
+            while True:
+                await asyncio.sleep(3600)
+        finally:
+            server.close()
+
+    # ==========================================
+    # Blocking runtime
+    # ==========================================
+
+    def _listen(self):
+        addr = socket.getaddrinfo(self.host, self.port, 0, socket.SOCK_STREAM)[0][-1]
+        listener = socket.socket()
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind(addr)
+        listener.listen(2)
+        listener.setblocking(False)
+        self._listener = listener
+        print(f"[METRICS] Serving on port {self.port}")
+
+    def poll(self):
+        """Advances the pending scrape, if any, without blocking.
+
+        The client socket is non-blocking: each call reads or writes only
+        what is ready and keeps partial requests and responses buffered
+        until the next call. A client that has not been answered within
+        client_timeout seconds of being accepted is dropped.
+
+        If the port cannot be opened, the error is logged once and opening
+        is retried every LISTEN_RETRY_INTERVAL seconds.
+        """
+        if self._listener is None:
+            now = time.time()
+            if self._retry_at is not None and now < self._retry_at:
+                return False
+            try:
+                self._listen()
+            except OSError as e:
+                if self._retry_at is None:
+                    print(f"[METRICS] Cannot listen on port {self.port}: {e}; retrying every {LISTEN_RETRY_INTERVAL}s")
+                self._retry_at = now + LISTEN_RETRY_INTERVAL
+                return False
+            self._retry_at = None
+
+        if self._client is None:
+            try:
+                client, _ = self._listener.accept()
+            except OSError:
+                # Nothing to accept
+                return False
+            client.setblocking(False)
+            self._client = client
+            self._request = b''
+            self._response = None
+            self._deadline = time.time() + self.client_timeout
+
+        try:
+            if self._response is None:
+                self._read_request()
+            if self._response is not None:
+                self._write_response()
+        except (OSError, ValueError) as e:
+            print(f"[METRICS] Request error: {e}")
+            self._drop_client()
+            return True
+
+        if self._client is not None and time.time() >= self._deadline:
+            print("[METRICS] Request timed out")
+            self._drop_client()
+        return True
+
+    def _read_request(self):
+        try:
+            chunk = self._client.recv(_RECV_SIZE)
+        except OSError as e:
+            if _would_block(e):
+                return
+            raise
+        self._request += chunk
+        head_done = b'\r\n\r\n' in self._request or b'\n\n' in self._request
+        if not (head_done or not chunk or len(self._request) >= _MAX_REQUEST_BYTES):
+            return
+
+        request_line = self._request.split(b'\n', 1)[0].decode()
+        status = _route(request_line)
+        response = _response_head(status)
+        if status == 200:
+            self.scrapes += 1
+            response += ''.join(render_metrics(self.stats))
+        self._response = memoryview(response.encode())
+
+    def _write_response(self):
+        try:
+            sent = self._client.send(self._response)
+        except OSError as e:
+            if _would_block(e):
+                return
+            raise
+        self._response = self._response[sent:]
+        if not len(self._response):
+            self._drop_client()
+
+    def _drop_client(self):
+        if self._client is not None:
+            try:
+                self._client.close()
+            except OSError:
+                pass
+        self._client = None
+        self._request = b''
+        self._response = None
+
+    def close(self):
+        self._drop_client()
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
@@ -0,0 +1,257 @@
+"""
+Durable outbox for place/receive confirmations
+Entries are appended to a log file on flash and delivered in the background
+"""
+
+import os
+import time
+
+try:
+    import ujson
+except ImportError:
+    import json as ujson
+
+try:
+    import ubinascii as binascii
+except ImportError:
+    import binascii
+
+try:
+    from random import getrandbits
+except ImportError:
+    def getrandbits(bits):
+        return 0
+
+try:
+    from _thread import allocate_lock
+except ImportError:
+    # Single-threaded port, nothing to serialize
+    class _NoLock:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+    def allocate_lock():
+        return _NoLock()
+
+# Operations stored in the outbox
+OP_PLACE = "place"
+OP_RECEIVE = "receive"
+
+
+def new_idempotency_key():
+    """Random key so the backend can drop duplicate deliveries"""
+    return binascii.hexlify(os.urandom(8)).decode()
+
+
+class OutboxEntry:
+    def __init__(self, key, op, args):
+        self.key = key
+        self.op = op
+        self.args = args
+
+    def __str__(self):
+        return f"OutboxEntry({self.op}, key={self.key}, {self.args})"
+
+
+class Outbox:
+    """Append-only, flash-backed queue of confirmations.
+
+    Every enqueue and every acknowledgement is one appended JSON line, so a
+    reset at any point loses at most the line being written. Pending entries
+    are rebuilt on start by replaying the log. The file is removed once
+    nothing is pending, and rewritten with only the pending entries once
+    compact_after acknowledgements have piled up while some are still stuck.
+
+    sender(entries) delivers a list of entries and returns one result per
+    entry: True (delivered), None (rejected for good, dropped) or False
+    (retry later). A sender should give up on the round at the first
+    transport failure and return False for the rest, so an offline drain
+    costs one timeout. Failed rounds back off exponentially, and entries
+    enqueued meanwhile wait for the same window, so an offline box does not
+    pay a timeout for every new confirmation. Dropped
+    entries are kept in rejected until take_rejected() so the caller can
+    roll back what it already did locally.
+
+    drain() may run in a worker thread while enqueue() runs on the main
+    one; the log file and the pending list are guarded by a lock that is
+    not held while the sender is talking to the network.
+    """
+
+    def __init__(self, path, sender, backoff_base=5, backoff_max=300, compact_after=32):
+        self.path = path
+        self.sender = sender
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.compact_after = compact_after
+
+        self.pending = []
+        self.rejected = []
+        self.failures = 0
+        self.next_attempt = 0
+        # Ack lines in the log file since it was last rewritten
+        self.acks = 0
+        self._lock = allocate_lock()
+
+        # Counters for diagnostics
+        self.delivered = 0
+        self.dropped = 0
+        self.compactions = 0
+
+        self._load()
+
+    def _load(self):
+        entries = {}
+        order = []
+        acks = 0
+        self._recover_compaction()
+        try:
+            with open(self.path, 'r') as f:
+                for line in f:
+                    try:
+                        record = ujson.loads(line)
+                    except ValueError:
+                        # Torn last line after a reset
+                        continue
+                    key = record.get('key')
+                    if record.get('ack'):
+                        entries.pop(key, None)
+                        acks += 1
+                    else:
+                        entries[key] = OutboxEntry(key, record.get('op'), record.get('args', {}))
+                        order.append(key)
+        except OSError:
+            return
+
+        self.pending = [entries[key] for key in order if key in entries]
+        self.acks = acks
+        if self.pending:
+            print(f"[OUTBOX] Restored {len(self.pending)} pending entries")
+        else:
+            self._remove_file()
+
+    def _append(self, record):
+        with open(self.path, 'a') as f:
+            f.write(ujson.dumps(record) + "\n")
+
+    def _remove_file(self):
+        self.acks = 0
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def _compact(self):
+        """Rewrites the log with only the pending entries"""
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as f:
+            for entry in self.pending:
+                f.write(ujson.dumps({'key': entry.key, 'op': entry.op, 'args': entry.args}) + "\n")
+        try:
+            os.rename(temp_path, self.path)
+        except OSError:
+            # Filesystems whose rename does not replace an existing file
+            os.remove(self.path)
+            os.rename(temp_path, self.path)
+        self.acks = 0
+        self.compactions += 1
+        print(f"[OUTBOX] Compacted log to {len(self.pending)} entries")
+
+    def _recover_compaction(self):
+        """Finishes or discards a compaction interrupted by a reset"""
+        temp_path = self.path + '.tmp'
+        try:
+            os.stat(temp_path)
+        except OSError:
+            return
+        try:
+            os.stat(self.path)
+        except OSError:
+            # Reset between removing the old log and renaming the new one
+            os.rename(temp_path, self.path)
+            return
+        # The old log is still complete, the new one may be torn
+        os.remove(temp_path)
+
+    def enqueue(self, op, args):
+        """Durably records an operation and returns its idempotency key"""
+        key = new_idempotency_key()
+        with self._lock:
+            self._append({'key': key, 'op': op, 'args': args})
+            self.pending.append(OutboxEntry(key, op, args))
+        print(f"[OUTBOX] Queued {op} {args}")
+        return key
+
+    def is_due(self, now=None):
+        """True if there is pending work and the backoff window has passed"""
+        if not self.pending:
+            return False
+        if now is None:
+            now = time.time()
+        return now >= self.next_attempt
+
+    def drain(self, now=None):
+        """Tries to deliver all pending entries once. Returns the number delivered."""
+        if not self.is_due(now):
+            return 0
+        if now is None:
+            now = time.time()
+
+        with self._lock:
+            entries = list(self.pending)
+        try:
+            results = self.sender(entries)
+        except Exception as e:
+            print(f"[OUTBOX] Send error: {e}")
+            results = [False] * len(entries)
+
+        done = 0
+        retry = False
+        with self._lock:
+            for entry, result in zip(entries, results):
+                if result is False:
+                    retry = True
+                    continue
+                self._append({'key': entry.key, 'ack': True})
+                self.acks += 1
+                self.pending.remove(entry)
+                if result is None:
+                    self.dropped += 1
+                    self.rejected.append(entry)
+                    print(f"[OUTBOX] Dropped rejected {entry}")
+                else:
+                    self.delivered += 1
+                    done += 1
+
+            if not self.pending:
+                self._remove_file()
+            elif self.acks >= self.compact_after:
+                try:
+                    self._compact()
+                except OSError as e:
+                    print(f"[OUTBOX] Compaction failed: {e}")
+
+        if retry:
+            self.failures += 1
+            delay = min(self.backoff_max, self.backoff_base * (2 ** (self.failures - 1)))
+            # Up to 25% jitter so a fleet does not retry in lockstep
+            delay += delay * getrandbits(8) / 1024
+            self.next_attempt = now + delay
+            print(f"[OUTBOX] {len(self.pending)} pending, next attempt in {delay:.0f}s")
+        else:
+            self.failures = 0
+            self.next_attempt = 0
+
+        return done
+
+    def take_rejected(self):
+        """Returns and forgets the entries dropped since the last call"""
+        with self._lock:
+            rejected = self.rejected
+            self.rejected = []
+        return rejected
+
+    def __len__(self):
+        return len(self.pending)
@@ -0,0 +1,584 @@
+"""
+Locker placement algorithm
+Pure Python, shared by the firmware and host-side tools
+"""
+
+from array import array
+from bisect import bisect_left, insort
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def efficiency_score(utilization_percent, optimal_min, optimal_max):
+    """Score 0-100 of a locker fill level; 100 inside [optimal_min, optimal_max]"""
+    if optimal_min <= utilization_percent <= optimal_max:
+        efficiency = 100.0
+    elif utilization_percent < optimal_min:
+        efficiency = 70.0 + (utilization_percent / optimal_min) * 30.0
+    else:
+        penalty = ((utilization_percent - optimal_max) / 15.0) * 30.0
+        efficiency = 100.0 - penalty
+
+    return max(0.0, min(100.0, efficiency))
+
+
+def _placement(locker_id, utilization_percent, efficiency, package_volume):
+    return {
+        'lockerId': locker_id,
+        'utilization': utilization_percent,
+        'efficiency': efficiency,
+        'volume': package_volume
+    }
+
+
+def find_locker_linear(lockers, package_height, package_width, package_depth,
+                       optimal_min, optimal_max):
+    """Reference algorithm: scores every empty locker in lockers.
+
+    Lockers are visited by currentUsage, then list order; the first locker
+    with the highest score wins.
+    """
+    package_volume = package_height * package_width * package_depth
+    package_dims = sorted([package_height, package_width, package_depth])
+
+    best_locker = None
+    best_efficiency = -1
+
+    for locker in sorted(lockers, key=lambda x: x['currentUsage']):
+        max_volume = locker['maxVolume']
+        current_usage = locker['currentUsage']
+
+        if current_usage > 0:
+            continue
+
+        locker_dims = sorted([locker.get('height', 0), locker.get('width', 0), locker.get('depth', 0)])
+        if not all(p <= l for p, l in zip(package_dims, locker_dims)):
+            continue
+
+        if max_volume - current_usage >= package_volume:
+            utilization_percent = ((current_usage + package_volume) / max_volume) * 100.0
+            efficiency = efficiency_score(utilization_percent, optimal_min, optimal_max)
+
+            if efficiency > best_efficiency:
+                best_efficiency = efficiency
+                best_locker = _placement(locker['id'], utilization_percent, efficiency, package_volume)
+
+    return best_locker
+
+
+class _SizeClass:
+    """Lockers with the same sorted dimensions and max volume"""
+
+    def __init__(self, dims, max_volume):
+        self.dims = dims
+        self.max_volume = max_volume
+        # Positions (database order) of empty available lockers, ascending
+        self.free = []
+
+
+def _fit_box(boxes, dims):
+    """Index of the smallest free box that holds dims (sorted), or None"""
+    p0, p1, p2 = dims
+    best = None
+    best_volume = 0
+    for i, (d0, d1, d2) in enumerate(boxes):
+        if p0 <= d0 and p1 <= d1 and p2 <= d2:
+            volume = d0 * d1 * d2
+            if best is None or volume < best_volume:
+                best = i
+                best_volume = volume
+    return best
+
+
+def _split_box(box, dims):
+    """Guillotine cuts of box around a package in its corner.
+
+    The package is aligned smallest side to smallest side. The first cut
+    goes across the axis with the largest remainder so the biggest leftover
+    stays in one piece. Returns the non-empty leftover boxes (sorted dims).
+    """
+    rest = [box[i] - dims[i] for i in range(3)]
+    a, b, c = sorted(range(3), key=lambda i: rest[i], reverse=True)
+
+    pieces = []
+    piece = list(box)
+    piece[a] = rest[a]
+    pieces.append(piece)
+    piece = list(box)
+    piece[a] = dims[a]
+    piece[b] = rest[b]
+    pieces.append(piece)
+    piece = list(dims)
+    piece[c] = rest[c]
+    pieces.append(piece)
+    return [tuple(sorted(piece)) for piece in pieces if min(piece) > 0]
+
+
+class LockerIndex:
+    """Locker geometry precomputed once, grouped into size classes.
+
+    Size classes are kept ordered by max volume. A lookup skips every class
+    too small for the package by volume, checks dimensions and scores once
+    per class, and stops as soon as bigger classes can only score lower.
+    Which lockers are free is maintained by mark_occupied/mark_free, so the
+    result is the same as find_locker_linear over the available lockers
+    (including the tie-break on database order).
+
+    For co-location, lockers filled through place() also keep their free
+    space as a list of boxes and the id of the recipient they hold packages
+    for; find_shared() searches those. Recipients are matched by id only,
+    never by display name, so two people with the same name never share.
+    """
+
+    def __init__(self, lockers, optimal_min, optimal_max):
+        self.optimal_min = optimal_min
+        self.optimal_max = optimal_max
+
+        self.lockers = lockers
+        self._by_id = {}
+        # locker id -> (size class, position in lockers)
+        self._slots = {}
+        # locker id -> [recipient, free boxes] of partially used lockers
+        self._shared = {}
+
+        classes = {}
+        for position, locker in enumerate(lockers):
+            dims = tuple(sorted([locker.get('height', 0), locker.get('width', 0), locker.get('depth', 0)]))
+            key = dims + (locker['maxVolume'],)
+            size_class = classes.get(key)
+            if size_class is None:
+                size_class = classes[key] = _SizeClass(dims, locker['maxVolume'])
+            self._by_id[locker['id']] = locker
+            self._slots[locker['id']] = (size_class, position)
+            if locker['status'] == 'available' and locker['currentUsage'] == 0:
+                size_class.free.append(position)
+
+        self.classes = sorted(classes.values(), key=lambda c: c.max_volume)
+        self._volumes = [c.max_volume for c in self.classes]
+
+    def get(self, locker_id):
+        """Locker dict by id, or None"""
+        return self._by_id.get(locker_id)
+
+    def mark_occupied(self, locker_id):
+        """Removes a locker from the free set"""
+        size_class, position = self._slots[locker_id]
+        i = bisect_left(size_class.free, position)
+        if i < len(size_class.free) and size_class.free[i] == position:
+            size_class.free.pop(i)
+
+    def mark_free(self, locker_id):
+        """Returns a locker to the free set"""
+        self._shared.pop(locker_id, None)
+        size_class, position = self._slots[locker_id]
+        i = bisect_left(size_class.free, position)
+        if i == len(size_class.free) or size_class.free[i] != position:
+            insort(size_class.free, position)
+
+    def free_count(self):
+        return sum(len(c.free) for c in self.classes)
+
+    def find(self, package_height, package_width, package_depth):
+        """Best free locker for the package as a placement dict, or None"""
+        package_volume = package_height * package_width * package_depth
+        p0, p1, p2 = sorted([package_height, package_width, package_depth])
+
+        best_class = None
+        best_efficiency = -1
+        best_position = None
+        best_utilization = 0
+
+        for i in range(bisect_left(self._volumes, package_volume), len(self.classes)):
+            size_class = self.classes[i]
+            utilization_percent = (package_volume / size_class.max_volume) * 100.0
+
+            if utilization_percent < self.optimal_min:
+                # Scores only fall from here on as the lockers get bigger
+                bound = efficiency_score(utilization_percent, self.optimal_min, self.optimal_max)
+                if bound < best_efficiency:
+                    break
+
+            if not size_class.free:
+                continue
+            d0, d1, d2 = size_class.dims
+            if p0 > d0 or p1 > d1 or p2 > d2:
+                continue
+
+            efficiency = efficiency_score(utilization_percent, self.optimal_min, self.optimal_max)
+            position = size_class.free[0]
+            if efficiency > best_efficiency or (efficiency == best_efficiency and position < best_position):
+                best_class = size_class
+                best_efficiency = efficiency
+                best_position = position
+                best_utilization = utilization_percent
+
+        if best_class is None:
+            return None
+        return _placement(self.lockers[best_position]['id'], best_utilization, best_efficiency, package_volume)
+
+    def place(self, locker_id, package_height, package_width, package_depth, recipient):
+        """Records a package put into a locker, before its usage is updated.
+
+        Only lockers that were empty (or already tracked) and packages with
+        a known recipient id are tracked; anything else leaves the locker
+        out of co-location until it is cleared. Space freed by a pickup is
+        not given back until the locker is empty and cleared.
+        """
+        locker = self._by_id.get(locker_id)
+        if locker is None:
+            return
+        dims = tuple(sorted([package_height, package_width, package_depth]))
+
+        if locker['currentUsage'] == 0:
+            self._shared.pop(locker_id, None)
+            if recipient is None:
+                return
+            size_class, _ = self._slots[locker_id]
+            shared = self._shared[locker_id] = [recipient, [size_class.dims]]
+        else:
+            shared = self._shared.get(locker_id)
+            if shared is None:
+                return
+            if shared[0] != recipient:
+                del self._shared[locker_id]
+                return
+
+        boxes = shared[1]
+        i = _fit_box(boxes, dims)
+        if i is None:
+            # Placed by hand where the packing found no room
+            del self._shared[locker_id]
+            return
+        boxes[i:i + 1] = _split_box(boxes[i], dims)
+
+    def find_shared(self, package_height, package_width, package_depth, recipient):
+        """Best partially used locker of recipient (id) the package fits into, or None"""
+        if recipient is None:
+            return None
+        package_volume = package_height * package_width * package_depth
+        dims = tuple(sorted([package_height, package_width, package_depth]))
+
+        best = None
+        best_efficiency = -1
+        best_position = None
+        for locker_id, (owner, boxes) in self._shared.items():
+            if owner != recipient or _fit_box(boxes, dims) is None:
+                continue
+            locker = self._by_id[locker_id]
+            position = self._slots[locker_id][1]
+            utilization_percent = ((locker['currentUsage'] + package_volume) / locker['maxVolume']) * 100.0
+            efficiency = efficiency_score(utilization_percent, self.optimal_min, self.optimal_max)
+            if efficiency > best_efficiency or (efficiency == best_efficiency and position < best_position):
+                best = _placement(locker_id, utilization_percent, efficiency, package_volume)
+                best_efficiency = efficiency
+                best_position = position
+        return best
+
+    def plan(self, packages):
+        """Assigns free lockers to all packages at once.
+
+        packages is a list of (height, width, depth). Returns one placement
+        dict (or None) per package. The plan places as many packages as
+        possible and, among those plans, maximises the total efficiency
+        score. Solved as a min-cost flow: package -> size class (cost
+        -efficiency) -> sink (capacity = free lockers in the class). The
+        index itself is not modified.
+        """
+        graph = _FlowGraph(len(packages) + len(self.classes) + 2)
+        source = 0
+        sink = len(packages) + len(self.classes) + 1
+        class_node = len(packages) + 1
+
+        for c, size_class in enumerate(self.classes):
+            if size_class.free:
+                graph.add_edge(class_node + c, sink, len(size_class.free), 0.0)
+
+        scores = []
+        for p, (height, width, depth) in enumerate(packages):
+            graph.add_edge(source, 1 + p, 1, 0.0)
+            package_volume = height * width * depth
+            p0, p1, p2 = sorted([height, width, depth])
+            options = {}
+            for c in range(bisect_left(self._volumes, package_volume), len(self.classes)):
+                size_class = self.classes[c]
+                d0, d1, d2 = size_class.dims
+                if not size_class.free or p0 > d0 or p1 > d1 or p2 > d2:
+                    continue
+                utilization_percent = (package_volume / size_class.max_volume) * 100.0
+                efficiency = efficiency_score(utilization_percent, self.optimal_min, self.optimal_max)
+                options[c] = (utilization_percent, efficiency)
+                graph.add_edge(1 + p, class_node + c, 1, -efficiency)
+            scores.append((package_volume, options))
+
+        graph.min_cost_flow(source, sink)
+
+        taken = {}
+        result = []
+        for p, (package_volume, options) in enumerate(scores):
+            placement = None
+            for edge in graph.edges_from(1 + p):
+                if graph.flow(edge) and graph.to[edge] >= class_node:
+                    c = graph.to[edge] - class_node
+                    n = taken.get(c, 0)
+                    taken[c] = n + 1
+                    utilization_percent, efficiency = options[c]
+                    position = self.classes[c].free[n]
+                    placement = _placement(self.lockers[position]['id'], utilization_percent,
+                                           efficiency, package_volume)
+                    break
+            result.append(placement)
+        return result
+
+    def plan_greedy(self, packages):
+        """Baseline for plan(): find() for each package in order"""
+        result = []
+        for height, width, depth in packages:
+            placement = self.find(height, width, depth)
+            if placement is not None:
+                self.mark_occupied(placement['lockerId'])
+            result.append(placement)
+        for placement in result:
+            if placement is not None:
+                self.mark_free(placement['lockerId'])
+        return result
+
+
+class LockerContents:
+    """Packages put into each locker since start: locker id -> {package id: volume}.
+
+    Lets a pickup take out one package's volume and keep the locker
+    occupied while other packages are still in it. Lockers filled before
+    start have unknown contents and are cleared on their first pickup.
+    """
+
+    def __init__(self):
+        self.lockers = {}
+
+    def add(self, locker_id, package_id, package_volume):
+        self.lockers.setdefault(locker_id, {})[package_id] = package_volume
+
+    def remove(self, locker_id, package_id):
+        """Forgets a collected package.
+
+        Returns its volume while other packages are left in the locker, or
+        None if the locker should be cleared: it was the last package, or
+        the package is not known to be there.
+        """
+        contents = self.lockers.get(locker_id)
+        if contents and package_id in contents:
+            package_volume = contents.pop(package_id)
+            if contents:
+                return package_volume
+        self.lockers.pop(locker_id, None)
+        return None
+
+    def count(self, locker_id):
+        """Number of known packages in a locker"""
+        return len(self.lockers.get(locker_id, ()))
+
+
+class VectorScorer:
+    """Alternative to find_locker_linear that keeps the bank in columns.
+
+    Sorted dimensions, max volume and current usage of every locker are
+    packed into array('i') columns (values must fit 32 bits) and a locker
+    is a position in them, so a lookup scores the whole bank in one pass
+    without dicts or sorting. With backend='numpy' (host only) the pass is
+    done with NumPy vector operations on the same columns. Results, ties
+    included, are the same as find_locker_linear over the available empty
+    lockers. The locker dicts stay the source of truth; mark_occupied and
+    mark_free copy their state into the columns.
+    """
+
+    def __init__(self, lockers, optimal_min, optimal_max, backend='array'):
+        if backend == 'numpy' and numpy is None:
+            raise ValueError("NumPy backend requested but numpy is not installed")
+        if backend not in ('array', 'numpy'):
+            raise ValueError(f"Unknown backend: {backend}")
+        self.optimal_min = optimal_min
+        self.optimal_max = optimal_max
+        self.backend = backend
+
+        self.lockers = lockers
+        self.size = len(lockers)
+        self._positions = {}
+
+        self.d0 = array('i')
+        self.d1 = array('i')
+        self.d2 = array('i')
+        self.max_volume = array('i')
+        self.usage = array('i')
+        self.available = array('b')
+        for position, locker in enumerate(lockers):
+            d0, d1, d2 = sorted([locker.get('height', 0), locker.get('width', 0), locker.get('depth', 0)])
+            self.d0.append(d0)
+            self.d1.append(d1)
+            self.d2.append(d2)
+            self.max_volume.append(locker['maxVolume'])
+            self.usage.append(locker['currentUsage'])
+            self.available.append(1 if locker['status'] == 'available' else 0)
+            self._positions[locker['id']] = position
+
+        if backend == 'numpy':
+            # Views share memory with the arrays, so updates are seen by both.
+            # _np_max_volume is the exception: an immutable float copy, since
+            # max volumes never change after construction
+            self._np_d0 = numpy.frombuffer(self.d0, dtype=numpy.int32)
+            self._np_d1 = numpy.frombuffer(self.d1, dtype=numpy.int32)
+            self._np_d2 = numpy.frombuffer(self.d2, dtype=numpy.int32)
+            self._np_max_volume = numpy.frombuffer(self.max_volume, dtype=numpy.int32).astype(numpy.float64)
+            self._np_usage = numpy.frombuffer(self.usage, dtype=numpy.int32)
+            self._np_available = numpy.frombuffer(self.available, dtype=numpy.int8)
+
+    def get(self, locker_id):
+        """Locker dict by id, or None"""
+        position = self._positions.get(locker_id)
+        return None if position is None else self.lockers[position]
+
+    def mark_occupied(self, locker_id):
+        """Copies the locker's usage into the columns and takes it out of the free set"""
+        position = self._positions[locker_id]
+        self.usage[position] = self.lockers[position]['currentUsage']
+        self.available[position] = 0
+
+    def mark_free(self, locker_id):
+        """Marks a locker empty and available"""
+        position = self._positions[locker_id]
+        self.usage[position] = 0
+        self.available[position] = 1
+
+    def find(self, package_height, package_width, package_depth):
+        """Best free locker for the package as a placement dict, or None"""
+        package_volume = package_height * package_width * package_depth
+        p0, p1, p2 = sorted([package_height, package_width, package_depth])
+        if self.backend == 'numpy':
+            position, utilization_percent, efficiency = self._find_numpy(package_volume, p0, p1, p2)
+        else:
+            position, utilization_percent, efficiency = self._find_array(package_volume, p0, p1, p2)
+        if position < 0:
+            return None
+        return _placement(self.lockers[position]['id'], utilization_percent, efficiency, package_volume)
+
+    def _find_array(self, package_volume, p0, p1, p2):
+        d0 = self.d0
+        d1 = self.d1
+        d2 = self.d2
+        max_volume = self.max_volume
+        usage = self.usage
+        available = self.available
+        optimal_min = self.optimal_min
+        optimal_max = self.optimal_max
+
+        best_position = -1
+        best_efficiency = -1.0
+        best_utilization = 0.0
+        for i in range(self.size):
+            if (usage[i] or not available[i] or p0 > d0[i] or p1 > d1[i] or p2 > d2[i]
+                    or max_volume[i] < package_volume):
+                continue
+            # Same arithmetic as efficiency_score, inlined
+            utilization_percent = (package_volume / max_volume[i]) * 100.0
+            if utilization_percent < optimal_min:
+                efficiency = 70.0 + (utilization_percent / optimal_min) * 30.0
+            elif utilization_percent <= optimal_max:
+                efficiency = 100.0
+            else:
+                efficiency = 100.0 - ((utilization_percent - optimal_max) / 15.0) * 30.0
+                if efficiency < 0.0:
+                    efficiency = 0.0
+            if efficiency > best_efficiency:
+                best_position = i
+                best_efficiency = efficiency
+                best_utilization = utilization_percent
+        return best_position, best_utilization, best_efficiency
+
+    def _find_numpy(self, package_volume, p0, p1, p2):
+        fits = ((self._np_usage == 0) & (self._np_available != 0)
+                & (self._np_d0 >= p0) & (self._np_d1 >= p1) & (self._np_d2 >= p2)
+                & (self._np_max_volume >= package_volume))
+        if not fits.any():
+            return -1, 0.0, -1.0
+        utilization = (package_volume / self._np_max_volume) * 100.0
+        efficiency = numpy.where(
+            utilization < self.optimal_min,
+            70.0 + (utilization / self.optimal_min) * 30.0,
+            numpy.where(utilization <= self.optimal_max, 100.0,
+                        100.0 - ((utilization - self.optimal_max) / 15.0) * 30.0))
+        efficiency = numpy.clip(efficiency, 0.0, 100.0)
+        efficiency[~fits] = -1.0
+        # argmax returns the first maximum, i.e. the lowest database position
+        position = int(numpy.argmax(efficiency))
+        return position, float(utilization[position]), float(efficiency[position])
+
+
+class _FlowGraph:
+    """Residual graph for min-cost flow (successive shortest paths)"""
+
+    def __init__(self, num_nodes):
+        self.adjacency = [[] for _ in range(num_nodes)]
+        self.to = []
+        self.capacity = []
+        self.cost = []
+        self._initial = []
+
+    def add_edge(self, u, v, capacity, cost):
+        self.adjacency[u].append(len(self.to))
+        self.to.append(v)
+        self.capacity.append(capacity)
+        self.cost.append(cost)
+        self._initial.append(capacity)
+        # Reverse edge
+        self.adjacency[v].append(len(self.to))
+        self.to.append(u)
+        self.capacity.append(0)
+        self.cost.append(-cost)
+        self._initial.append(0)
+
+    def edges_from(self, u):
+        return self.adjacency[u]
+
+    def flow(self, edge):
+        return self._initial[edge] - self.capacity[edge]
+
+    def min_cost_flow(self, source, sink):
+        """Pushes unit paths of least cost until the sink is unreachable"""
+        num_nodes = len(self.adjacency)
+        total = 0
+        while True:
+            # Bellman-Ford with a queue (SPFA); costs may be negative
+            distance = [None] * num_nodes
+            via = [-1] * num_nodes
+            in_queue = [False] * num_nodes
+            distance[source] = 0.0
+            queue = [source]
+            head = 0
+            while head < len(queue):
+                u = queue[head]
+                head += 1
+                in_queue[u] = False
+                for edge in self.adjacency[u]:
+                    if self.capacity[edge] <= 0:
+                        continue
+                    v = self.to[edge]
+                    candidate = distance[u] + self.cost[edge]
+                    if distance[v] is None or candidate < distance[v] - 1e-9:
+                        distance[v] = candidate
+                        via[v] = edge
+                        if not in_queue[v]:
+                            in_queue[v] = True
+                            queue.append(v)
+
+            if distance[sink] is None:
+                return total
+
+            # Every path carries one package
+            v = sink
+            while v != source:
+                edge = via[v]
+                self.capacity[edge] -= 1
+                self.capacity[edge ^ 1] += 1
+                v = self.to[edge ^ 1]
+            total += 1
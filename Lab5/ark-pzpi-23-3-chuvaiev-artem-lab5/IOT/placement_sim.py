@@ -0,0 +1,526 @@
+"""
+Host-side placement simulator and benchmark (CPython only, not copied to the board)
+Replays package arrival/pickup streams through placement.py against a config.json locker bank
+
+    python placement_sim.py generate --packages 2000 --out stream.jsonl
+    python placement_sim.py run --stream stream.jsonl --scale 10 --colocation
+    python placement_sim.py plan --size 100 --batch 16
+    python placement_sim.py bench --save bench.json
+    python placement_sim.py bench --compare bench.json --max-regression 25
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+
+from bench_util import benchmark
+from placement import LockerIndex, VectorScorer, find_locker_linear, numpy
+
+ENGINES = ('index', 'linear', 'vector', 'numpy')
+
+
+# ==========================================
+# Locker bank and streams
+# ==========================================
+
+def load_bank(config_path='config.json', scale=1, size=None):
+    """Returns (lockers, optimal_min, optimal_max) from a config.json.
+
+    The locker list is repeated scale times with fresh ids, or cycled until
+    there are exactly size lockers if size is given; every locker starts
+    empty and available.
+    """
+    with open(config_path) as f:
+        config = json.load(f)
+
+    algorithm = config.get('algorithm', {})
+    template = config.get('lockers', [])
+    if size is None:
+        size = len(template) * scale
+    lockers = []
+    for i in range(size if template else 0):
+        locker = dict(template[i % len(template)])
+        locker['id'] = i + 1
+        locker['currentUsage'] = 0
+        locker['status'] = 'available'
+        lockers.append(locker)
+    return (lockers, algorithm.get('optimal_utilization_min', 60),
+            algorithm.get('optimal_utilization_max', 85))
+
+
+def synthetic_stream(packages=1000, arrivals_per_hour=1.0, dwell_hours=4.0, recipients=200,
+                     min_size=50, max_size=450, seed=1):
+    """Arrival and pickup events for random packages, ordered by time.
+
+    Arrivals are a Poisson process, pickups follow after an exponentially
+    distributed dwell time. Each event is a dict:
+    {'t': hours, 'event': 'arrive', 'id', 'height', 'width', 'depth', 'recipient'}
+    or {'t': hours, 'event': 'pickup', 'id'}.
+    """
+    rng = random.Random(seed)
+    events = []
+    t = 0.0
+    for package_id in range(1, packages + 1):
+        t += rng.expovariate(arrivals_per_hour)
+        events.append({
+            't': t,
+            'event': 'arrive',
+            'id': package_id,
+            'height': rng.randint(min_size, max_size),
+            'width': rng.randint(min_size, max_size),
+            'depth': rng.randint(min_size, max_size),
+            'recipient': f"r{rng.randrange(recipients)}"
+        })
+        events.append({'t': t + rng.expovariate(1.0 / dwell_hours), 'event': 'pickup', 'id': package_id})
+    # Stable sort keeps an arrival ahead of a pickup at the same time
+    events.sort(key=lambda e: e['t'])
+    return events
+
+
+def read_stream(path):
+    """Events from a JSON lines file in the synthetic_stream format"""
+    events = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                events.append(json.loads(line))
+    return events
+
+
+def write_stream(events, path):
+    with open(path, 'w') as f:
+        for event in events:
+            f.write(json.dumps(event) + '\n')
+
+
+# ==========================================
+# Simulation
+# ==========================================
+
+def _percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, int(len(sorted_values) * p / 100.0))
+    return sorted_values[k]
+
+
+class Simulation:
+    """Drives placement.py the way main.py does.
+
+    engine 'index' uses LockerIndex.find (what the firmware calls by
+    default), 'linear' the reference find_locker_linear over the available
+    lockers, 'vector' and 'numpy' VectorScorer with either backend.
+    With colocation, find_shared is tried first, as in the courier handler.
+    A pickup removes only that package's volume, like clear_locker_state;
+    the locker is freed when its last package is collected.
+    """
+
+    def __init__(self, lockers, optimal_min, optimal_max, engine='index', colocation=False):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine: {engine}")
+        self.lockers = lockers
+        self.engine = engine
+        self.colocation = colocation
+        self.optimal_min = optimal_min
+        self.optimal_max = optimal_max
+        self.index = LockerIndex(lockers, optimal_min, optimal_max)
+        self.scorer = None
+        if engine == 'vector':
+            self.scorer = VectorScorer(lockers, optimal_min, optimal_max)
+        elif engine == 'numpy':
+            self.scorer = VectorScorer(lockers, optimal_min, optimal_max, 'numpy')
+        self.capacity = sum(locker['maxVolume'] for locker in lockers)
+
+        # package id -> locker id, locker id -> {package id: volume}
+        self.location = {}
+        self.contents = {}
+
+        self.arrivals = 0
+        self.rejected = 0
+        self.pickups = 0
+        self.efficiency_total = 0.0
+        self.utilization_total = 0.0
+        self.shared_placements = 0
+        self.latencies_ns = []
+
+        self.used_volume = 0
+        self.peak_lockers = 0
+        self._volume_hours = 0.0
+        self._start = None
+        self._last_t = None
+
+    def _find(self, height, width, depth, recipient):
+        if self.colocation:
+            placement = self.index.find_shared(height, width, depth, recipient)
+            if placement is not None:
+                return placement, True
+        if self.engine == 'index':
+            return self.index.find(height, width, depth), False
+        if self.scorer is not None:
+            return self.scorer.find(height, width, depth), False
+        available = [locker for locker in self.lockers
+                     if locker['status'] == 'available' and locker['currentUsage'] == 0]
+        return find_locker_linear(available, height, width, depth,
+                                  self.optimal_min, self.optimal_max), False
+
+    def _advance(self, t):
+        if self._last_t is None:
+            self._start = t
+        else:
+            self._volume_hours += self.used_volume * (t - self._last_t)
+        self._last_t = t
+
+    def arrive(self, event):
+        self.arrivals += 1
+        height, width, depth = event['height'], event['width'], event['depth']
+        recipient = event.get('recipient')
+
+        start = time.perf_counter_ns()
+        placement, shared = self._find(height, width, depth, recipient)
+        self.latencies_ns.append(time.perf_counter_ns() - start)
+
+        if placement is None:
+            self.rejected += 1
+            return None
+
+        locker_id = placement['lockerId']
+        locker = self.index.get(locker_id)
+        if self.colocation:
+            self.index.place(locker_id, height, width, depth, recipient)
+        locker['currentUsage'] += placement['volume']
+        locker['status'] = 'occupied'
+        self.index.mark_occupied(locker_id)
+        if self.scorer is not None:
+            self.scorer.mark_occupied(locker_id)
+
+        self.location[event['id']] = locker_id
+        self.contents.setdefault(locker_id, {})[event['id']] = placement['volume']
+        self.used_volume += placement['volume']
+        self.peak_lockers = max(self.peak_lockers, len(self.contents))
+        self.efficiency_total += placement['efficiency']
+        self.utilization_total += placement['utilization']
+        if shared:
+            self.shared_placements += 1
+        return placement
+
+    def pickup(self, event):
+        locker_id = self.location.pop(event['id'], None)
+        if locker_id is None:
+            # Rejected at arrival
+            return
+        locker = self.index.get(locker_id)
+        contents = self.contents[locker_id]
+        volume = contents.pop(event['id'])
+        self.pickups += 1
+        self.used_volume -= volume
+        locker['currentUsage'] -= volume
+        if contents:
+            return
+        del self.contents[locker_id]
+        locker['currentUsage'] = 0
+        locker['status'] = 'available'
+        self.index.mark_free(locker_id)
+        if self.scorer is not None:
+            self.scorer.mark_free(locker_id)
+
+    def replay(self, events):
+        for event in events:
+            self._advance(event['t'])
+            if event['event'] == 'arrive':
+                self.arrive(event)
+            elif event['event'] == 'pickup':
+                self.pickup(event)
+        return self.report()
+
+    def report(self):
+        placed = self.arrivals - self.rejected
+        latencies = sorted(self.latencies_ns)
+        duration = (self._last_t - self._start) if self._last_t is not None else 0.0
+        return {
+            'engine': self.engine,
+            'colocation': self.colocation,
+            'lockers': len(self.lockers),
+            'arrivals': self.arrivals,
+            'placed': placed,
+            'rejected': self.rejected,
+            'rejection_rate': (self.rejected / self.arrivals * 100.0) if self.arrivals else 0.0,
+            'shared_placements': self.shared_placements,
+            'avg_efficiency': (self.efficiency_total / placed) if placed else 0.0,
+            'avg_utilization': (self.utilization_total / placed) if placed else 0.0,
+            'avg_bank_utilization': (self._volume_hours / (self.capacity * duration) * 100.0)
+                                    if duration and self.capacity else 0.0,
+            'peak_lockers_used': self.peak_lockers,
+            'latency_us': {
+                'mean': (sum(latencies) / len(latencies) / 1000.0) if latencies else 0.0,
+                'p50': _percentile(latencies, 50) / 1000.0,
+                'p90': _percentile(latencies, 90) / 1000.0,
+                'p99': _percentile(latencies, 99) / 1000.0,
+                'max': (latencies[-1] / 1000.0) if latencies else 0.0
+            }
+        }
+
+
+def print_report(report):
+    latency = report['latency_us']
+    print(f"engine={report['engine']} colocation={report['colocation']} lockers={report['lockers']}")
+    print(f"  arrivals {report['arrivals']}, placed {report['placed']}, rejected {report['rejected']} "
+          f"({report['rejection_rate']:.2f}%), shared {report['shared_placements']}")
+    print(f"  avg efficiency {report['avg_efficiency']:.2f}, avg locker utilization {report['avg_utilization']:.2f}%, "
+          f"avg bank utilization {report['avg_bank_utilization']:.2f}%, peak lockers used {report['peak_lockers_used']}")
+    print(f"  latency us: mean {latency['mean']:.1f}, p50 {latency['p50']:.1f}, p90 {latency['p90']:.1f}, "
+          f"p99 {latency['p99']:.1f}, max {latency['max']:.1f}")
+
+
+# ==========================================
+# Batch planning
+# ==========================================
+
+def random_batches(batches=50, batch_size=16, min_size=50, max_size=450, seed=1):
+    """Lists of (height, width, depth) for LockerIndex.plan"""
+    rng = random.Random(seed)
+    return [[(rng.randint(min_size, max_size), rng.randint(min_size, max_size),
+              rng.randint(min_size, max_size)) for _ in range(batch_size)]
+            for _ in range(batches)]
+
+
+def compare_plans(index, batches):
+    """Runs plan() and plan_greedy() on every batch against the same free lockers.
+
+    Returns {'plan': {...}, 'greedy': {...}} with placed packages, summed
+    efficiency of the placed ones and total time in microseconds.
+    """
+    report = {}
+    for name, method in (('plan', index.plan), ('greedy', index.plan_greedy)):
+        placed = 0
+        efficiency = 0.0
+        elapsed_ns = 0
+        for packages in batches:
+            start = time.perf_counter_ns()
+            placements = method(packages)
+            elapsed_ns += time.perf_counter_ns() - start
+            for placement in placements:
+                if placement is not None:
+                    placed += 1
+                    efficiency += placement['efficiency']
+        report[name] = {
+            'packages': sum(len(packages) for packages in batches),
+            'placed': placed,
+            'efficiency': efficiency,
+            'time_us': elapsed_ns / 1000.0
+        }
+    return report
+
+
+def print_plan_report(report):
+    for name in ('plan', 'greedy'):
+        result = report[name]
+        print(f"{name:<7} placed {result['placed']}/{result['packages']}, "
+              f"efficiency sum {result['efficiency']:.1f}, time {result['time_us']:.1f} us")
+
+
+# ==========================================
+# Benchmarks
+# ==========================================
+
+def _half_full_bank(config_path, size, seed):
+    """Bank of size lockers with about half of them occupied, plus its index"""
+    lockers, optimal_min, optimal_max = load_bank(config_path, size=size)
+    rng = random.Random(seed)
+    for locker in lockers:
+        if rng.random() < 0.5:
+            locker['currentUsage'] = locker['maxVolume'] // 2
+            locker['status'] = 'occupied'
+    return lockers, optimal_min, optimal_max, LockerIndex(lockers, optimal_min, optimal_max)
+
+
+def _check_same_lockers(name, engine_find, expected, queries):
+    """Fails the benchmark run if an engine picks different lockers than the reference"""
+    for query, reference in zip(queries, expected):
+        result = engine_find(*query)
+        assert result == reference, f"{name} chose {result} for {query}, find_locker_linear {reference}"
+
+
+def bench_cases(config_path='config.json', sizes=(10, 100, 1000, 10000), seed=1):
+    """Yields (name, func) of the placement benchmarks for banks of each size.
+
+    Before a bank is timed, every engine is checked to choose the same
+    lockers as find_locker_linear for all queries.
+    """
+    rng = random.Random(seed)
+    queries = [(rng.randint(50, 450), rng.randint(50, 450), rng.randint(50, 450)) for _ in range(64)]
+
+    for size in sizes:
+        lockers, optimal_min, optimal_max, index = _half_full_bank(config_path, size, seed)
+        available = [locker for locker in lockers
+                     if locker['status'] == 'available' and locker['currentUsage'] == 0]
+
+        def find_linear(available=available, optimal_min=optimal_min, optimal_max=optimal_max):
+            for height, width, depth in queries:
+                find_locker_linear(available, height, width, depth, optimal_min, optimal_max)
+
+        def find_index(index=index):
+            for height, width, depth in queries:
+                index.find(height, width, depth)
+
+        def plan_run(index=index):
+            index.plan(queries[:16])
+
+        expected = [find_locker_linear(available, height, width, depth, optimal_min, optimal_max)
+                    for height, width, depth in queries]
+        _check_same_lockers(f"find_index[{size}]", index.find, expected, queries)
+
+        yield f"find_linear[{size}]", find_linear
+        yield f"find_index[{size}]", find_index
+
+        for backend in ('array', 'numpy'):
+            if backend == 'numpy' and numpy is None:
+                continue
+            scorer = VectorScorer(lockers, optimal_min, optimal_max, backend)
+            _check_same_lockers(f"find_vector_{backend}[{size}]", scorer.find, expected, queries)
+
+            def find_vector(scorer=scorer):
+                for height, width, depth in queries:
+                    scorer.find(height, width, depth)
+
+            yield f"find_vector_{backend}[{size}]", find_vector
+
+        if size <= 1000:
+            yield f"plan16[{size}]", plan_run
+
+    def replay():
+        lockers, optimal_min, optimal_max = load_bank(config_path, 10)
+        Simulation(lockers, optimal_min, optimal_max, 'index', True).replay(events)
+
+    events = synthetic_stream(packages=300, seed=seed)
+    yield "replay300_colocation[60]", replay
+
+
+def run_benchmarks(config_path='config.json', rounds=20, only=None):
+    results = {}
+    for name, func in bench_cases(config_path):
+        if only and only not in name:
+            continue
+        results[name] = benchmark(func, rounds)
+        result = results[name]
+        print(f"{name:<28} median {result['median']:>10.1f} us  min {result['min']:>10.1f}  "
+              f"stddev {result['stddev']:>8.1f}  ({result['rounds']}x{result['iterations']})")
+    return results
+
+
+def compare_benchmarks(results, baseline, max_regression):
+    """Names of benchmarks whose median got slower than baseline by more than max_regression %"""
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        change = (result['median'] / before['median'] - 1.0) * 100.0
+        marker = ''
+        if change > max_regression:
+            regressions.append(name)
+            marker = '  REGRESSION'
+        print(f"{name:<28} {before['median']:>10.1f} -> {result['median']:>10.1f} us ({change:+.1f}%){marker}")
+    return regressions
+
+
+# ==========================================
+# Command line
+# ==========================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Locker placement simulator and benchmarks")
+    parser.add_argument('--config', default='config.json', help="config.json with the locker bank")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def add_stream_options(command):
+        command.add_argument('--packages', type=int, default=1000)
+        command.add_argument('--rate', type=float, default=1.0, help="arrivals per hour")
+        command.add_argument('--dwell', type=float, default=4.0, help="mean hours until pickup")
+        command.add_argument('--recipients', type=int, default=200)
+        command.add_argument('--size', type=int, nargs=2, default=(50, 450), metavar=('MIN', 'MAX'),
+                             help="package side range, mm")
+        command.add_argument('--seed', type=int, default=1)
+
+    generate = commands.add_parser('generate', help="write a synthetic stream as JSON lines")
+    add_stream_options(generate)
+    generate.add_argument('--out', required=True)
+
+    run = commands.add_parser('run', help="replay a stream and report")
+    add_stream_options(run)
+    run.add_argument('--stream', help="JSON lines stream (default: synthetic)")
+    run.add_argument('--scale', type=int, default=1, help="repeat the config bank this many times")
+    run.add_argument('--engine', choices=ENGINES, default='index')
+    run.add_argument('--colocation', action='store_true')
+    run.add_argument('--json', action='store_true', help="print the report as JSON")
+
+    plan = commands.add_parser('plan', help="compare batch plan() with greedy placement")
+    plan.add_argument('--size', type=int, default=60, help="lockers in the bank")
+    plan.add_argument('--occupied', type=float, default=0.5, help="fraction of lockers in use")
+    plan.add_argument('--batches', type=int, default=50)
+    plan.add_argument('--batch', type=int, default=16, help="packages per batch")
+    plan.add_argument('--seed', type=int, default=1)
+    plan.add_argument('--json', action='store_true', help="print the report as JSON")
+
+    bench = commands.add_parser('bench', help="time placement and compare with a baseline")
+    bench.add_argument('--rounds', type=int, default=20)
+    bench.add_argument('-k', dest='only', help="only benchmarks whose name contains this")
+    bench.add_argument('--save', help="write results to this JSON file")
+    bench.add_argument('--compare', help="baseline JSON written by --save")
+    bench.add_argument('--max-regression', type=float, default=20.0, help="allowed median slowdown, %%")
+
+    args = parser.parse_args(argv)
+
+    if args.command in ('generate', 'run') and not getattr(args, 'stream', None):
+        events = synthetic_stream(args.packages, args.rate, args.dwell, args.recipients,
+                                  args.size[0], args.size[1], args.seed)
+
+    if args.command == 'generate':
+        write_stream(events, args.out)
+        print(f"Wrote {len(events)} events to {args.out}")
+        return 0
+
+    if args.command == 'run':
+        if args.stream:
+            events = read_stream(args.stream)
+        lockers, optimal_min, optimal_max = load_bank(args.config, args.scale)
+        report = Simulation(lockers, optimal_min, optimal_max, args.engine, args.colocation).replay(events)
+        if args.json:
+            print(json.dumps(report, indent=2))
+        else:
+            print_report(report)
+        return 0
+
+    if args.command == 'plan':
+        lockers, optimal_min, optimal_max = load_bank(args.config, size=args.size)
+        rng = random.Random(args.seed)
+        for locker in lockers:
+            if rng.random() < args.occupied:
+                locker['currentUsage'] = locker['maxVolume'] // 2
+                locker['status'] = 'occupied'
+        index = LockerIndex(lockers, optimal_min, optimal_max)
+        batches = random_batches(args.batches, args.batch, seed=args.seed)
+        report = compare_plans(index, batches)
+        if args.json:
+            print(json.dumps(report, indent=2))
+        else:
+            print_plan_report(report)
+        return 0
+
+    results = run_benchmarks(args.config, args.rounds, args.only)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved {len(results)} results to {args.save}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare_benchmarks(results, baseline, args.max_regression):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,8 +1,20 @@
 python -m mpremote connect port:rfc2217://localhost:4000 fs cp lcd_api.py :lcd_api.py
 python -m mpremote connect port:rfc2217://localhost:4000 fs cp i2c_lcd.py :i2c_lcd.py
+python -m mpremote connect port:rfc2217://localhost:4000 fs cp lcd_framebuffer.py :lcd_framebuffer.py
+python -m mpremote connect port:rfc2217://localhost:4000 fs cp keypad.py :keypad.py
+python -m mpremote connect port:rfc2217://localhost:4000 fs cp led_engine.py :led_engine.py
+python -m mpremote connect port:rfc2217://localhost:4000 fs cp http_client.py :http_client.py
+python -m mpremote connect port:rfc2217://localhost:4000 fs cp outbox.py :outbox.py
+python -m mpremote connect port:rfc2217://localhost:4000 fs cp lru_cache.py :lru_cache.py
+python -m mpremote connect port:rfc2217://localhost:4000 fs cp json_stream.py :json_stream.py
+python -m mpremote connect port:rfc2217://localhost:4000 fs cp placement.py :placement.py
 python -m mpremote connect port:rfc2217://localhost:4000 fs cp api_models.py :api_models.py
 python -m mpremote connect port:rfc2217://localhost:4000 fs cp localization.py :localization.py
 python -m mpremote connect port:rfc2217://localhost:4000 fs cp statistics.py :statistics.py
+python -m mpremote connect port:rfc2217://localhost:4000 fs cp stats_store.py :stats_store.py
+python -m mpremote connect port:rfc2217://localhost:4000 fs cp metrics_server.py :metrics_server.py
+python -m mpremote connect port:rfc2217://localhost:4000 fs cp states.py :states.py
+python -m mpremote connect port:rfc2217://localhost:4000 fs cp mailbox_async.py :mailbox_async.py
 python -m mpremote connect port:rfc2217://localhost:4000 fs cp main.py :main.py
 python -m mpremote connect port:rfc2217://localhost:4000 fs cp config.json :config.json
 python -m mpremote connect port:rfc2217://localhost:4000 fs cp config.py :config.py
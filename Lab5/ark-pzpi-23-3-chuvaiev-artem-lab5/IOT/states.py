@@ -0,0 +1,12 @@
+"""
+States of the NFC Mailbox state machine
+Shared by the blocking and the asyncio runtimes
+"""
+
+STATE_IDLE = "IDLE"
+STATE_MAIN_MENU = "MAIN_MENU"
+STATE_INPUT_SERIAL = "INPUT_SERIAL"
+STATE_COURIER_MODE = "COURIER_MODE"
+STATE_CLIENT_MODE = "CLIENT_MODE"
+STATE_PROCESSING = "PROCESSING"
+STATE_ERROR = "ERROR"
@@ -1,11 +1,204 @@
 import time
 import math
+from array import array
+
+# Поля кошика ковзного вікна
+W_NFC_SUCCESS = 0
+W_NFC_FAILED = 1
+W_DELIVERED = 2
+W_RECEIVED = 3
+W_LOCKERS_OPENED = 4
+W_CACHE_HITS = 5
+W_CACHE_MISSES = 6
+W_EFFICIENCY_SUM = 7
+W_UTILIZATION_SUM = 8
+W_OPERATION_TIME_SUM = 9
+W_OPERATIONS = 10
+W_API_TIME_SUM = 11
+W_API_CALLS = 12
+W_FIELDS = 13
+
+# Діапазон гістограми тривалості операцій, с
+OPERATION_MIN_SECONDS = 0.1
+OPERATION_MAX_SECONDS = 3600.0
+
+
+class RunningStats:
+    """Онлайн-накопичувач (Welford): кількість, середнє, дисперсія, min/max за O(1) пам'яті"""
+    
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+    
+    def add(self, value):
+        """Додати значення"""
+        self.count += 1
+        self.total += value
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+    
+    def get_average(self):
+        """Середнє значення (0.0 якщо даних немає)"""
+        if self.count == 0:
+            return 0.0
+        return self.total / self.count
+    
+    def get_std_deviation(self):
+        """Стандартне відхилення генеральної сукупності"""
+        if self.count < 2:
+            return 0.0
+        return math.sqrt(self.m2 / self.count)
+
+
+class LogHistogram:
+    """Гістограма з логарифмічними кошиками для оцінки перцентилів за O(1) пам'яті
+    
+    Значення від min_value до max_value діляться на buckets_per_decade кошиків
+    на кожен порядок; відносна похибка перцентиля - половина ширини кошика
+    (~6% при 20 кошиках на порядок). Значення поза межами потрапляють у крайні кошики;
+    перцентиль, що припадає на такий кошик, повертає відстежений min/max.
+    """
+    
+    def __init__(self, min_value=0.001, max_value=100.0, buckets_per_decade=20):
+        self.min_value = min_value
+        self.max_value = max_value
+        self.buckets_per_decade = buckets_per_decade
+        self.num_buckets = int(math.ceil(math.log10(max_value / min_value) * buckets_per_decade))
+        self.counts = [0] * self.num_buckets
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+    
+    def _bucket(self, value):
+        if value <= self.min_value:
+            return 0
+        index = int(math.log10(value / self.min_value) * self.buckets_per_decade)
+        return min(index, self.num_buckets - 1)
+    
+    def add(self, value):
+        """Додати значення"""
+        self.counts[self._bucket(value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+    
+    def percentile(self, p):
+        """Оцінка p-го перцентиля (0-100), 0.0 якщо даних немає"""
+        if self.count == 0:
+            return 0.0
+        rank = max(1, int(math.ceil(p / 100.0 * self.count)))
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                if index == self.num_buckets - 1 and self.max > self.max_value:
+                    # Кошик переповнення: точне положення невідоме
+                    return self.max
+                if index == 0 and self.min < self.min_value:
+                    return self.min
+                # Геометрична середина кошика, обмежена спостереженими min/max
+                value = self.min_value * 10 ** ((index + 0.5) / self.buckets_per_decade)
+                return min(max(value, self.min), self.max)
+        return self.max
+    
+    def percentiles(self, ps=(50, 90, 99)):
+        """Кілька перцентилів за один виклик"""
+        return tuple(self.percentile(p) for p in ps)
+
+
+class RollingWindow:
+    """Кільцевий буфер часових кошиків (напр. 60 x 1 хв) з W_FIELDS лічильниками в кожному
+    
+    Запис - O(1): кошик, що належить до старого періоду, обнуляється при
+    першому зверненні. Підсумок - O(кількість кошиків).
+    """
+    
+    def __init__(self, bucket_seconds, num_buckets, clock=time.time):
+        self.bucket_seconds = bucket_seconds
+        self.num_buckets = num_buckets
+        self.clock = clock
+        # Плоский масив num_buckets x W_FIELDS; float32 замість списку об'єктів
+        self.values = array('f', [0.0] * (num_buckets * W_FIELDS))
+        # Номер періоду, якому зараз належить кожен кошик
+        self.periods = array('l', [-1] * num_buckets)
+    
+    def _period(self, now=None):
+        if now is None:
+            now = self.clock()
+        return int(now // self.bucket_seconds)
+    
+    def add(self, field, value=1, now=None):
+        """Додати value до поля поточного кошика"""
+        period = self._period(now)
+        slot = period % self.num_buckets
+        base = slot * W_FIELDS
+        if self.periods[slot] != period:
+            for i in range(base, base + W_FIELDS):
+                self.values[i] = 0.0
+            self.periods[slot] = period
+        self.values[base + field] += value
+    
+    def totals(self, now=None):
+        """Суми всіх полів за останні num_buckets періодів"""
+        period = self._period(now)
+        oldest = period - self.num_buckets + 1
+        result = [0.0] * W_FIELDS
+        for slot in range(self.num_buckets):
+            if oldest <= self.periods[slot] <= period:
+                base = slot * W_FIELDS
+                for i in range(W_FIELDS):
+                    result[i] += self.values[base + i]
+        return result
+
+
+class ApiEndpointStats:
+    """Статистика викликів одного ендпоінта API"""
+    
+    def __init__(self):
+        self.calls = 0
+        self.failures = 0
+        # status_code -> кількість (0 - запит не вдався)
+        self.status_codes = {}
+        # фаза запиту -> RunningStats тривалості в мс
+        self.phases = {}
+        self.bytes_sent = 0
+        self.bytes_received = 0
+    
+    def add(self, status_code, phases, bytes_sent, bytes_received):
+        """Додати один виклик"""
+        self.calls += 1
+        if status_code == 0 or status_code >= 400:
+            self.failures += 1
+        self.status_codes[status_code] = self.status_codes.get(status_code, 0) + 1
+        for name, duration in phases.items():
+            accumulator = self.phases.get(name)
+            if accumulator is None:
+                accumulator = self.phases[name] = RunningStats()
+            accumulator.add(duration)
+        self.bytes_sent += bytes_sent
+        self.bytes_received += bytes_received
+
 
 class SystemStatistics:
     """Збір та аналіз статистики роботи NFC Mailbox системи"""
     
-    def __init__(self):
+    def __init__(self, store=None):
         self.start_time = time.time()
+        # Збільшується при кожному записі; StatsStore зберігає лише змінену статистику
+        self.revision = 0
         
         # Лічильники
         self.nfc_validations_success = 0
@@ -13,36 +206,94 @@ class SystemStatistics:
         self.packages_delivered = 0
         self.packages_received = 0
         self.lockers_opened = 0
+        self.validation_cache_hits = 0
+        self.validation_cache_misses = 0
+        
+        # Дані для аналізу (накопичувачі сталого розміру)
+        self.locker_utilizations = RunningStats()
+        self.efficiency_scores = RunningStats()
+        self.operation_times = RunningStats()
+        # Тривалість сеансів кур'єра/клієнта - секунди і хвилини, тож окремий діапазон
+        self.operation_latency = LogHistogram(OPERATION_MIN_SECONDS, OPERATION_MAX_SECONDS)
+        # Затримки API по ендпоінтах: endpoint -> LogHistogram
+        self.api_latency = {}
+        # Деталі викликів API по ендпоінтах: endpoint -> ApiEndpointStats
+        self.api_calls = {}
         
-        # Дані для аналізу
-        self.locker_utilizations = []
-        self.efficiency_scores = []
-        self.operation_times = []
+        # Ковзні вікна: остання година (60 x 1 хв) та остання доба (24 x 1 год)
+        self.last_hour = RollingWindow(60, 60)
+        self.last_day = RollingWindow(3600, 24)
+        
+        # Відновлення збереженої на флеші статистики
+        if store is not None:
+            store.load(self)
+    
+    def _record_window(self, field, value=1):
+        self.revision += 1
+        now = time.time()
+        self.last_hour.add(field, value, now)
+        self.last_day.add(field, value, now)
         
     def record_nfc_validation(self, success):
         """Записати результат валідації NFC"""
         if success:
             self.nfc_validations_success += 1
+            self._record_window(W_NFC_SUCCESS)
         else:
             self.nfc_validations_failed += 1
+            self._record_window(W_NFC_FAILED)
+    
+    def record_validation_cache(self, hit):
+        """Записати звернення до кешу валідацій NFC"""
+        if hit:
+            self.validation_cache_hits += 1
+            self._record_window(W_CACHE_HITS)
+        else:
+            self.validation_cache_misses += 1
+            self._record_window(W_CACHE_MISSES)
     
     def record_package_delivered(self, efficiency_score, utilization):
         """Записати доставку посилки"""
         self.packages_delivered += 1
-        self.efficiency_scores.append(efficiency_score)
-        self.locker_utilizations.append(utilization)
+        self.efficiency_scores.add(efficiency_score)
+        self.locker_utilizations.add(utilization)
+        self._record_window(W_DELIVERED)
+        self._record_window(W_EFFICIENCY_SUM, efficiency_score)
+        self._record_window(W_UTILIZATION_SUM, utilization)
     
     def record_package_received(self):
         """Записати отримання посилки"""
         self.packages_received += 1
+        self._record_window(W_RECEIVED)
     
     def record_locker_opened(self):
         """Записати відкриття комірки"""
         self.lockers_opened += 1
+        self._record_window(W_LOCKERS_OPENED)
     
     def record_operation_time(self, duration):
         """Записати час операції"""
-        self.operation_times.append(duration)
+        self.operation_times.add(duration)
+        self.operation_latency.add(duration)
+        self._record_window(W_OPERATIONS)
+        self._record_window(W_OPERATION_TIME_SUM, duration)
+    
+    def record_api_latency(self, endpoint, duration):
+        """Записати тривалість запиту до API"""
+        histogram = self.api_latency.get(endpoint)
+        if histogram is None:
+            histogram = self.api_latency[endpoint] = LogHistogram()
+        histogram.add(duration)
+        self._record_window(W_API_CALLS)
+        self._record_window(W_API_TIME_SUM, duration)
+    
+    def record_api_call(self, endpoint, status_code, phases, bytes_sent, bytes_received):
+        """Записати виклик API: код відповіді, тривалість фаз (мс) та обсяг даних"""
+        endpoint_stats = self.api_calls.get(endpoint)
+        if endpoint_stats is None:
+            endpoint_stats = self.api_calls[endpoint] = ApiEndpointStats()
+        endpoint_stats.add(status_code, phases, bytes_sent, bytes_received)
+        self.record_api_latency(endpoint, sum(phases.values()) / 1000.0)
     
     def get_uptime(self):
         """Отримати час роботи системи в секундах"""
@@ -55,36 +306,64 @@ class SystemStatistics:
             return 0.0
         return (self.nfc_validations_success / total) * 100.0
     
+    def get_validation_cache_hit_rate(self):
+        """Відсоток влучань у кеш валідацій NFC"""
+        total = self.validation_cache_hits + self.validation_cache_misses
+        if total == 0:
+            return 0.0
+        return (self.validation_cache_hits / total) * 100.0
+    
     def get_average_efficiency(self):
         """Середня ефективність розміщення посилок"""
-        if not self.efficiency_scores:
-            return 0.0
-        return sum(self.efficiency_scores) / len(self.efficiency_scores)
+        return self.efficiency_scores.get_average()
     
     def get_average_utilization(self):
         """Середнє використання комірок"""
-        if not self.locker_utilizations:
-            return 0.0
-        return sum(self.locker_utilizations) / len(self.locker_utilizations)
+        return self.locker_utilizations.get_average()
     
     def get_std_deviation_efficiency(self):
         """Стандартне відхилення ефективності"""
-        if len(self.efficiency_scores) < 2:
-            return 0.0
-        
-        mean = self.get_average_efficiency()
-        variance = sum((x - mean) ** 2 for x in self.efficiency_scores) / len(self.efficiency_scores)
-        return math.sqrt(variance)
+        return self.efficiency_scores.get_std_deviation()
     
     def get_average_operation_time(self):
         """Середній час операції"""
-        if not self.operation_times:
-            return 0.0
-        return sum(self.operation_times) / len(self.operation_times)
+        return self.operation_times.get_average()
+    
+    def get_operation_time_percentiles(self):
+        """p50/p90/p99 часу операції"""
+        return self.operation_latency.percentiles()
+    
+    def get_api_latency_percentiles(self):
+        """p50/p90/p99 затримки для кожного ендпоінта API"""
+        return {endpoint: histogram.percentiles()
+                for endpoint, histogram in self.api_latency.items()}
+    
+    def get_window_summary(self, window):
+        """Звіт за ковзне вікно (self.last_hour або self.last_day)"""
+        t = window.totals()
+        validations = t[W_NFC_SUCCESS] + t[W_NFC_FAILED]
+        cache_lookups = t[W_CACHE_HITS] + t[W_CACHE_MISSES]
+        delivered = t[W_DELIVERED]
+        
+        return {
+            'window_seconds': window.bucket_seconds * window.num_buckets,
+            'nfc_success_rate': t[W_NFC_SUCCESS] / validations * 100.0 if validations else 0.0,
+            'total_validations': int(validations),
+            'packages_delivered': int(delivered),
+            'packages_received': int(t[W_RECEIVED]),
+            'lockers_opened': int(t[W_LOCKERS_OPENED]),
+            'avg_efficiency': t[W_EFFICIENCY_SUM] / delivered if delivered else 0.0,
+            'avg_utilization': t[W_UTILIZATION_SUM] / delivered if delivered else 0.0,
+            'avg_operation_time': t[W_OPERATION_TIME_SUM] / t[W_OPERATIONS] if t[W_OPERATIONS] else 0.0,
+            'api_calls': int(t[W_API_CALLS]),
+            'avg_api_latency': t[W_API_TIME_SUM] / t[W_API_CALLS] if t[W_API_CALLS] else 0.0,
+            'validation_cache_hit_rate': t[W_CACHE_HITS] / cache_lookups * 100.0 if cache_lookups else 0.0
+        }
     
     def get_summary(self):
         """Отримати короткий звіт статистики"""
         uptime_hours = self.get_uptime() / 3600.0
+        op_p50, op_p90, op_p99 = self.get_operation_time_percentiles()
         
         return {
             'uptime_hours': uptime_hours,
@@ -96,7 +375,16 @@ class SystemStatistics:
             'avg_efficiency': self.get_average_efficiency(),
             'std_efficiency': self.get_std_deviation_efficiency(),
             'avg_utilization': self.get_average_utilization(),
-            'avg_operation_time': self.get_average_operation_time()
+            'avg_operation_time': self.get_average_operation_time(),
+            'operation_time_p50': op_p50,
+            'operation_time_p90': op_p90,
+            'operation_time_p99': op_p99,
+            'api_latency': self.get_api_latency_percentiles(),
+            'last_hour': self.get_window_summary(self.last_hour),
+            'last_day': self.get_window_summary(self.last_day),
+            'validation_cache_hits': self.validation_cache_hits,
+            'validation_cache_misses': self.validation_cache_misses,
+            'validation_cache_hit_rate': self.get_validation_cache_hit_rate()
         }
     
     def print_summary(self):
@@ -117,6 +405,39 @@ class SystemStatistics:
         
         if stats['avg_operation_time'] > 0:
             print(f"Avg Operation Time:  {stats['avg_operation_time']:.2f}s")
+            print(f"Operation p50/90/99: {stats['operation_time_p50']:.2f}/{stats['operation_time_p90']:.2f}/{stats['operation_time_p99']:.2f}s")
+        
+        for endpoint, (p50, p90, p99) in stats['api_latency'].items():
+            print(f"API {endpoint}: p50 {p50*1000:.0f}ms p90 {p90*1000:.0f}ms p99 {p99*1000:.0f}ms")
+        
+        if self.validation_cache_hits or self.validation_cache_misses:
+            print(f"NFC Cache Hits:      {self.validation_cache_hits}/{self.validation_cache_hits + self.validation_cache_misses} ({stats['validation_cache_hit_rate']:.1f}%)")
+        
+        for label, window in (("Last Hour", stats['last_hour']), ("Last Day", stats['last_day'])):
+            print(f"{label + ':':<21}NFC {window['nfc_success_rate']:.1f}% of {window['total_validations']}, "
+                  f"Pkg {window['packages_delivered']}/{window['packages_received']}, "
+                  f"API {window['api_calls']} x {window['avg_api_latency']*1000:.0f}ms")
+        
+        print("="*50 + "\n")
+    
+    def print_api_report(self):
+        """Вивести в консоль розбивку викликів API по ендпоінтах"""
+        print("\n" + "="*50)
+        print("API CALLS BY ENDPOINT")
+        print("="*50)
+        
+        if not self.api_calls:
+            print("No API calls recorded")
+        
+        for endpoint, endpoint_stats in self.api_calls.items():
+            p50, p90, p99 = self.api_latency[endpoint].percentiles()
+            codes = ' '.join(f"{code}x{count}" for code, count in sorted(endpoint_stats.status_codes.items()))
+            print(endpoint)
+            print(f"  Calls:    {endpoint_stats.calls} ({endpoint_stats.failures} failed), status {codes}")
+            print(f"  Latency:  p50 {p50*1000:.0f}ms p90 {p90*1000:.0f}ms p99 {p99*1000:.0f}ms")
+            phases = ' '.join(f"{name} {accumulator.get_average():.0f}" for name, accumulator in endpoint_stats.phases.items())
+            print(f"  Avg ms:   {phases}")
+            print(f"  Bytes:    {endpoint_stats.bytes_sent} sent, {endpoint_stats.bytes_received} received")
         
         print("="*50 + "\n")
     
@@ -128,4 +449,24 @@ class SystemStatistics:
         line2 = f"Eff:{stats['avg_efficiency']:.0f}% SR:{stats['nfc_success_rate']:.0f}%"
         
         return (line1[:16], line2[:16])
+    
+    def get_lcd_window_summary(self, window, label):
+        """Звіт за ковзне вікно для LCD"""
+        summary = self.get_window_summary(window)
+        
+        line1 = f"{label} SR:{summary['nfc_success_rate']:.0f}%"
+        line2 = f"Pkg:{summary['packages_delivered']}/{summary['packages_received']}"
+        
+        return (line1[:16], line2[:16])
+    
+    def get_lcd_latency_summary(self):
+        """Перцентилі часу операції для LCD, None якщо даних немає"""
+        if self.operation_latency.count == 0:
+            return None
+        p50, p90, p99 = self.get_operation_time_percentiles()
+        
+        line1 = f"Op p50:{p50:.1f}s"
+        line2 = f"p90:{p90:.1f} p99:{p99:.1f}"
+        
+        return (line1[:16], line2[:16])
 
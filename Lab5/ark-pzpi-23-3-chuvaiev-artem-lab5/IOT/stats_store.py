@@ -0,0 +1,319 @@
+"""
+Flash persistence for SystemStatistics
+Binary snapshots with a CRC, written to two alternating slot files
+"""
+
+import struct
+import time
+
+try:
+    from ubinascii import crc32
+except ImportError:
+    from binascii import crc32
+
+from statistics import RunningStats, LogHistogram, ApiEndpointStats, W_FIELDS
+
+MAGIC = b'NFCS'
+VERSION = 2
+
+# magic, version, flags, payload length, sequence number
+_HEADER = '<4sBBHI'
+_HEADER_SIZE = struct.calcsize(_HEADER)
+_CRC = '<I'
+_CRC_SIZE = struct.calcsize(_CRC)
+
+FLAG_WINDOWS = 0x01
+
+_COUNTERS = '<7I'
+_RUNNING = '<I5d'
+_HISTOGRAM = '<I3dH'
+_ENDPOINT = '<4I'
+_STATUS = '<hI'
+
+# Values that do not fit the fixed-size fields are clamped
+_MAX_NAME = 48
+_MAX_STATUS_CODES = 8
+_MAX_PHASES = 8
+
+_NAN = float('nan')
+
+
+def _opt(value):
+    return _NAN if value is None else value
+
+
+def _from_opt(value):
+    return None if value != value else value
+
+
+class _Reader:
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+
+    def read(self, fmt):
+        values = struct.unpack_from(fmt, self.data, self.pos)
+        self.pos += struct.calcsize(fmt)
+        return values
+
+    def read_bytes(self, length):
+        value = self.data[self.pos:self.pos + length]
+        self.pos += length
+        return value
+
+
+class StatsStore:
+    """Saves SystemStatistics snapshots to flash.
+
+    Snapshots go to two slot files in turn, each carrying a sequence number
+    and a CRC32, so a reset in the middle of a write only damages the slot
+    being written and the previous snapshot is still there. Periodic saves
+    happen at most once per min_interval seconds and only if something was
+    recorded since the last one. Per-endpoint API data is limited to
+    max_endpoints entries; the rolling windows (about 4 KB) can be left out.
+    """
+
+    def __init__(self, paths, min_interval=900, max_endpoints=8, save_windows=True):
+        self.paths = paths
+        self.min_interval = min_interval
+        self.max_endpoints = max_endpoints
+        self.save_windows = save_windows
+
+        self.sequence = 0
+        self.next_slot = 0
+        self.last_save = time.time()
+        self.saved_revision = 0
+
+        # Counters for diagnostics
+        self.writes = 0
+        self.bytes_written = 0
+
+    # ==========================================
+    # Slots
+    # ==========================================
+
+    def _read_slot(self, path):
+        """Returns (sequence, flags, payload) of a valid slot or None"""
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+
+        if len(data) < _HEADER_SIZE + _CRC_SIZE:
+            return None
+        magic, version, flags, length, sequence = struct.unpack_from(_HEADER, data, 0)
+        if magic != MAGIC or version != VERSION:
+            return None
+        end = _HEADER_SIZE + length
+        if len(data) < end + _CRC_SIZE:
+            return None
+        crc, = struct.unpack_from(_CRC, data, end)
+        if crc32(data[:end]) & 0xFFFFFFFF != crc:
+            return None
+        return sequence, flags, data[_HEADER_SIZE:end]
+
+    def load(self, stats):
+        """Restores the newest valid snapshot into stats. Returns True on success."""
+        newest = None
+        for slot, path in enumerate(self.paths):
+            snapshot = self._read_slot(path)
+            if snapshot is not None and (newest is None or snapshot[0] > newest[1][0]):
+                newest = (slot, snapshot)
+
+        if newest is None:
+            return False
+
+        slot, (sequence, flags, payload) = newest
+        self.sequence = sequence
+        self.next_slot = (slot + 1) % len(self.paths)
+        try:
+            _unpack(stats, payload, flags)
+        except (ValueError, struct.error) as e:
+            print(f"[STATS] Snapshot {sequence} unreadable: {e}")
+            return False
+        self.saved_revision = stats.revision
+        print(f"[STATS] Restored snapshot {sequence} from {self.paths[slot]}")
+        return True
+
+    def save(self, stats):
+        """Writes a snapshot to the next slot"""
+        flags = FLAG_WINDOWS if self.save_windows else 0
+        payload = _pack(stats, flags, self.max_endpoints)
+        self.sequence += 1
+        header = struct.pack(_HEADER, MAGIC, VERSION, flags, len(payload), self.sequence)
+        crc = crc32(header + payload) & 0xFFFFFFFF
+
+        path = self.paths[self.next_slot]
+        with open(path, 'wb') as f:
+            f.write(header)
+            f.write(payload)
+            f.write(struct.pack(_CRC, crc))
+
+        self.next_slot = (self.next_slot + 1) % len(self.paths)
+        self.last_save = time.time()
+        self.saved_revision = stats.revision
+        self.writes += 1
+        self.bytes_written += _HEADER_SIZE + len(payload) + _CRC_SIZE
+
+    def maybe_save(self, stats, now=None):
+        """Saves if min_interval has passed and stats changed. Returns True if written."""
+        if stats.revision == self.saved_revision:
+            return False
+        if now is None:
+            now = time.time()
+        if now - self.last_save < self.min_interval:
+            return False
+        try:
+            self.save(stats)
+        except OSError as e:
+            print(f"[STATS] Snapshot write failed: {e}")
+            self.last_save = now
+            return False
+        return True
+
+
+# ==========================================
+# Snapshot layout
+# ==========================================
+
+def _pack_running(parts, accumulator):
+    parts.append(struct.pack(_RUNNING, accumulator.count, accumulator.total, accumulator.mean,
+                             accumulator.m2, _opt(accumulator.min), _opt(accumulator.max)))
+
+
+def _unpack_running(reader, accumulator):
+    (accumulator.count, accumulator.total, accumulator.mean, accumulator.m2,
+     minimum, maximum) = reader.read(_RUNNING)
+    accumulator.min = _from_opt(minimum)
+    accumulator.max = _from_opt(maximum)
+
+
+def _pack_histogram(parts, histogram):
+    parts.append(struct.pack(_HISTOGRAM, histogram.count, histogram.total, _opt(histogram.min),
+                             _opt(histogram.max), histogram.num_buckets))
+    parts.append(struct.pack(f'<{histogram.num_buckets}I', *histogram.counts))
+
+
+def _unpack_histogram(reader, histogram):
+    count, total, minimum, maximum, num_buckets = reader.read(_HISTOGRAM)
+    counts = reader.read(f'<{num_buckets}I')
+    if num_buckets != histogram.num_buckets:
+        # Bucket layout changed, the old distribution cannot be mapped
+        return
+    histogram.count = count
+    histogram.total = total
+    histogram.min = _from_opt(minimum)
+    histogram.max = _from_opt(maximum)
+    histogram.counts = list(counts)
+
+
+def _pack_name(parts, name):
+    data = name.encode()[:_MAX_NAME]
+    parts.append(struct.pack('<B', len(data)))
+    parts.append(data)
+
+
+def _unpack_name(reader):
+    length, = reader.read('<B')
+    return reader.read_bytes(length).decode()
+
+
+def _pack_window(parts, window):
+    parts.append(struct.pack('<HH', window.num_buckets, W_FIELDS))
+    parts.append(struct.pack(f'<{window.num_buckets}l', *window.periods))
+    parts.append(struct.pack(f'<{len(window.values)}f', *window.values))
+
+
+def _unpack_window(reader, window):
+    num_buckets, fields = reader.read('<HH')
+    periods = reader.read(f'<{num_buckets}l')
+    values = reader.read(f'<{num_buckets * fields}f')
+    if num_buckets != window.num_buckets or fields != W_FIELDS:
+        return
+    for i in range(num_buckets):
+        window.periods[i] = periods[i]
+    for i in range(len(values)):
+        window.values[i] = values[i]
+
+
+def _pack(stats, flags, max_endpoints):
+    parts = [struct.pack(_COUNTERS,
+                         stats.nfc_validations_success, stats.nfc_validations_failed,
+                         stats.packages_delivered, stats.packages_received,
+                         stats.lockers_opened,
+                         stats.validation_cache_hits, stats.validation_cache_misses)]
+
+    _pack_running(parts, stats.locker_utilizations)
+    _pack_running(parts, stats.efficiency_scores)
+    _pack_running(parts, stats.operation_times)
+    _pack_histogram(parts, stats.operation_latency)
+
+    endpoints = list(stats.api_calls.items())[:max_endpoints]
+    parts.append(struct.pack('<B', len(endpoints)))
+    for endpoint, endpoint_stats in endpoints:
+        _pack_name(parts, endpoint)
+        parts.append(struct.pack(_ENDPOINT, endpoint_stats.calls, endpoint_stats.failures,
+                                 endpoint_stats.bytes_sent, endpoint_stats.bytes_received))
+
+        codes = list(endpoint_stats.status_codes.items())[:_MAX_STATUS_CODES]
+        parts.append(struct.pack('<B', len(codes)))
+        for code, count in codes:
+            parts.append(struct.pack(_STATUS, code, count))
+
+        phases = list(endpoint_stats.phases.items())[:_MAX_PHASES]
+        parts.append(struct.pack('<B', len(phases)))
+        for name, accumulator in phases:
+            _pack_name(parts, name)
+            _pack_running(parts, accumulator)
+
+        _pack_histogram(parts, stats.api_latency[endpoint])
+
+    if flags & FLAG_WINDOWS:
+        _pack_window(parts, stats.last_hour)
+        _pack_window(parts, stats.last_day)
+
+    return b''.join(parts)
+
+
+def _unpack(stats, payload, flags):
+    reader = _Reader(payload)
+
+    (stats.nfc_validations_success, stats.nfc_validations_failed,
+     stats.packages_delivered, stats.packages_received,
+     stats.lockers_opened,
+     stats.validation_cache_hits, stats.validation_cache_misses) = reader.read(_COUNTERS)
+
+    _unpack_running(reader, stats.locker_utilizations)
+    _unpack_running(reader, stats.efficiency_scores)
+    _unpack_running(reader, stats.operation_times)
+    _unpack_histogram(reader, stats.operation_latency)
+
+    count, = reader.read('<B')
+    for _ in range(count):
+        endpoint = _unpack_name(reader)
+        endpoint_stats = ApiEndpointStats()
+        (endpoint_stats.calls, endpoint_stats.failures,
+         endpoint_stats.bytes_sent, endpoint_stats.bytes_received) = reader.read(_ENDPOINT)
+
+        codes, = reader.read('<B')
+        for _ in range(codes):
+            code, code_count = reader.read(_STATUS)
+            endpoint_stats.status_codes[code] = code_count
+
+        phases, = reader.read('<B')
+        for _ in range(phases):
+            name = _unpack_name(reader)
+            accumulator = RunningStats()
+            _unpack_running(reader, accumulator)
+            endpoint_stats.phases[name] = accumulator
+
+        histogram = LogHistogram()
+        _unpack_histogram(reader, histogram)
+
+        stats.api_calls[endpoint] = endpoint_stats
+        stats.api_latency[endpoint] = histogram
+
+    if flags & FLAG_WINDOWS:
+        _unpack_window(reader, stats.last_hour)
+        _unpack_window(reader, stats.last_day)
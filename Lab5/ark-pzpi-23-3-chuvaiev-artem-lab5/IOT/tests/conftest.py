@@ -0,0 +1,8 @@
+"""Host-side tests: the firmware modules are imported straight from IOT/"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# The firmware's statistics.py shadows the standard library module of the same name
+sys.modules.pop('statistics', None)
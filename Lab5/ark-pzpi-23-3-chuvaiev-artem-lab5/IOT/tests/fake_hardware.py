@@ -0,0 +1,180 @@
+"""Stand-ins for machine.Pin / machine.Timer and the ticks clock"""
+
+
+class FakeClock:
+    """Millisecond tick counter advanced by the test"""
+
+    def __init__(self, now=0):
+        self.now = now
+
+    def ticks_ms(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += int(seconds * 1000)
+
+
+class FakePin:
+    IRQ_RISING = 1
+    IRQ_FALLING = 2
+
+    def __init__(self, value=0):
+        self._value = value
+        self.trigger = None
+        self.handler = None
+        # handler passed to every irq() call, in order
+        self.irq_calls = []
+
+    def on(self):
+        self._value = 1
+
+    def off(self):
+        self._value = 0
+
+    def value(self, value=None):
+        if value is None:
+            return self._value
+        self._value = value
+
+    def irq(self, trigger=None, handler=None):
+        self.trigger = trigger
+        self.handler = handler
+        self.irq_calls.append(handler)
+
+    def fire(self):
+        """Simulates a pin-change interrupt"""
+        if self.handler is not None:
+            self.handler(self)
+
+
+class FakeMatrix:
+    """Key matrix wired to FakePins: a column reads high while a pressed key's row is driven"""
+
+    def __init__(self, keys):
+        self.keys = keys
+        self.rows = [FakePin() for _ in keys]
+        self.cols = [_ColumnPin(self, col) for col in range(len(keys[0]))]
+        self.pressed = set()
+
+    def _position(self, key):
+        for row, labels in enumerate(self.keys):
+            if key in labels:
+                return row, labels.index(key)
+        raise KeyError(key)
+
+    def press(self, key):
+        row, col = self._position(key)
+        self.pressed.add((row, col))
+        self.cols[col].fire()
+
+    def release(self, key):
+        row, col = self._position(key)
+        self.pressed.discard((row, col))
+        self.cols[col].fire()
+
+
+class _ColumnPin(FakePin):
+    def __init__(self, matrix, col):
+        super().__init__()
+        self.matrix = matrix
+        self.col = col
+
+    def value(self, value=None):
+        for row, col in self.matrix.pressed:
+            if col == self.col and self.matrix.rows[row].value():
+                return 1
+        return 0
+
+
+class FakeTimer:
+    PERIODIC = 1
+    ONE_SHOT = 0
+
+    def __init__(self, timer_id):
+        self.timer_id = timer_id
+        self.callback = None
+        self.period = None
+
+    def init(self, period=None, mode=None, callback=None):
+        self.period = period
+        self.mode = mode
+        self.callback = callback
+
+    def deinit(self):
+        self.callback = None
+
+    def fire(self):
+        if self.callback is not None:
+            self.callback(self)
+
+
+class FakeI2C:
+    """I2C bus in front of a PCF8574 + HD44780 (4-bit mode) LCD.
+
+    Records every writeto() and decodes the nibble frames latched on the
+    falling edge of E into DDRAM writes, so tests can check both the bytes
+    on the bus and what the display ends up showing.
+    """
+
+    MASK_RS = 0x01
+    MASK_E = 0x04
+
+    def __init__(self, num_lines=2, num_columns=16):
+        self.num_lines = num_lines
+        self.num_columns = num_columns
+        self.transactions = []
+        self.ddram = {}
+        self.address = 0
+        self.commands = []
+        self.data_writes = 0
+        self._last = 0
+        self._nibble = None
+        self._four_bit = False
+
+    def writeto(self, addr, buf):
+        data = bytes(buf)
+        self.transactions.append(data)
+        for byte in data:
+            if self._last & self.MASK_E and not byte & self.MASK_E:
+                self._latch(self._last)
+            self._last = byte
+
+    def reset_log(self):
+        self.transactions = []
+        self.commands = []
+        self.data_writes = 0
+
+    def stream(self):
+        """All bytes written since the last reset_log(), transaction boundaries removed"""
+        return b''.join(self.transactions)
+
+    def _latch(self, frame):
+        nibble = frame >> 4
+        if not self._four_bit:
+            # Initialization nibbles until the interface is switched to 4-bit
+            if nibble == 0x2:
+                self._four_bit = True
+            return
+        if self._nibble is None:
+            self._nibble = nibble
+            return
+        value = self._nibble << 4 | nibble
+        self._nibble = None
+        if frame & self.MASK_RS:
+            self.ddram[self.address] = value
+            self.address += 1
+            self.data_writes += 1
+        else:
+            self.commands.append(value)
+            if value & 0x80:
+                self.address = value & 0x7F
+            elif value == 0x01:
+                self.ddram = {}
+                self.address = 0
+            elif value == 0x02:
+                self.address = 0
+
+    def line(self, row):
+        """Text shown on a display row"""
+        base = (0x40 if row & 1 else 0) + (0x14 if row & 2 else 0)
+        return ''.join(chr(self.ddram.get(base + col, 0x20)) for col in range(self.num_columns))
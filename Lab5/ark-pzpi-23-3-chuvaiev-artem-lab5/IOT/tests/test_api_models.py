@@ -0,0 +1,49 @@
+from api_models import ValidationResponse, parse_bulk_place_results, parse_validation_response
+
+PLACEMENTS = [(1, 10), (2, 11), (3, 12)]
+
+
+def test_bulk_results_by_package_id():
+    data = {'data': [
+        {'packageId': 2, 'success': False},
+        {'packageId': 1, 'success': True},
+        {'packageId': 3, 'isSuccess': True},
+    ]}
+    assert parse_bulk_place_results(data, PLACEMENTS) == [True, False, True]
+
+
+def test_bulk_results_missing_item_is_not_placed():
+    data = [{'packageId': 1, 'succeeded': True}]
+    assert parse_bulk_place_results(data, PLACEMENTS) == [True, False, False]
+
+
+def test_bulk_body_without_results_is_unknown():
+    assert parse_bulk_place_results(None, PLACEMENTS) is None
+    assert parse_bulk_place_results({'success': True}, PLACEMENTS) is None
+    assert parse_bulk_place_results({'data': None}, PLACEMENTS) is None
+    assert parse_bulk_place_results('OK', PLACEMENTS) is None
+
+
+VALIDATION = {'data': {'id': 7, 'name': 'Olena', 'email': 'olena@example.com', 'serialNfcData': 'AB12',
+                       'roles': [{'role': {'name': 'Courier'}}], 'isValid': True}}
+
+
+def test_validation_response_loads_all_fields_by_default():
+    user = parse_validation_response(VALIDATION)
+    assert (user.user_id, user.name, user.email, user.serial, user.is_valid) == \
+        (7, 'Olena', 'olena@example.com', 'AB12', True)
+    assert user.has_role('courier')
+
+
+def test_validation_response_projection_keeps_only_requested_fields():
+    user = parse_validation_response(VALIDATION, ())
+    assert user.name == 'Olena'
+    assert user.roles == ['Courier']
+    assert (user.user_id, user.email, user.serial, user.is_valid) == (None, None, None, None)
+
+    user = parse_validation_response(VALIDATION, ('user_id',))
+    assert user.user_id == 7 and user.email is None
+
+
+def test_validation_response_has_no_instance_dict():
+    assert not hasattr(ValidationResponse({}, ()), '__dict__')
@@ -0,0 +1,54 @@
+import io
+
+import pytest
+
+from http_client import HttpClient
+
+
+class FakeSocket:
+    def __init__(self, response):
+        self.response = response
+        self.sent = b''
+        self.closed = False
+
+    def sendall(self, data):
+        self.sent += data
+
+    def makefile(self, mode):
+        return io.BytesIO(self.response)
+
+    def close(self):
+        self.closed = True
+
+
+def connected_client(response):
+    client = HttpClient('http://backend.local:8080')
+    sock = FakeSocket(response)
+    client._sock = sock
+    client._stream = sock.makefile('rb')
+    return client, sock
+
+
+def test_keeps_connection_after_valid_response():
+    client, sock = connected_client(b'HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\n{}')
+    response = client.get('/api/ping')
+    assert response.status_code == 200
+    assert response.content == b'{}'
+    assert client._sock is sock and not sock.closed
+
+
+@pytest.mark.parametrize('response', [
+    b'HTTP/1.1 abc OK\r\n\r\n',
+    b'garbage\r\n\r\n',
+    b'HTTP/1.1 200 OK\r\nContent-Length: x\r\n\r\n',
+    b'HTTP/1.1 200 \xff\xfe\r\n\r\n',
+])
+def test_malformed_response_closes_connection(response):
+    timings = []
+    client, sock = connected_client(response)
+    client.observer = timings.append
+    with pytest.raises((ValueError, IndexError)):
+        client.get('/api/ping')
+    assert sock.closed
+    assert client._sock is None
+    assert timings[0].status_code == 0
@@ -0,0 +1,167 @@
+"""HttpClient against a real http.server on localhost"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from http_client import HttpClient
+
+BIG_BODY = bytes(range(256)) * 40
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body in one segment, no delayed-ACK stalls between requests
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, body, close=False):
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        # Dropped without "Connection: close", as an idle timeout would
+        self.close_connection = close
+
+    def do_GET(self):
+        state = self.server.state
+        state['requests'].append(self.path)
+        if self.path == '/ping':
+            self._reply(b'pong')
+        elif self.path == '/close-after':
+            self._reply(b'bye', close=True)
+        elif self.path == '/chunked':
+            self.send_response(200)
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for part in (b'{"lockers":', b'[1,2,3]', b'}'):
+                self.wfile.write(b'%x;ext=1\r\n%s\r\n' % (len(part), part))
+            self.wfile.write(b'0\r\nX-Trailer: 1\r\n\r\n')
+        elif self.path == '/big':
+            self._reply(BIG_BODY)
+
+    def do_POST(self):
+        state = self.server.state
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        state['requests'].append(self.path)
+        state['bodies'].append(body)
+        if self.path == '/slow':
+            state['release'].wait(5)
+        self._reply(b'{}')
+
+
+class Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Connections reset by the client are part of the tests
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = Server(('127.0.0.1', 0), Handler)
+    httpd.state = {'requests': [], 'bodies': [], 'release': threading.Event()}
+    thread = threading.Thread(target=httpd.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    yield httpd
+    httpd.state['release'].set()
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def make_client(server, timeout=5):
+    return HttpClient(f'http://127.0.0.1:{server.server_address[1]}', timeout=timeout)
+
+
+def test_connection_is_reused(server):
+    client = make_client(server)
+    for _ in range(5):
+        assert client.get('/ping').content == b'pong'
+    assert client.post('/post', json={'id': 1}).json() == {}
+    client.close()
+
+    assert client.requests == 6
+    assert client.connects < client.requests
+    assert client.connects == 1
+    assert server.state['bodies'] == [b'{"id": 1}']
+
+
+def test_reconnects_after_server_closes_idle_connection(server):
+    client = make_client(server)
+    assert client.get('/close-after').content == b'bye'
+
+    response = client.get('/ping')
+    client.close()
+
+    assert response.status_code == 200
+    assert response.content == b'pong'
+    assert client.connects == 2
+    assert server.state['requests'] == ['/close-after', '/ping']
+
+
+def test_post_is_not_resent_after_read_timeout(server):
+    client = make_client(server, timeout=0.3)
+    client.get('/ping')
+
+    with pytest.raises(OSError):
+        client.post('/slow', json={'packageId': 7})
+    assert client._sock is None
+
+    server.state['release'].set()
+    assert client.get('/ping').content == b'pong'
+    client.close()
+
+    assert server.state['requests'].count('/slow') == 1
+
+
+def test_chunked_body(server):
+    client = make_client(server)
+    response = client.get('/chunked')
+    assert response.json() == {'lockers': [1, 2, 3]}
+
+    # Trailers were consumed, the connection is still usable
+    assert client.get('/ping').content == b'pong'
+    client.close()
+    assert client.connects == 1
+
+
+def test_streamed_body_keeps_connection(server):
+    client = make_client(server)
+    response = client.get('/big', stream=True)
+    chunks = list(response.iter_content(500))
+    response.close()
+
+    assert b''.join(chunks) == BIG_BODY
+    assert max(len(chunk) for chunk in chunks) <= 500
+    assert client.get('/ping').content == b'pong'
+    client.close()
+    assert client.connects == 1
+
+
+def test_aborted_stream_reconnects(server):
+    client = make_client(server)
+    response = client.get('/big', stream=True)
+    first = next(iter(response.iter_content(100)))
+    response.close()
+
+    assert first == BIG_BODY[:100]
+    assert client._sock is None
+    assert client.get('/ping').content == b'pong'
+    client.close()
+    assert client.connects == 2
+
+
+def test_unfinished_stream_is_dropped_by_next_request(server):
+    client = make_client(server)
+    response = client.get('/big', stream=True)
+    next(iter(response.iter_content(100)))
+
+    # The rest of the body is still on the socket and must not be read as a response
+    assert client.get('/ping').content == b'pong'
+    client.close()
+    assert client.connects == 2
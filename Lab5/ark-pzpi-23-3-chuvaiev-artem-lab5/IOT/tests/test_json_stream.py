@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+from json_stream import iter_json_array
+
+DOCUMENTS = [
+    # Wrapped in a data member, after other members with nested values
+    ({'success': True, 'meta': {'data': [9, 9], 'note': 'x'},
+      'data': [{'id': 1, 'size': [1, 2, 3]}, {'id': 2, 'tags': {'a': {'b': []}}}]},
+     [{'id': 1, 'size': [1, 2, 3]}, {'id': 2, 'tags': {'a': {'b': []}}}]),
+    # Top-level array of scalars
+    ([1, -2.5, True, False, None, 'str', 1e3], [1, -2.5, True, False, None, 'str', 1e3]),
+    # Escapes and brackets inside strings
+    ({'value': [{'name': 'a "quoted" } ] , name', 'path': 'C:\\dir\\', 'u': '\u0457\u00e9'},
+                'tail\\', '[{,}]']},
+     [{'name': 'a "quoted" } ] , name', 'path': 'C:\\dir\\', 'u': '\u0457\u00e9'}, 'tail\\', '[{,}]']),
+    # Escaped quote inside a member name
+    ({'x\\"data': [0], 'data': [[], {}, [[1]]]}, [[], {}, [[1]]]),
+    # Empty and missing arrays
+    ({'data': []}, []),
+    ({'other': [1, 2]}, []),
+]
+
+
+def encode(document, indent=None):
+    return json.dumps(document, indent=indent, ensure_ascii=False).encode()
+
+
+@pytest.mark.parametrize('document, expected', DOCUMENTS)
+def test_split_at_every_chunk_boundary(document, expected):
+    body = encode(document, indent=1)
+    for split in range(len(body) + 1):
+        chunks = [body[:split], body[split:]]
+        assert list(iter_json_array(chunks)) == expected, split
+
+
+@pytest.mark.parametrize('document, expected', DOCUMENTS)
+def test_one_byte_chunks(document, expected):
+    body = encode(document)
+    chunks = [body[i:i + 1] for i in range(len(body))]
+    assert list(iter_json_array(chunks)) == expected
+
+
+def test_custom_keys():
+    body = encode({'data': [1], 'lockers': [{'lockerId': 3}]})
+    assert list(iter_json_array([body], ('lockers',))) == [{'lockerId': 3}]
+
+
+def test_yields_before_reading_the_rest():
+    body = encode({'data': [{'id': 1}, {'id': 2}]})
+    read = []
+
+    def chunks():
+        for i in range(0, len(body), 4):
+            read.append(i)
+            yield body[i:i + 4]
+
+    items = iter_json_array(chunks())
+    assert next(items) == {'id': 1}
+    assert len(read) < len(body) // 4
+
+
+def test_input_after_the_array_is_consumed():
+    consumed = []
+
+    def chunks():
+        yield b'{"data": [1, 2], "more": '
+        consumed.append(True)
+        yield b'"trailing"}'
+        consumed.append(True)
+
+    assert list(iter_json_array(chunks())) == [1, 2]
+    assert consumed == [True, True]
@@ -0,0 +1,198 @@
+import pytest
+
+import keypad
+from keypad import KEY_LONG_PRESS, KEY_PRESS, KeyQueue, Keypad
+from fake_hardware import FakeClock, FakeMatrix
+
+KEYS = [
+    ['1', '2', '3', 'A'],
+    ['4', '5', '6', 'B'],
+    ['7', '8', '9', 'C'],
+    ['*', '0', '#', 'D'],
+]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock(1000)
+    monkeypatch.setattr(keypad, 'ticks_ms', clock.ticks_ms)
+    monkeypatch.setattr(keypad, 'sleep_us', lambda us: None)
+    monkeypatch.setattr(keypad.time, 'sleep', clock.sleep)
+    return clock
+
+
+def make_keypad(**kwargs):
+    matrix = FakeMatrix(KEYS)
+    return matrix, Keypad(matrix.rows, matrix.cols, KEYS, **kwargs)
+
+
+def test_queue_is_fifo_across_wraparound():
+    queue = KeyQueue(3)
+    for key in 'abc':
+        assert queue.put(key)
+    assert queue.get() == 'a'
+    assert queue.put('d')
+    assert [queue.get() for _ in range(4)] == ['b', 'c', 'd', None]
+
+
+def test_queue_drops_new_events_when_full():
+    queue = KeyQueue(2)
+    assert queue.put(1) and queue.put(2)
+    assert not queue.put(3)
+    assert len(queue) == 2
+    assert [queue.get(), queue.get()] == [1, 2]
+    queue.put(4)
+    queue.clear()
+    assert len(queue) == 0 and queue.get() is None
+
+
+def test_idle_state_drives_rows_and_arms_column_irqs(clock):
+    matrix, pad = make_keypad()
+    assert all(row.value() == 1 for row in matrix.rows)
+    for col in matrix.cols:
+        assert col.handler == pad._on_irq
+        assert col.trigger == col.IRQ_RISING | col.IRQ_FALLING
+
+
+def test_scan_disarms_irqs_and_rearms_after(clock):
+    matrix, pad = make_keypad()
+    for col in matrix.cols:
+        col.irq_calls.clear()
+
+    matrix.press('5')
+
+    for col in matrix.cols:
+        # Disarmed for the scan, armed again afterwards
+        assert col.irq_calls == [None, pad._on_irq]
+    assert all(row.value() == 1 for row in matrix.rows)
+    assert pad.get_event() == (KEY_PRESS, '5')
+    assert not pad._scan_pending
+
+
+def test_scan_resolves_row_and_column(clock):
+    matrix, pad = make_keypad()
+    for key in ('1', 'B', '0', 'D'):
+        matrix.press(key)
+        matrix.release(key)
+        clock.now += 100
+    assert [pad.get_key() for _ in range(5)] == ['1', 'B', '0', 'D', None]
+
+
+def test_irq_while_scan_pending_is_ignored(clock, monkeypatch):
+    scheduled = []
+    monkeypatch.setattr(keypad, 'schedule', lambda func, arg: scheduled.append(func))
+    matrix, pad = make_keypad()
+
+    matrix.press('5')
+    matrix.cols[1].fire()
+    assert len(scheduled) == 1
+
+    scheduled[0](None)
+    assert not pad._scan_pending
+    assert pad.get_event() == (KEY_PRESS, '5')
+
+
+def test_full_schedule_queue_allows_retry(clock, monkeypatch):
+    def full(func, arg):
+        raise RuntimeError("schedule queue full")
+
+    monkeypatch.setattr(keypad, 'schedule', full)
+    matrix, pad = make_keypad()
+    matrix.press('5')
+    assert not pad._scan_pending
+    assert pad.get_event() is None
+
+
+def test_event_overflow_drops_newest(clock):
+    matrix, pad = make_keypad(queue_size=2)
+    for key in ('1', '2', '3'):
+        matrix.press(key)
+        matrix.release(key)
+        clock.now += 100
+    assert [pad.get_key() for _ in range(3)] == ['1', '2', None]
+
+
+def test_flush_discards_queued_events(clock):
+    matrix, pad = make_keypad()
+    matrix.press('7')
+    pad.flush()
+    assert pad.get_event() is None
+
+
+# ==========================================
+# Press / hold / release state machine
+# ==========================================
+
+def test_contact_bounce_is_swallowed(clock):
+    matrix, pad = make_keypad(debounce_ms=30)
+    matrix.press('5')
+    clock.now += 5
+    matrix.release('5')
+    clock.now += 10
+    matrix.press('5')
+    assert pad.get_event() == (KEY_PRESS, '5')
+    assert pad.get_event() is None
+
+    matrix.release('5')
+    clock.now += 30
+    matrix.press('5')
+    assert pad.get_event() == (KEY_PRESS, '5')
+
+
+def test_long_press_reported_once(clock):
+    matrix, pad = make_keypad(long_press_ms=800)
+    matrix.press('*')
+    assert pad.get_event() == (KEY_PRESS, '*')
+
+    clock.now += 799
+    assert pad.get_event() is None
+    clock.now += 1
+    assert pad.get_event() == (KEY_LONG_PRESS, '*')
+    clock.now += 2000
+    assert pad.get_event() is None
+
+    matrix.release('*')
+    assert pad.get_event() is None
+
+
+def test_get_key_skips_long_presses(clock):
+    matrix, pad = make_keypad(long_press_ms=800)
+    matrix.press('*')
+    clock.now += 1000
+    pad.poll()
+    matrix.release('*')
+    clock.now += 100
+    matrix.press('1')
+    assert pad.get_key() == '*'
+    assert pad.get_key() == '1'
+    assert pad.get_key() is None
+
+
+def test_held_keys_do_not_block_other_keys(clock):
+    matrix, pad = make_keypad()
+    matrix.press('1')
+    matrix.press('9')
+    assert [pad.get_key(), pad.get_key()] == ['1', '9']
+    matrix.release('1')
+    assert pad._down.keys() == {'9'}
+
+
+def test_poll_does_not_scan_when_no_key_is_down(clock, monkeypatch):
+    matrix, pad = make_keypad()
+    scans = []
+    monkeypatch.setattr(pad, '_read_keys', lambda: scans.append(True) or [])
+    pad.poll()
+    assert scans == []
+
+
+def test_wait_key_times_out(clock):
+    matrix, pad = make_keypad()
+    start = clock.now
+    assert pad.wait_key(timeout_ms=50) is None
+    assert clock.now - start >= 50
+
+
+def test_wait_event_returns_queued_event(clock):
+    matrix, pad = make_keypad()
+    matrix.press('#')
+    assert pad.wait_event(timeout_ms=50) == (KEY_PRESS, '#')
@@ -0,0 +1,205 @@
+import pytest
+
+import i2c_lcd
+import lcd_api
+from i2c_lcd import I2cLcd
+from lcd_framebuffer import LcdFrameBuffer
+from fake_hardware import FakeI2C
+
+ROWS = 2
+COLS = 16
+
+
+class NoSleep:
+    def sleep_ms(self, ms):
+        pass
+
+    def sleep_us(self, us):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(i2c_lcd, 'time', NoSleep())
+    monkeypatch.setattr(lcd_api, 'time', NoSleep())
+
+
+def make_lcd(cls=I2cLcd):
+    bus = FakeI2C(ROWS, COLS)
+    lcd = cls(bus, 0x27, ROWS, COLS)
+    bus.reset_log()
+    return bus, lcd
+
+
+# ==========================================
+# Framebuffer
+# ==========================================
+
+def test_first_frame_draws_every_cell():
+    bus, lcd = make_lcd()
+    fb = LcdFrameBuffer(lcd)
+    bus.reset_log()
+
+    fb.show("Hello", "World")
+
+    assert bus.line(0) == "Hello".ljust(COLS)
+    assert bus.line(1) == "World".ljust(COLS)
+
+
+def test_only_changed_cells_are_written():
+    bus, lcd = make_lcd()
+    fb = LcdFrameBuffer(lcd)
+    fb.show("Package 1/9", "ID: 1234")
+    bus.reset_log()
+
+    fb.show("Package 2/9", "ID: 1234")
+
+    assert bus.data_writes == 1
+    assert [cmd for cmd in bus.commands if cmd & 0x80] == [0x80 | 8]
+    assert bus.line(0) == "Package 2/9".ljust(COLS)
+    assert bus.line(1) == "ID: 1234".ljust(COLS)
+
+
+def test_close_changes_are_merged_into_one_run():
+    bus, lcd = make_lcd()
+    fb = LcdFrameBuffer(lcd)
+    fb.show("abcdefgh")
+    bus.reset_log()
+
+    # Cells 1 and 3 change, the unchanged cell 2 between them is cheaper to rewrite
+    fb.show("aXcYefgh")
+    assert bus.data_writes == 3
+    assert len(bus.commands) == 1
+    assert bus.line(0) == "aXcYefgh".ljust(COLS)
+
+    bus.reset_log()
+    # Cells 0 and 5 are far apart: two runs, one cell each
+    fb.show("ZXcYeQgh")
+    assert bus.data_writes == 2
+    assert len(bus.commands) == 2
+    assert bus.line(0) == "ZXcYeQgh".ljust(COLS)
+
+
+def test_repeated_frame_writes_nothing():
+    bus, lcd = make_lcd()
+    fb = LcdFrameBuffer(lcd)
+    fb.show("Courier mode", "Loading...")
+    bus.reset_log()
+
+    fb.show("Courier mode", "Loading...")
+    fb.show("Courier mode", "Loading...")
+
+    assert bus.transactions == []
+
+
+def test_shorter_text_clears_the_tail():
+    bus, lcd = make_lcd()
+    fb = LcdFrameBuffer(lcd)
+    fb.show("Validating...", "Please wait")
+    fb.show("Valid!")
+
+    assert bus.line(0) == "Valid!".ljust(COLS)
+    assert bus.line(1) == " " * COLS
+
+
+def test_invalidate_redraws_everything():
+    bus, lcd = make_lcd()
+    fb = LcdFrameBuffer(lcd)
+    fb.show("abc", "def")
+    fb.invalidate()
+    bus.reset_log()
+
+    fb.show("abc", "def")
+    assert bus.data_writes == ROWS * COLS
+
+
+# ==========================================
+# Cursor tracking and batching in putstr
+# ==========================================
+
+def test_putstr_sets_address_only_on_wrap():
+    bus, lcd = make_lcd()
+    lcd.move_to(0, 0)
+    bus.reset_log()
+
+    lcd.putstr("Serial Number:")
+    assert bus.commands == []
+    assert (lcd.cursor_x, lcd.cursor_y) == (14, 0)
+
+    lcd.putstr("ABCD")
+    # One DDRAM address command when the text wraps to the second line
+    assert bus.commands == [0x80 | 0x40]
+    assert (lcd.cursor_x, lcd.cursor_y) == (2, 1)
+    assert bus.line(0) == "Serial Number:AB"
+    assert bus.line(1).startswith("CD")
+
+
+def test_putstr_newline_and_last_line_wrap():
+    bus, lcd = make_lcd()
+    lcd.move_to(0, 0)
+    lcd.putstr("Hi\nThere")
+    assert bus.line(0) == "Hi".ljust(COLS)
+    assert bus.line(1) == "There".ljust(COLS)
+    assert (lcd.cursor_x, lcd.cursor_y) == (5, 1)
+
+    lcd.move_to(14, 1)
+    lcd.putstr("xyz")
+    # Past the last row the cursor goes back to the top
+    assert (lcd.cursor_x, lcd.cursor_y) == (1, 0)
+    assert bus.line(1).endswith("xy")
+    assert bus.line(0).startswith("z")
+
+
+def test_newline_right_after_full_line_is_not_doubled():
+    bus, lcd = make_lcd()
+    lcd.move_to(0, 0)
+    lcd.putstr("0123456789ABCDEF\nnext")
+    assert bus.line(0) == "0123456789ABCDEF"
+    assert bus.line(1) == "next".ljust(COLS)
+
+
+def test_one_transaction_per_run():
+    bus, lcd = make_lcd()
+    lcd.move_to(0, 0)
+    bus.reset_log()
+
+    lcd.putstr("Serial Number:")
+    assert len(bus.transactions) == 1
+
+
+@pytest.mark.parametrize('text', [
+    "Serial Number:",
+    "0123456789ABCDEFwrapped",
+    "Hi\nThere",
+    "0123456789ABCDEF\nnext",
+    "x" * (ROWS * COLS + 3)
+])
+def test_batched_bytes_equal_unbatched_stream(text):
+    from lcd_bench import UnbatchedI2cLcd
+
+    batched_bus, batched = make_lcd()
+    unbatched_bus, unbatched = make_lcd(UnbatchedI2cLcd)
+
+    for lcd in (batched, unbatched):
+        lcd.move_to(0, 0)
+        lcd.putstr(text)
+
+    assert len(batched_bus.transactions) < len(unbatched_bus.transactions)
+    assert batched_bus.stream() == unbatched_bus.stream()
+    assert batched_bus.ddram == unbatched_bus.ddram
+
+
+def test_tracked_cursor_matches_seeking_driver():
+    from lcd_bench import SeekingUnbatchedI2cLcd
+
+    text = "Package 1/9\nID: 1234567890123456"
+    tracked_bus, tracked = make_lcd()
+    seeking_bus, seeking = make_lcd(SeekingUnbatchedI2cLcd)
+
+    for lcd in (tracked, seeking):
+        lcd.move_to(0, 0)
+        lcd.putstr(text)
+
+    assert tracked_bus.ddram == seeking_bus.ddram
+    assert (tracked.cursor_x, tracked.cursor_y) == (seeking.cursor_x, seeking.cursor_y)
+    assert len(tracked_bus.commands) < len(seeking_bus.commands)
@@ -0,0 +1,87 @@
+from lru_cache import TtlLruCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entry_expires_after_ttl():
+    clock = FakeClock()
+    cache = TtlLruCache(4, ttl=10, clock=clock)
+    cache.put('a', 1)
+
+    clock.now = 9.9
+    assert cache.get('a') == (True, 1)
+    clock.now = 10
+    assert cache.get('a') == (False, None)
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_per_entry_ttl_overrides_default():
+    clock = FakeClock()
+    cache = TtlLruCache(4, ttl=300, clock=clock)
+    cache.put('bad', None, ttl=30)
+    cache.put('skipped', 1, ttl=0)
+
+    assert cache.get('bad') == (True, None)
+    assert cache.get('skipped') == (False, None)
+    clock.now = 30
+    assert cache.get('bad') == (False, None)
+
+
+def test_evicts_least_recently_used():
+    cache = TtlLruCache(3, ttl=100, clock=FakeClock())
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.put('c', 3)
+    cache.get('a')
+
+    cache.put('d', 4)
+    assert cache.get('b') == (False, None)
+    assert cache.get('a') == (True, 1)
+
+    cache.put('e', 5)
+    assert cache.get('c') == (False, None)
+    assert [cache.get(key)[0] for key in ('a', 'd', 'e')] == [True, True, True]
+
+
+def test_eviction_prefers_expired_entries():
+    clock = FakeClock()
+    cache = TtlLruCache(2, ttl=100, clock=clock)
+    cache.put('old', 1)
+    cache.put('short', 2, ttl=5)
+    cache.get('short')
+
+    clock.now = 6
+    cache.put('new', 3)
+    assert cache.get('old') == (True, 1)
+    assert cache.get('new') == (True, 3)
+
+
+def test_updating_a_key_does_not_evict():
+    cache = TtlLruCache(2, ttl=100, clock=FakeClock())
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.put('a', 10)
+    assert len(cache) == 2
+    assert cache.get('a') == (True, 10)
+    assert cache.get('b') == (True, 2)
+
+
+def test_invalidate_and_clear():
+    cache = TtlLruCache(4, ttl=100, clock=FakeClock())
+    cache.put('a', 1)
+    cache.put('b', 2)
+
+    cache.invalidate('a')
+    cache.invalidate('missing')
+    assert cache.get('a') == (False, None)
+    assert cache.get('b') == (True, 2)
+
+    cache.clear()
+    assert len(cache) == 0
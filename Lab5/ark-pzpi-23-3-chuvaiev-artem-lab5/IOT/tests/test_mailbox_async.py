@@ -0,0 +1,350 @@
+import asyncio
+import sys
+import threading
+import time
+import types
+
+import led_engine
+import mailbox_async
+from api_models import LockerPackage, Package, ValidationResponse
+from keypad import KEY_LONG_PRESS, KEY_PRESS
+from led_engine import LedEngine
+from mailbox_async import AsyncMailboxStateMachine, Device
+from outbox import OP_RECEIVE
+from states import STATE_CLIENT_MODE, STATE_COURIER_MODE, STATE_MAIN_MENU
+from statistics import SystemStatistics
+from fake_hardware import FakeClock, FakePin, FakeTimer
+
+
+class ScriptedKeypad:
+    """Keypad that hands out scripted (kind, key) events once the machine starts reading"""
+
+    def __init__(self, events=()):
+        self.events = list(events)
+        self.released = False
+
+    def get_event(self):
+        if self.released and self.events:
+            return self.events.pop(0)
+        return None
+
+    def flush(self):
+        self.released = True
+
+
+class FakeOutbox:
+    def __init__(self):
+        self.entries = []
+
+    def enqueue(self, op, args):
+        self.entries.append((op, args))
+
+    def is_due(self):
+        return False
+
+
+def make_device(**overrides):
+    calls = []
+
+    def recorder(name, result):
+        def func(*args):
+            calls.append((name,) + args)
+            return result
+        return func
+
+    options = dict(
+        lcd_print=lambda line1, line2: calls.append(('lcd', line1, line2)),
+        keypad=ScriptedKeypad(),
+        led_success=FakePin(),
+        led_error=FakePin(),
+        led_engine=LedEngine(),
+        relay=FakePin(),
+        stats=SystemStatistics(),
+        validate_nfc=recorder('validate_nfc', None),
+        get_courier_packages=recorder('get_courier_packages', []),
+        place_package=recorder('place_package', True),
+        place_packages_bulk=recorder('place_packages_bulk', []),
+        get_delivered_lockers=recorder('get_delivered_lockers', []),
+        mark_package_received=recorder('mark_package_received', True),
+        calculate_optimal_locker=recorder('calculate_optimal_locker', None),
+        update_locker_state=recorder('update_locker_state', None),
+        clear_locker_state=recorder('clear_locker_state', None),
+    )
+    options.update(overrides)
+    return Device(**options), calls
+
+
+def quick(machine, confirm='#'):
+    """Skips informational pauses and answers confirmations with confirm"""
+    async def pause(seconds):
+        return None
+
+    async def wait_confirmation(timeout_text):
+        return confirm
+
+    machine.pause = pause
+    machine.wait_confirmation = wait_confirmation
+    return machine
+
+
+def run(coro, timeout=5):
+    return asyncio.run(asyncio.wait_for(coro, timeout))
+
+
+def courier_package(package_id):
+    return Package({'id': package_id, 'height': 100, 'width': 100, 'depth': 100})
+
+
+def placement(locker_id):
+    return {'lockerId': locker_id, 'efficiency': 80.0, 'utilization': 50.0}
+
+
+# ==========================================
+# Keypad helpers
+# ==========================================
+
+def test_lcd_input_edits_buffer_from_events():
+    events = [(KEY_PRESS, '1'), (KEY_PRESS, '2'), (KEY_PRESS, '*'), (KEY_PRESS, 'A'),
+              (KEY_PRESS, '3'), (KEY_PRESS, '#')]
+    device, _ = make_device(keypad=ScriptedKeypad(events))
+    machine = AsyncMailboxStateMachine(device)
+
+    async def scenario():
+        machine.flush_keys()
+        task = asyncio.create_task(machine._poll_keypad())
+        try:
+            return await machine.lcd_input("Serial", numeric_only=True)
+        finally:
+            task.cancel()
+
+    assert run(scenario()) == '13'
+
+
+def test_long_press_star_clears_input():
+    events = [(KEY_PRESS, '1'), (KEY_PRESS, '2'), (KEY_LONG_PRESS, '*'), (KEY_PRESS, '5'), (KEY_PRESS, '#')]
+    device, _ = make_device(keypad=ScriptedKeypad(events))
+    machine = AsyncMailboxStateMachine(device)
+
+    async def scenario():
+        machine.flush_keys()
+        task = asyncio.create_task(machine._poll_keypad())
+        try:
+            return await machine.lcd_input("Serial")
+        finally:
+            task.cancel()
+
+    assert run(scenario()) == '5'
+
+
+def test_pause_is_cut_short_by_a_key():
+    device, _ = make_device(keypad=ScriptedKeypad([(KEY_LONG_PRESS, '1'), (KEY_PRESS, 'D')]))
+    machine = AsyncMailboxStateMachine(device)
+
+    async def scenario():
+        machine.flush_keys()
+        task = asyncio.create_task(machine._poll_keypad())
+        try:
+            start = time.monotonic()
+            key = await machine.pause(10)
+            return key, time.monotonic() - start
+        finally:
+            task.cancel()
+
+    key, elapsed = run(scenario())
+    assert key == 'D'
+    assert elapsed < 1
+
+
+def test_next_key_times_out():
+    device, _ = make_device()
+    machine = AsyncMailboxStateMachine(device)
+    assert run(machine.next_key(0.01)) is None
+
+
+def test_event_backlog_drops_oldest():
+    events = [(KEY_PRESS, str(i % 10)) for i in range(mailbox_async.KEY_EVENT_BACKLOG + 4)]
+    device, _ = make_device(keypad=ScriptedKeypad(events))
+    machine = AsyncMailboxStateMachine(device)
+
+    async def scenario():
+        machine.flush_keys()
+        task = asyncio.create_task(machine._poll_keypad())
+        while device.keypad.events:
+            await asyncio.sleep(0.001)
+        task.cancel()
+
+    run(scenario())
+    assert len(machine._events) == mailbox_async.KEY_EVENT_BACKLOG
+    assert machine._events[0] == (KEY_PRESS, '4')
+
+
+# ==========================================
+# API calls
+# ==========================================
+
+def test_api_calls_are_serialized():
+    active = []
+    overlaps = []
+    lock = threading.Lock()
+
+    def slow_call(name):
+        with lock:
+            active.append(name)
+            if len(active) > 1:
+                overlaps.append(tuple(active))
+        time.sleep(0.02)
+        with lock:
+            active.remove(name)
+        return name
+
+    device, _ = make_device()
+    machine = AsyncMailboxStateMachine(device)
+
+    async def scenario():
+        return await asyncio.gather(*(machine.call_api(slow_call, i) for i in range(4)))
+
+    assert run(scenario()) == [0, 1, 2, 3]
+    assert overlaps == []
+
+
+# ==========================================
+# State handlers
+# ==========================================
+
+def test_prefetched_packages_are_used_by_courier_mode(monkeypatch):
+    monkeypatch.setattr(mailbox_async, 'OUTBOX_ENABLED', False)
+    monkeypatch.setattr(mailbox_async, 'API_BATCH_PLACE', True)
+    user = ValidationResponse({'id': 7, 'name': 'Courier', 'roles': ['Courier']})
+    packages = [courier_package(1), courier_package(2)]
+    device, calls = make_device(
+        validate_nfc=lambda serial: user,
+        get_courier_packages=lambda serial: calls.append(('get_courier_packages', serial)) or packages,
+        calculate_optimal_locker=lambda h, w, d: placement(3),
+        place_packages_bulk=lambda placements, serial: [True, False],
+    )
+    machine = quick(AsyncMailboxStateMachine(device))
+
+    async def input_serial(prompt, max_length=None, numeric_only=None):
+        return '1234'
+
+    machine.lcd_input = input_serial
+
+    async def scenario():
+        await machine.handle_input_serial()
+        assert machine.state == STATE_COURIER_MODE
+        await machine.handle_courier_mode()
+
+    run(scenario())
+
+    assert [call for call in calls if call[0] == 'get_courier_packages'] == [('get_courier_packages', '1234')]
+    assert machine.state == STATE_MAIN_MENU
+    # The rejected package is taken out of the locker again
+    assert ('clear_locker_state', 3, 2) in calls
+    assert device.stats.packages_delivered == 1
+
+
+def test_client_mode_opens_relay_and_queues_confirmation(monkeypatch):
+    monkeypatch.setattr(mailbox_async, 'OUTBOX_ENABLED', True)
+    outbox = FakeOutbox()
+    lockers = [LockerPackage({'lockerId': 4, 'packageId': 40})]
+    relay_states = []
+
+    class Relay(FakePin):
+        def on(self):
+            relay_states.append(1)
+
+        def off(self):
+            relay_states.append(0)
+
+    device, calls = make_device(get_delivered_lockers=lambda serial: lockers, outbox=outbox, relay=Relay())
+    machine = quick(AsyncMailboxStateMachine(device))
+    machine.serial_number = '99'
+
+    run(machine.handle_client_mode())
+
+    assert relay_states == [1, 0]
+    assert outbox.entries == [(OP_RECEIVE, {'packageId': 40, 'serialNumber': '99'})]
+    assert ('clear_locker_state', 4, 40) in calls
+    assert device.stats.packages_received == 1
+    assert machine.state == STATE_MAIN_MENU
+
+
+def test_skipped_confirmation_keeps_locker_state(monkeypatch):
+    monkeypatch.setattr(mailbox_async, 'OUTBOX_ENABLED', True)
+    outbox = FakeOutbox()
+    device, calls = make_device(
+        get_delivered_lockers=lambda serial: [LockerPackage({'lockerId': 4, 'packageId': 40})],
+        outbox=outbox)
+    machine = quick(AsyncMailboxStateMachine(device), confirm='D')
+
+    run(machine.handle_client_mode())
+
+    assert outbox.entries == []
+    assert not [call for call in calls if call[0] == 'clear_locker_state']
+
+
+def test_run_loop_recovers_from_handler_errors():
+    device, calls = make_device(keypad=ScriptedKeypad([(KEY_PRESS, '5')]))
+    machine = AsyncMailboxStateMachine(device)
+    seen = []
+
+    async def failing_menu():
+        seen.append(machine.state)
+        raise ValueError("boom")
+
+    async def error_handler():
+        seen.append(machine.error_message)
+        machine.stop()
+
+    machine.handle_main_menu = failing_menu
+    machine.handle_error = error_handler
+
+    run(machine.run())
+
+    assert seen == [STATE_MAIN_MENU, "boom"]
+    assert machine._tasks == []
+
+
+# ==========================================
+# LED engine on a hardware timer
+# ==========================================
+
+def test_led_engine_driven_by_timer(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(led_engine, 'ticks_ms', clock.ticks_ms)
+    monkeypatch.setitem(sys.modules, 'machine', types.SimpleNamespace(Timer=FakeTimer))
+    engine = LedEngine(tick_ms=10)
+    led = FakePin()
+
+    engine.start_timer(3)
+    timer = engine._timer
+    assert timer.period == 10 and timer.mode == FakeTimer.PERIODIC
+
+    engine.blink(led, 1, 0.05)
+    assert led.value() == 1
+    clock.now += 50
+    timer.fire()
+    assert led.value() == 0 and engine.is_busy(led)
+    clock.now += 50
+    timer.fire()
+    assert not engine.is_busy(led)
+
+    engine.stop_timer()
+    assert timer.callback is None
+    assert led.value() == 0
+
+
+def test_failed_prefetch_is_not_repeated():
+    fetches = []
+    device, _ = make_device(get_delivered_lockers=lambda serial: fetches.append(serial))
+    machine = quick(AsyncMailboxStateMachine(device))
+    machine.serial_number = '99'
+    client = ValidationResponse({'name': 'Client', 'roles': ['Client']})
+
+    async def scenario():
+        machine.prefetch_for_role(client)
+        await machine.handle_client_mode()
+
+    run(scenario())
+    assert fetches == ['99']
+    assert machine.state == STATE_MAIN_MENU
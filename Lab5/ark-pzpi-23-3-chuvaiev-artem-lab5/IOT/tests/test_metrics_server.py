@@ -0,0 +1,136 @@
+import errno
+
+import metrics_server
+from metrics_server import MetricsServer, render_metrics
+from statistics import SystemStatistics
+
+
+class FakeClient:
+    """Non-blocking client socket fed from a script of recv() results"""
+
+    def __init__(self, chunks, send_limit=None):
+        self.chunks = list(chunks)
+        self.send_limit = send_limit
+        self.sent = b''
+        self.blocking = True
+        self.closed = False
+
+    def setblocking(self, flag):
+        self.blocking = flag
+
+    def recv(self, size):
+        assert not self.blocking
+        if not self.chunks:
+            raise OSError(errno.EAGAIN)
+        chunk = self.chunks.pop(0)
+        if chunk is None:
+            raise OSError(errno.EAGAIN)
+        return chunk
+
+    def send(self, data):
+        assert not self.blocking
+        data = bytes(data)
+        if self.send_limit is not None:
+            data = data[:self.send_limit]
+        self.sent += data
+        return len(data)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeListener:
+    def __init__(self, clients):
+        self.clients = list(clients)
+
+    def accept(self):
+        if not self.clients:
+            raise OSError(errno.EAGAIN)
+        return self.clients.pop(0), ('127.0.0.1', 50000)
+
+    def close(self):
+        pass
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+def make_server(monkeypatch, clients):
+    clock = FakeClock()
+    monkeypatch.setattr(metrics_server.time, 'time', clock.time)
+    server = MetricsServer(SystemStatistics(), client_timeout=2)
+    server._listener = FakeListener(clients)
+    return server, clock
+
+
+def test_render_metrics_exposes_counters_and_summaries():
+    stats = SystemStatistics()
+    stats.record_nfc_validation(True)
+    stats.record_nfc_validation(False)
+    stats.record_operation_time(150.0)
+    stats.record_api_call('validate', 200, {'connect': 50.0, 'wait': 200.0}, 100, 200)
+
+    text = ''.join(render_metrics(stats))
+
+    assert 'nfc_mailbox_nfc_validations_total{result="success"} 1\n' in text
+    assert 'nfc_mailbox_nfc_validations_total{result="failed"} 1\n' in text
+    assert '# TYPE nfc_mailbox_operation_duration_seconds summary\n' in text
+    assert 'nfc_mailbox_operation_duration_seconds_count 1\n' in text
+    assert 'nfc_mailbox_api_requests_total{endpoint="validate",status="200"} 1\n' in text
+    assert 'nfc_mailbox_api_request_duration_seconds_sum{endpoint="validate"} 0.25\n' in text
+    assert 'nfc_mailbox_api_bytes_total{endpoint="validate",direction="sent"} 100\n' in text
+    for line in text.splitlines():
+        assert line.startswith('# ') or line.startswith('nfc_mailbox_'), line
+
+
+def test_poll_answers_scrape_split_across_calls(monkeypatch):
+    client = FakeClient([b'GET /metr', None, b'ics HTTP/1.1\r\nHost: x\r\n', b'\r\n'], send_limit=100)
+    server, _ = make_server(monkeypatch, [client])
+
+    for _ in range(100):
+        server.poll()
+        if client.closed:
+            break
+
+    assert client.closed
+    assert client.sent.startswith(b'HTTP/1.0 200 OK\r\n')
+    assert b'nfc_mailbox_uptime_seconds' in client.sent
+    assert server.scrapes == 1
+
+
+def test_poll_returns_immediately_for_silent_client(monkeypatch):
+    client = FakeClient([])
+    server, clock = make_server(monkeypatch, [client])
+
+    assert server.poll()
+    assert not client.closed
+    clock.now += 1
+    server.poll()
+    assert not client.closed
+
+    clock.now += 1.5
+    server.poll()
+    assert client.closed
+    assert client.sent == b''
+    assert server._client is None
+
+
+def test_poll_rejects_unknown_path(monkeypatch):
+    client = FakeClient([b'GET / HTTP/1.1\r\n\r\n'])
+    server, _ = make_server(monkeypatch, [client])
+
+    server.poll()
+
+    assert client.sent.startswith(b'HTTP/1.0 404 Not Found\r\n')
+    assert client.closed
+    assert server.scrapes == 0
+
+
+def test_poll_without_connection(monkeypatch):
+    server, _ = make_server(monkeypatch, [])
+    assert server.poll() is False
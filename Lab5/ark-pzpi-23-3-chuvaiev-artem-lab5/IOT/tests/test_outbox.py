@@ -0,0 +1,136 @@
+import json
+import os
+
+from outbox import OP_PLACE, OP_RECEIVE, Outbox
+
+
+class ScriptedSender:
+    """Returns the scripted result for each entry, keyed by packageId"""
+
+    def __init__(self, results=None, default=True):
+        self.results = results or {}
+        self.default = default
+        self.calls = []
+
+    def __call__(self, entries):
+        self.calls.append([entry.key for entry in entries])
+        return [self.results.get(entry.args['packageId'], self.default) for entry in entries]
+
+
+def read_lines(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_load_replays_log_without_acked_entries(tmp_path):
+    path = str(tmp_path / 'outbox.log')
+    outbox = Outbox(path, ScriptedSender({1: True, 2: False}))
+    outbox.enqueue(OP_PLACE, {'packageId': 1, 'postBoxId': 5, 'serialNumber': 'A'})
+    key = outbox.enqueue(OP_RECEIVE, {'packageId': 2, 'serialNumber': 'A'})
+    outbox.drain(now=0)
+
+    restored = Outbox(path, ScriptedSender())
+    assert [(entry.key, entry.op, entry.args) for entry in restored.pending] == \
+        [(key, OP_RECEIVE, {'packageId': 2, 'serialNumber': 'A'})]
+    assert restored.acks == 1
+
+
+def test_load_skips_torn_last_line(tmp_path):
+    path = str(tmp_path / 'outbox.log')
+    outbox = Outbox(path, ScriptedSender())
+    key = outbox.enqueue(OP_PLACE, {'packageId': 1, 'postBoxId': 5, 'serialNumber': 'A'})
+    with open(path, 'a') as f:
+        f.write('{"key": "abc", "op": "pla')
+
+    restored = Outbox(path, ScriptedSender())
+    assert [entry.key for entry in restored.pending] == [key]
+
+
+def test_load_removes_fully_acked_log(tmp_path):
+    path = str(tmp_path / 'outbox.log')
+    outbox = Outbox(path, ScriptedSender())
+    key = outbox.enqueue(OP_PLACE, {'packageId': 1, 'postBoxId': 5, 'serialNumber': 'A'})
+    with open(path, 'a') as f:
+        f.write(json.dumps({'key': key, 'ack': True}) + "\n")
+
+    restored = Outbox(path, ScriptedSender())
+    assert len(restored) == 0
+    assert not os.path.exists(path)
+
+
+def test_rejected_entries_are_dropped_and_reported(tmp_path):
+    path = str(tmp_path / 'outbox.log')
+    outbox = Outbox(path, ScriptedSender({1: None, 2: True}))
+    rejected_key = outbox.enqueue(OP_PLACE, {'packageId': 1, 'postBoxId': 5, 'serialNumber': 'A'})
+    outbox.enqueue(OP_PLACE, {'packageId': 2, 'postBoxId': 6, 'serialNumber': 'A'})
+
+    assert outbox.drain(now=0) == 1
+    assert len(outbox) == 0
+    assert outbox.dropped == 1
+    assert [entry.key for entry in outbox.take_rejected()] == [rejected_key]
+    assert outbox.take_rejected() == []
+    assert not os.path.exists(path)
+
+
+def test_failed_round_backs_off(tmp_path):
+    outbox = Outbox(str(tmp_path / 'outbox.log'), ScriptedSender(default=False), backoff_base=5)
+    outbox.enqueue(OP_PLACE, {'packageId': 1, 'postBoxId': 5, 'serialNumber': 'A'})
+
+    assert outbox.drain(now=100) == 0
+    assert outbox.failures == 1
+    assert 105 <= outbox.next_attempt <= 100 + 5 * 1.25
+    assert not outbox.is_due(now=104)
+
+
+def test_enqueue_keeps_backoff_window(tmp_path):
+    sender = ScriptedSender(default=False)
+    outbox = Outbox(str(tmp_path / 'outbox.log'), sender, backoff_base=5)
+    outbox.enqueue(OP_PLACE, {'packageId': 1, 'postBoxId': 5, 'serialNumber': 'A'})
+    outbox.drain(now=100)
+    next_attempt = outbox.next_attempt
+
+    # Offline: new confirmations wait for the window instead of another timeout
+    outbox.enqueue(OP_PLACE, {'packageId': 2, 'postBoxId': 6, 'serialNumber': 'A'})
+    assert outbox.next_attempt == next_attempt
+    assert not outbox.is_due(now=104)
+    assert outbox.drain(now=104) == 0
+    assert len(sender.calls) == 1
+
+    sender.default = True
+    assert outbox.drain(now=next_attempt) == 2
+    assert outbox.next_attempt == 0
+
+
+def test_log_is_compacted_while_entries_are_stuck(tmp_path):
+    path = str(tmp_path / 'outbox.log')
+    sender = ScriptedSender({0: False})
+    outbox = Outbox(path, sender, compact_after=4)
+    stuck = outbox.enqueue(OP_PLACE, {'packageId': 0, 'postBoxId': 1, 'serialNumber': 'A'})
+
+    for package_id in range(1, 10):
+        outbox.enqueue(OP_PLACE, {'packageId': package_id, 'postBoxId': 2, 'serialNumber': 'A'})
+        outbox.drain(now=0)
+        outbox.next_attempt = 0
+        assert len(read_lines(path)) <= 1 + 2 * 4
+
+    assert outbox.compactions >= 2
+    assert [entry.key for entry in Outbox(path, ScriptedSender()).pending] == [stuck]
+
+
+def test_interrupted_compaction_is_recovered(tmp_path):
+    path = str(tmp_path / 'outbox.log')
+    record = {'key': 'k1', 'op': OP_PLACE, 'args': {'packageId': 1}}
+    with open(path + '.tmp', 'w') as f:
+        f.write(json.dumps(record) + "\n")
+
+    # Old log already removed: the rewritten one is complete and takes its place
+    restored = Outbox(path, ScriptedSender())
+    assert [entry.key for entry in restored.pending] == ['k1']
+    assert not os.path.exists(path + '.tmp')
+
+    # Old log still there: the rewritten one may be torn and is discarded
+    with open(path + '.tmp', 'w') as f:
+        f.write('{"key": "k2", "op"')
+    restored = Outbox(path, ScriptedSender())
+    assert [entry.key for entry in restored.pending] == ['k1']
+    assert not os.path.exists(path + '.tmp')
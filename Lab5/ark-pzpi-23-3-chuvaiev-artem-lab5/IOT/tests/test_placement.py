@@ -0,0 +1,565 @@
+import os
+import random
+
+import pytest
+
+import placement
+from placement import LockerIndex, VectorScorer, find_locker_linear
+from placement_sim import load_bank
+
+CONFIG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config.json')
+OPTIMAL_MIN = 60
+OPTIMAL_MAX = 85
+
+
+def locker(locker_id, height, width, depth, usage=0, status='available'):
+    return {'id': locker_id, 'height': height, 'width': width, 'depth': depth,
+            'maxVolume': height * width * depth, 'currentUsage': usage, 'status': status}
+
+
+def random_bank(rng, count, occupied=0.3):
+    """Lockers from a few shapes (so size classes repeat and ties happen), some occupied"""
+    shapes = [(300, 400, 500), (500, 400, 300), (400, 400, 600), (500, 500, 700),
+              (200, 300, 900), (600, 600, 800)]
+    lockers = []
+    for i in range(count):
+        height, width, depth = rng.choice(shapes)
+        item = locker(i + 1, height, width, depth)
+        if rng.random() < occupied:
+            if rng.random() < 0.5:
+                item['currentUsage'] = item['maxVolume'] // 3
+            item['status'] = 'occupied'
+        lockers.append(item)
+    # Database order is not sorted by id
+    rng.shuffle(lockers)
+    return lockers
+
+
+def random_package(rng, low=50, high=650):
+    return rng.randint(low, high), rng.randint(low, high), rng.randint(low, high)
+
+
+def linear(lockers, height, width, depth):
+    available = [item for item in lockers if item['status'] == 'available']
+    return find_locker_linear(available, height, width, depth, OPTIMAL_MIN, OPTIMAL_MAX)
+
+
+# ==========================================
+# LockerIndex.find vs find_locker_linear
+# ==========================================
+
+@pytest.mark.parametrize('seed', range(5))
+def test_find_matches_linear(seed):
+    rng = random.Random(seed)
+    lockers = random_bank(rng, 60)
+    index = LockerIndex(lockers, OPTIMAL_MIN, OPTIMAL_MAX)
+    for _ in range(300):
+        package = random_package(rng)
+        assert index.find(*package) == linear(lockers, *package), package
+
+
+def test_find_matches_linear_on_config_bank():
+    lockers, optimal_min, optimal_max = load_bank(CONFIG, size=100)
+    index = LockerIndex(lockers, optimal_min, optimal_max)
+    rng = random.Random(7)
+    for _ in range(300):
+        package = random_package(rng, 50, 450)
+        expected = find_locker_linear(lockers, *package, optimal_min, optimal_max)
+        assert index.find(*package) == expected, package
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_find_matches_linear_while_filling_and_emptying(seed):
+    rng = random.Random(seed)
+    lockers = random_bank(rng, 40, occupied=0.0)
+    index = LockerIndex(lockers, OPTIMAL_MIN, OPTIMAL_MAX)
+    by_id = {item['id']: item for item in lockers}
+    used = []
+    for _ in range(400):
+        if used and rng.random() < 0.4:
+            item = by_id[used.pop(rng.randrange(len(used)))]
+            item['currentUsage'] = 0
+            item['status'] = 'available'
+            index.mark_free(item['id'])
+            continue
+        package = random_package(rng)
+        placement = index.find(*package)
+        assert placement == linear(lockers, *package), package
+        if placement is not None:
+            item = by_id[placement['lockerId']]
+            item['currentUsage'] = placement['volume']
+            item['status'] = 'occupied'
+            index.mark_occupied(item['id'])
+            used.append(item['id'])
+    assert index.free_count() == len(lockers) - len(used)
+
+
+# ==========================================
+# Bookkeeping
+# ==========================================
+
+def test_mark_occupied_and_free():
+    lockers = [locker(1, 300, 400, 500), locker(2, 300, 400, 500), locker(3, 600, 600, 800)]
+    index = LockerIndex(lockers, OPTIMAL_MIN, OPTIMAL_MAX)
+    assert index.free_count() == 3
+    assert index.find(300, 400, 450)['lockerId'] == 1
+
+    index.mark_occupied(1)
+    assert index.free_count() == 2
+    assert index.find(300, 400, 450)['lockerId'] == 2
+
+    index.mark_occupied(2)
+    assert index.find(300, 400, 450)['lockerId'] == 3
+    index.mark_occupied(3)
+    assert index.find(300, 400, 450) is None
+    assert index.free_count() == 0
+
+    # Freed lockers come back in database order
+    index.mark_free(2)
+    index.mark_free(1)
+    assert index.find(300, 400, 450)['lockerId'] == 1
+    assert index.free_count() == 2
+
+
+def test_marks_are_idempotent():
+    lockers = [locker(1, 300, 400, 500), locker(2, 300, 400, 500)]
+    index = LockerIndex(lockers, OPTIMAL_MIN, OPTIMAL_MAX)
+    index.mark_occupied(1)
+    index.mark_occupied(1)
+    assert index.free_count() == 1
+    index.mark_free(1)
+    index.mark_free(1)
+    index.mark_free(2)
+    assert index.free_count() == 2
+    assert index.classes[0].free == [0, 1]
+
+
+def test_unavailable_and_used_lockers_start_occupied():
+    lockers = [locker(1, 300, 400, 500, status='maintenance'),
+               locker(2, 300, 400, 500, usage=1000, status='available'),
+               locker(3, 300, 400, 500)]
+    index = LockerIndex(lockers, OPTIMAL_MIN, OPTIMAL_MAX)
+    assert index.free_count() == 1
+    assert index.find(100, 100, 100)['lockerId'] == 3
+    assert index.get(2) is lockers[1]
+    assert index.get(99) is None
+
+
+# ==========================================
+# Size class boundaries
+# ==========================================
+
+def test_package_equal_to_locker_fits():
+    index = LockerIndex([locker(1, 300, 400, 500)], OPTIMAL_MIN, OPTIMAL_MAX)
+    placement = index.find(500, 300, 400)
+    assert placement['lockerId'] == 1
+    assert placement['utilization'] == 100.0
+
+
+def test_one_millimetre_over_is_rejected():
+    index = LockerIndex([locker(1, 300, 400, 500)], OPTIMAL_MIN, OPTIMAL_MAX)
+    assert index.find(301, 400, 500) is None
+    assert index.find(300, 401, 500) is None
+    assert index.find(100, 100, 501) is None
+    # Smaller by volume but one side too long
+    assert index.find(50, 50, 600) is None
+
+
+def test_same_volume_different_shape_are_separate_classes():
+    # Both 60 000 000 mm^3; only the long thin one takes a 850 mm package
+    lockers = [locker(1, 300, 400, 500), locker(2, 200, 350, 857)]
+    lockers[1]['maxVolume'] = 60000000
+    index = LockerIndex(lockers, OPTIMAL_MIN, OPTIMAL_MAX)
+    assert len(index.classes) == 2
+    assert index.find(150, 150, 850)['lockerId'] == 2
+    assert index.find(250, 250, 400)['lockerId'] == 1
+    assert index.find(150, 150, 850) == linear(lockers, 150, 150, 850)
+
+
+def test_volume_boundary_between_classes():
+    small = locker(1, 100, 100, 100)
+    large = locker(2, 200, 200, 200)
+    index = LockerIndex([small, large], OPTIMAL_MIN, OPTIMAL_MAX)
+    index.mark_occupied(2)
+    # Exactly the small class's volume still goes there
+    assert index.find(100, 100, 100)['lockerId'] == 1
+    # One more millimetre needs the next class
+    assert index.find(100, 100, 101) is None
+    index.mark_free(2)
+    assert index.find(100, 100, 101)['lockerId'] == 2
+    assert index.find(200, 200, 201) is None
+    for package in ((100, 100, 100), (100, 100, 101), (160, 160, 160)):
+        assert index.find(*package) == linear([small, large], *package)
+
+
+def test_equal_scores_break_ties_on_database_order():
+    lockers = [locker(5, 300, 400, 500), locker(2, 500, 400, 300), locker(9, 400, 300, 500)]
+    index = LockerIndex(lockers, OPTIMAL_MIN, OPTIMAL_MAX)
+    assert index.find(300, 300, 300)['lockerId'] == 5
+    assert index.find(300, 300, 300) == linear(lockers, 300, 300, 300)
+
+
+# ==========================================
+# Batch planning
+# ==========================================
+
+def brute_force(lockers, packages):
+    """(placed, efficiency sum) of the best assignment of packages to distinct free lockers"""
+    free = [item for item in lockers if item['status'] == 'available' and item['currentUsage'] == 0]
+    scores = []
+    for package in packages:
+        options = {}
+        for item in free:
+            placement = find_locker_linear([item], *package, OPTIMAL_MIN, OPTIMAL_MAX)
+            if placement is not None:
+                options[item['id']] = placement['efficiency']
+        scores.append(options)
+
+    best = (0, 0.0)
+
+    def search(p, used, placed, efficiency):
+        nonlocal best
+        if p == len(packages):
+            if placed > best[0] or (placed == best[0] and efficiency > best[1] + 1e-9):
+                best = (placed, efficiency)
+            return
+        search(p + 1, used, placed, efficiency)
+        for locker_id, score in scores[p].items():
+            if locker_id not in used:
+                used.add(locker_id)
+                search(p + 1, used, placed + 1, efficiency + score)
+                used.remove(locker_id)
+
+    search(0, set(), 0, 0.0)
+    return best
+
+
+def check_plan(lockers, placements, packages):
+    by_id = {item['id']: item for item in lockers}
+    chosen = [placement['lockerId'] for placement in placements if placement is not None]
+    assert len(chosen) == len(set(chosen))
+    for placement, package in zip(placements, packages):
+        if placement is None:
+            continue
+        item = by_id[placement['lockerId']]
+        assert item['status'] == 'available' and item['currentUsage'] == 0
+        assert find_locker_linear([item], *package, OPTIMAL_MIN, OPTIMAL_MAX) == placement
+    return len(chosen), sum(placement['efficiency'] for placement in placements if placement)
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_plan_matches_brute_force(seed):
+    rng = random.Random(seed)
+    lockers = random_bank(rng, rng.randint(2, 6), occupied=0.2)
+    packages = [random_package(rng, 100, 600) for _ in range(rng.randint(1, 5))]
+    index = LockerIndex(lockers, OPTIMAL_MIN, OPTIMAL_MAX)
+
+    placements = index.plan(packages)
+    assert len(placements) == len(packages)
+    placed, efficiency = check_plan(lockers, placements, packages)
+    best_placed, best_efficiency = brute_force(lockers, packages)
+    assert placed == best_placed
+    assert efficiency == pytest.approx(best_efficiency)
+
+
+def test_plan_beats_greedy_on_contention():
+    # Greedy gives the first package the only locker the second one fits into
+    lockers = [locker(1, 300, 400, 500), locker(2, 600, 600, 800)]
+    packages = [(300, 400, 500), (550, 550, 700)]
+    index = LockerIndex(lockers, OPTIMAL_MIN, OPTIMAL_MAX)
+
+    greedy = index.plan_greedy(packages)
+    planned = index.plan(packages)
+    assert greedy[0]['lockerId'] == 2 and greedy[1] is None
+    assert [placement['lockerId'] for placement in planned] == [1, 2]
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_plan_never_places_fewer_than_greedy(seed):
+    rng = random.Random(seed)
+    lockers = random_bank(rng, 30, occupied=0.4)
+    index = LockerIndex(lockers, OPTIMAL_MIN, OPTIMAL_MAX)
+    free = index.free_count()
+    for _ in range(10):
+        packages = [random_package(rng, 100, 700) for _ in range(rng.randint(1, 24))]
+        planned, _ = check_plan(lockers, index.plan(packages), packages)
+        greedy, _ = check_plan(lockers, index.plan_greedy(packages), packages)
+        assert planned >= greedy
+    # Neither method changes the free set
+    assert index.free_count() == free
+
+
+def test_compare_plans_report():
+    from placement_sim import compare_plans, random_batches
+
+    lockers, optimal_min, optimal_max = load_bank(CONFIG, size=12)
+    index = LockerIndex(lockers, optimal_min, optimal_max)
+    report = compare_plans(index, random_batches(batches=5, batch_size=8, seed=3))
+    assert set(report) == {'plan', 'greedy'}
+    for result in report.values():
+        assert result['packages'] == 40
+        assert result['time_us'] > 0
+    assert report['plan']['placed'] >= report['greedy']['placed']
+
+
+# ==========================================
+# Co-location: guillotine packing and recipients
+# ==========================================
+
+def test_split_box_leaves_three_pieces():
+    from placement import _split_box
+
+    # Smallest side along smallest side, package in the corner
+    pieces = _split_box((300, 400, 500), (100, 200, 300))
+    assert pieces == [(200, 400, 500), (100, 200, 500), (100, 200, 200)]
+    assert sum(a * b * c for a, b, c in pieces) == 300 * 400 * 500 - 100 * 200 * 300
+    # The first cut goes across the largest remainder
+    assert _split_box((300, 400, 500), (300, 400, 100)) == [(300, 400, 400)]
+    # An exact fit leaves nothing
+    assert _split_box((300, 400, 500), (300, 400, 500)) == []
+
+
+def test_fit_box_picks_smallest_box_that_holds_the_package():
+    from placement import _fit_box
+
+    boxes = [(300, 400, 500), (100, 200, 300), (150, 250, 300)]
+    assert _fit_box(boxes, (100, 200, 300)) == 1
+    assert _fit_box(boxes, (120, 200, 300)) == 2
+    assert _fit_box(boxes, (310, 310, 310)) is None
+
+
+def shared_index(*lockers):
+    return LockerIndex(list(lockers), OPTIMAL_MIN, OPTIMAL_MAX)
+
+
+def put(index, locker_id, package, recipient):
+    """What update_locker_state does for one package"""
+    item = index.get(locker_id)
+    index.place(locker_id, *package, recipient)
+    item['currentUsage'] += package[0] * package[1] * package[2]
+    item['status'] = 'occupied'
+    index.mark_occupied(locker_id)
+
+
+def test_second_package_of_recipient_shares_locker():
+    index = shared_index(locker(1, 300, 400, 500))
+    put(index, 1, (300, 400, 200), 'u1')
+
+    # Leftover pieces: 100 x 400 x 500, 100 x 200 x 500, 100 x 200 x 300
+    placement = index.find_shared(100, 400, 450, 'u1')
+    assert placement['lockerId'] == 1
+    assert placement['utilization'] == pytest.approx(70.0)
+    assert index.find_shared(100, 200, 300, 'u1')['lockerId'] == 1
+
+
+def test_rotated_package_fits_leftover_space():
+    index = shared_index(locker(1, 300, 400, 500))
+    put(index, 1, (100, 300, 400), 'u1')
+    # Biggest leftover is 200 x 400 x 500; a package given as 450 high is
+    # taller than the 300 mm locker and only fits turned on its side
+    assert index.find_shared(450, 150, 350, 'u1')['lockerId'] == 1
+    assert index.find_shared(150, 350, 450, 'u1')['lockerId'] == 1
+    assert index.find_shared(450, 250, 350, 'u1') is None
+
+
+def test_fits_by_volume_but_not_by_dimensions_is_rejected():
+    index = shared_index(locker(1, 300, 400, 500))
+    put(index, 1, (300, 400, 400), 'u1')
+    # 20 % of the locker is free as one 100 x 300 x 400 slab
+    assert 60 * 60 * 600 < 100 * 300 * 400
+    assert index.find_shared(60, 60, 600, 'u1') is None
+    assert index.find_shared(150, 150, 150, 'u1') is None
+    assert index.find_shared(101, 300, 400, 'u1') is None
+    assert index.find_shared(100, 300, 400, 'u1')['lockerId'] == 1
+
+
+def test_leftover_pieces_are_not_merged():
+    index = shared_index(locker(1, 300, 400, 500))
+    put(index, 1, (200, 300, 400), 'u1')
+    # Free volume would hold 300 x 400 x 250, but no single piece does
+    assert index.find_shared(300, 400, 250, 'u1') is None
+
+
+def test_different_recipients_never_share():
+    index = shared_index(locker(1, 300, 400, 500), locker(2, 300, 400, 500))
+    put(index, 1, (100, 100, 100), 'u1')
+    assert index.find_shared(100, 100, 100, 'u2') is None
+
+    # A package of someone else put in by hand takes the locker out of co-location
+    put(index, 1, (100, 100, 100), 'u2')
+    assert index.find_shared(100, 100, 100, 'u1') is None
+    assert index.find_shared(100, 100, 100, 'u2') is None
+
+
+def test_no_sharing_without_recipient_id():
+    index = shared_index(locker(1, 300, 400, 500))
+    put(index, 1, (100, 100, 100), None)
+    assert index.find_shared(100, 100, 100, None) is None
+
+    index = shared_index(locker(1, 300, 400, 500))
+    put(index, 1, (100, 100, 100), 'u1')
+    assert index.find_shared(100, 100, 100, None) is None
+    put(index, 1, (100, 100, 100), None)
+    assert index.find_shared(100, 100, 100, 'u1') is None
+
+
+def test_shared_locker_prefers_best_score_then_database_order():
+    index = shared_index(locker(1, 300, 400, 500), locker(2, 300, 400, 500), locker(3, 600, 600, 800))
+    put(index, 3, (300, 300, 300), 'u1')
+    put(index, 2, (300, 400, 250), 'u1')
+    put(index, 1, (300, 400, 250), 'u1')
+    # 1 and 2 would both end up about 52 % full and score the same; 3 about 10 %
+    assert index.find_shared(100, 100, 100, 'u1')['lockerId'] == 1
+    # Only the big locker has a piece for this one
+    assert index.find_shared(200, 300, 400, 'u1')['lockerId'] == 3
+
+
+# ==========================================
+# Locker contents (clear_locker_state)
+# ==========================================
+
+def pick_up(index, contents, locker_id, package_id):
+    """What clear_locker_state does for one collected package"""
+    item = index.get(locker_id)
+    package_volume = contents.remove(locker_id, package_id)
+    if package_volume is not None:
+        item['currentUsage'] -= package_volume
+        return False
+    item['currentUsage'] = 0
+    item['status'] = 'available'
+    index.mark_free(locker_id)
+    return True
+
+
+def test_locker_is_freed_after_its_last_package():
+    from placement import LockerContents
+
+    index = shared_index(locker(1, 300, 400, 500))
+    contents = LockerContents()
+    for package_id, package in ((10, (300, 400, 200)), (11, (300, 400, 100)), (12, (100, 100, 100))):
+        put(index, 1, package, 'u1')
+        contents.add(1, package_id, package[0] * package[1] * package[2])
+    assert contents.count(1) == 3
+
+    assert not pick_up(index, contents, 1, 11)
+    assert index.get(1)['currentUsage'] == 300 * 400 * 200 + 100 * 100 * 100
+    assert index.get(1)['status'] == 'occupied'
+    assert index.find(100, 100, 100) is None
+
+    assert not pick_up(index, contents, 1, 10)
+    assert contents.count(1) == 1
+    assert index.free_count() == 0
+
+    assert pick_up(index, contents, 1, 12)
+    assert index.get(1)['currentUsage'] == 0
+    assert index.find(100, 100, 100)['lockerId'] == 1
+    # Co-location state is dropped with the locker
+    assert index.find_shared(100, 100, 100, 'u1') is None
+
+
+def test_unknown_contents_clear_the_whole_locker():
+    from placement import LockerContents
+
+    contents = LockerContents()
+    # Filled before start: nothing is known about it
+    assert contents.remove(1, 10) is None
+    contents.add(2, 20, 1000)
+    contents.add(2, 21, 2000)
+    # A package that is not recorded there (e.g. collected by hand) clears it too
+    assert contents.remove(2, 99) is None
+    assert contents.count(2) == 0
+    contents.add(3, 30, 1000)
+    contents.add(3, 31, 2000)
+    assert contents.remove(3, 31) == 2000
+    assert contents.remove(3, 30) is None
+
+
+# ==========================================
+# VectorScorer
+# ==========================================
+
+BACKENDS = [
+    'array',
+    pytest.param('numpy', marks=pytest.mark.skipif(placement.numpy is None, reason="numpy is not installed"))
+]
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('seed', range(3))
+def test_vector_scorer_matches_linear(backend, seed):
+    rng = random.Random(seed)
+    lockers = random_bank(rng, 60)
+    scorer = VectorScorer(lockers, OPTIMAL_MIN, OPTIMAL_MAX, backend)
+    for _ in range(200):
+        package = random_package(rng)
+        assert scorer.find(*package) == linear(lockers, *package), package
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_vector_scorer_bookkeeping(backend):
+    lockers = [locker(1, 300, 400, 500), locker(2, 300, 400, 500), locker(3, 600, 600, 800)]
+    scorer = VectorScorer(lockers, OPTIMAL_MIN, OPTIMAL_MAX, backend)
+    assert scorer.find(300, 400, 450)['lockerId'] == 1
+
+    lockers[0]['currentUsage'] = 54000000
+    lockers[0]['status'] = 'occupied'
+    scorer.mark_occupied(1)
+    assert scorer.find(300, 400, 450)['lockerId'] == 2
+    scorer.mark_occupied(2)
+    scorer.mark_occupied(3)
+    assert scorer.find(100, 100, 100) is None
+
+    scorer.mark_free(2)
+    assert scorer.find(300, 400, 450)['lockerId'] == 2
+    assert scorer.find(301, 400, 500) is None
+    assert scorer.get(3) is lockers[2]
+    assert scorer.get(99) is None
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_vector_scorer_agrees_with_index_while_filling(backend):
+    rng = random.Random(11)
+    lockers = random_bank(rng, 50, occupied=0.0)
+    index = LockerIndex(lockers, OPTIMAL_MIN, OPTIMAL_MAX)
+    scorer = VectorScorer(lockers, OPTIMAL_MIN, OPTIMAL_MAX, backend)
+    for _ in range(60):
+        package = random_package(rng)
+        expected = index.find(*package)
+        assert scorer.find(*package) == expected, package
+        if expected is not None:
+            item = index.get(expected['lockerId'])
+            item['currentUsage'] = expected['volume']
+            item['status'] = 'occupied'
+            index.mark_occupied(item['id'])
+            scorer.mark_occupied(item['id'])
+
+
+def test_vector_scorer_rejects_unknown_backend():
+    with pytest.raises(ValueError):
+        VectorScorer([], OPTIMAL_MIN, OPTIMAL_MAX, 'simd')
+
+
+@pytest.mark.skipif(placement.numpy is not None, reason="numpy is installed")
+def test_numpy_backend_without_numpy():
+    with pytest.raises(ValueError):
+        VectorScorer([], OPTIMAL_MIN, OPTIMAL_MAX, 'numpy')
+
+
+def test_bench_engines_choose_the_same_lockers():
+    from placement_sim import bench_cases
+
+    # bench_cases checks every engine against find_locker_linear before timing
+    names = [name for name, _ in bench_cases(CONFIG, sizes=(10, 100))]
+    assert 'find_vector_array[100]' in names
+    assert ('find_vector_numpy[100]' in names) == (placement.numpy is not None)
+
+
+def test_bench_fails_when_an_engine_disagrees(monkeypatch):
+    import placement_sim
+
+    def wrong_find(self, height, width, depth):
+        return None
+
+    monkeypatch.setattr(placement_sim.VectorScorer, 'find', wrong_find)
+    with pytest.raises(AssertionError, match='find_vector_array'):
+        list(placement_sim.bench_cases(CONFIG, sizes=(10,)))
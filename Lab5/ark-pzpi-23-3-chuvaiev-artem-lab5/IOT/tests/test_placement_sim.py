@@ -0,0 +1,104 @@
+import os
+
+import pytest
+
+from placement import LockerContents, LockerIndex
+from placement_sim import ENGINES, Simulation, load_bank, synthetic_stream
+import placement
+
+CONFIG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config.json')
+
+
+def busy_stream(seed):
+    # About twice as many packages waiting as there are lockers, so some are rejected
+    return synthetic_stream(packages=200, arrivals_per_hour=6.0, dwell_hours=4.0,
+                            recipients=15, seed=seed)
+
+
+def replay_directly(events, colocation):
+    """Placements made the way main.py makes them: package id -> locker id or None"""
+    lockers, optimal_min, optimal_max = load_bank(CONFIG, size=12)
+    index = LockerIndex(lockers, optimal_min, optimal_max)
+    placed = {}
+    contents = LockerContents()
+    for event in events:
+        if event['event'] == 'arrive':
+            package = (event['height'], event['width'], event['depth'])
+            placement = None
+            if colocation:
+                placement = index.find_shared(*package, event['recipient'])
+            if placement is None:
+                placement = index.find(*package)
+            placed[event['id']] = placement and placement['lockerId']
+            if placement is None:
+                continue
+            locker_id = placement['lockerId']
+            if colocation:
+                index.place(locker_id, *package, event['recipient'])
+            index.get(locker_id)['currentUsage'] += placement['volume']
+            index.mark_occupied(locker_id)
+            contents.add(locker_id, event['id'], placement['volume'])
+        else:
+            locker_id = placed.get(event['id'])
+            if locker_id is None:
+                continue
+            package_volume = contents.remove(locker_id, event['id'])
+            if package_volume is not None:
+                index.get(locker_id)['currentUsage'] -= package_volume
+            else:
+                index.get(locker_id)['currentUsage'] = 0
+                index.mark_free(locker_id)
+    return placed
+
+
+@pytest.mark.parametrize('colocation', [False, True])
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_simulation_matches_locker_index(seed, colocation):
+    events = busy_stream(seed)
+    lockers, optimal_min, optimal_max = load_bank(CONFIG, size=12)
+    simulation = Simulation(lockers, optimal_min, optimal_max, 'index', colocation)
+
+    locations = {}
+    for event in events:
+        if event['event'] == 'arrive':
+            placement = simulation.arrive(event)
+            locations[event['id']] = placement and placement['lockerId']
+        else:
+            simulation.pickup(event)
+    report = simulation.report()
+
+    expected = replay_directly(events, colocation)
+    assert locations == expected
+    rejected = sum(1 for locker_id in expected.values() if locker_id is None)
+    assert report['arrivals'] == 200
+    assert report['rejected'] == rejected
+    assert report['placed'] == 200 - rejected
+    assert 0 < rejected < 200
+    if colocation:
+        assert report['shared_placements'] > 0
+    else:
+        assert report['shared_placements'] == 0
+    # Every package was collected again, the bank ends up empty
+    assert simulation.index.free_count() == len(lockers)
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_engines_accept_and_reject_the_same(engine):
+    if engine == 'numpy' and placement.numpy is None:
+        pytest.skip("numpy is not installed")
+    events = busy_stream(4)
+    reports = {}
+    for name in ('index', engine):
+        lockers, optimal_min, optimal_max = load_bank(CONFIG, size=12)
+        reports[name] = Simulation(lockers, optimal_min, optimal_max, name).replay(events)
+    for key in ('placed', 'rejected', 'avg_efficiency', 'peak_lockers_used'):
+        assert reports[engine][key] == reports['index'][key], key
+
+
+def test_replay_is_deterministic_for_a_seed():
+    lockers, optimal_min, optimal_max = load_bank(CONFIG, size=12)
+    first = Simulation(lockers, optimal_min, optimal_max, colocation=True).replay(busy_stream(5))
+    lockers, optimal_min, optimal_max = load_bank(CONFIG, size=12)
+    second = Simulation(lockers, optimal_min, optimal_max, colocation=True).replay(busy_stream(5))
+    for key in ('placed', 'rejected', 'shared_placements', 'avg_bank_utilization'):
+        assert first[key] == second[key]
@@ -0,0 +1,134 @@
+import pytest
+
+import statistics
+from statistics import (RollingWindow, SystemStatistics, W_DELIVERED, W_EFFICIENCY_SUM,
+                        W_FIELDS, W_NFC_SUCCESS)
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+
+class WallClock:
+    """time.time() replacement advanced by the test, in seconds"""
+
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return WallClock()
+
+
+@pytest.fixture
+def stats(clock, monkeypatch):
+    monkeypatch.setattr(statistics, 'time', clock)
+    stats = SystemStatistics()
+    stats.last_hour.clock = clock
+    stats.last_day.clock = clock
+    return stats
+
+
+def delivered(window):
+    return window.totals()[W_DELIVERED]
+
+
+def test_values_in_one_bucket_add_up(clock):
+    window = RollingWindow(60, 5, clock)
+    window.add(W_DELIVERED)
+    window.add(W_DELIVERED, 2)
+    clock.advance(59)
+    window.add(W_EFFICIENCY_SUM, 80.0)
+
+    totals = window.totals()
+    assert len(totals) == W_FIELDS
+    assert totals[W_DELIVERED] == 3
+    assert totals[W_EFFICIENCY_SUM] == 80.0
+
+
+def test_buckets_expire_one_period_at_a_time(clock):
+    window = RollingWindow(60, 5, clock)
+    for _ in range(5):
+        window.add(W_DELIVERED)
+        clock.advance(60)
+    # Now one period past the first bucket: it has left the window
+    assert delivered(window) == 4
+    for remaining in (3, 2, 1, 0):
+        clock.advance(60)
+        assert delivered(window) == remaining
+
+
+def test_reused_slot_is_cleared(clock):
+    window = RollingWindow(60, 5, clock)
+    window.add(W_DELIVERED, 7)
+    # Same slot, five periods later
+    clock.advance(5 * 60)
+    window.add(W_DELIVERED)
+
+    assert delivered(window) == 1
+    assert window.totals(now=clock.now - 5 * 60)[W_DELIVERED] == 0
+
+
+def test_gap_longer_than_window(clock):
+    window = RollingWindow(60, 5, clock)
+    for _ in range(3):
+        window.add(W_NFC_SUCCESS)
+        clock.advance(60)
+
+    clock.advance(10 * 5 * 60 + 17)
+    assert window.totals() == [0.0] * W_FIELDS
+
+    window.add(W_NFC_SUCCESS)
+    assert window.totals()[W_NFC_SUCCESS] == 1
+
+
+def test_hour_and_day_views_drop_old_buckets(clock, stats):
+    stats.record_package_delivered(90.0, 50.0)
+    clock.advance(30 * 60)
+    stats.record_package_delivered(70.0, 30.0)
+
+    hour = stats.get_window_summary(stats.last_hour)
+    assert hour['packages_delivered'] == 2
+    assert hour['avg_efficiency'] == pytest.approx(80.0)
+
+    clock.advance(45 * 60)
+    hour = stats.get_window_summary(stats.last_hour)
+    day = stats.get_window_summary(stats.last_day)
+    assert hour['packages_delivered'] == 1
+    assert hour['avg_efficiency'] == pytest.approx(70.0)
+    assert day['packages_delivered'] == 2
+
+    clock.advance(HOUR)
+    assert stats.get_window_summary(stats.last_hour)['packages_delivered'] == 0
+    assert stats.get_window_summary(stats.last_day)['packages_delivered'] == 2
+
+    clock.advance(DAY)
+    summary = stats.get_summary()
+    assert summary['last_hour']['packages_delivered'] == 0
+    assert summary['last_day']['packages_delivered'] == 0
+    assert summary['last_day']['avg_efficiency'] == 0.0
+    # Lifetime counters are not windowed
+    assert summary['packages_delivered'] == 2
+
+
+def test_day_view_after_long_outage(clock, stats):
+    for _ in range(24):
+        stats.record_nfc_validation(True)
+        clock.advance(HOUR)
+    assert stats.get_window_summary(stats.last_day)['total_validations'] == 23
+
+    clock.advance(3 * DAY)
+    stats.record_nfc_validation(False)
+    day = stats.get_window_summary(stats.last_day)
+    assert day['total_validations'] == 1
+    assert day['nfc_success_rate'] == 0.0
+    assert stats.get_window_summary(stats.last_hour)['total_validations'] == 1
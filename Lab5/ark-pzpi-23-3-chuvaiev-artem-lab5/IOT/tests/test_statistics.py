@@ -0,0 +1,154 @@
+import math
+import random
+
+from statistics import LogHistogram, RunningStats, SystemStatistics
+
+
+def exact_percentile(values, p):
+    ordered = sorted(values)
+    rank = max(1, int(math.ceil(p / 100.0 * len(ordered))))
+    return ordered[rank - 1]
+
+
+def check_against_exact(histogram, values, tolerance):
+    for value in values:
+        histogram.add(value)
+    for p in (50, 90, 99):
+        exact = exact_percentile(values, p)
+        estimate = histogram.percentile(p)
+        assert abs(estimate - exact) / exact <= tolerance, (p, estimate, exact)
+
+
+def test_api_latencies_match_exact_percentiles():
+    rng = random.Random(1)
+    values = [rng.lognormvariate(math.log(0.2), 0.8) for _ in range(5000)]
+    check_against_exact(LogHistogram(), values, 0.06)
+
+
+def test_operation_durations_match_exact_percentiles():
+    rng = random.Random(2)
+    values = [rng.uniform(120.0, 600.0) for _ in range(5000)]
+    check_against_exact(SystemStatistics().operation_latency, values, 0.06)
+
+
+def test_overflow_reports_tracked_max():
+    rng = random.Random(3)
+    values = [rng.uniform(120.0, 600.0) for _ in range(1000)]
+    histogram = LogHistogram(max_value=100.0)
+    for value in values:
+        histogram.add(value)
+    assert histogram.percentile(50) == max(values)
+    assert histogram.percentile(99) == max(values)
+
+
+def test_underflow_reports_tracked_min():
+    histogram = LogHistogram(min_value=0.01)
+    for value in (0.001, 0.002, 0.003, 5.0):
+        histogram.add(value)
+    assert histogram.percentile(50) == 0.001
+
+
+def test_empty_histogram():
+    assert LogHistogram().percentiles() == (0.0, 0.0, 0.0)
+
+
+# ==========================================
+# RunningStats
+# ==========================================
+
+def two_pass(values):
+    """mean, population std, min, max as the old list-based statistics computed them"""
+    if not values:
+        return 0.0, 0.0, None, None
+    mean = sum(values) / len(values)
+    if len(values) < 2:
+        std = 0.0
+    else:
+        std = math.sqrt(sum((x - mean) ** 2 for x in values) / len(values))
+    return mean, std, min(values), max(values)
+
+
+def check_running(values):
+    running = RunningStats()
+    for value in values:
+        running.add(value)
+    mean, std, low, high = two_pass(values)
+    assert running.count == len(values)
+    assert math.isclose(running.get_average(), mean, rel_tol=1e-9, abs_tol=1e-12)
+    assert math.isclose(running.get_std_deviation(), std, rel_tol=1e-9, abs_tol=1e-12)
+    assert running.min == low
+    assert running.max == high
+
+
+def test_running_stats_empty():
+    check_running([])
+    assert RunningStats().get_average() == 0.0
+    assert RunningStats().get_std_deviation() == 0.0
+
+
+def test_running_stats_single_sample():
+    check_running([42.5])
+
+
+def test_running_stats_match_two_pass():
+    rng = random.Random(3)
+    check_running([rng.uniform(0.0, 100.0) for _ in range(1000)])
+    check_running([rng.lognormvariate(0.0, 2.0) for _ in range(1000)])
+    check_running([-3.0, 7.0, 7.0, 7.0, 12.5])
+
+
+def test_running_stats_large_offset_is_stable():
+    # Welford keeps the variance where sum-of-squares would cancel out
+    from fractions import Fraction
+
+    rng = random.Random(4)
+    values = [1e9 + rng.uniform(0.0, 1.0) for _ in range(1000)]
+    running = RunningStats()
+    for value in values:
+        running.add(value)
+    exact_mean = sum(Fraction(x) for x in values) / len(values)
+    exact_var = sum((Fraction(x) - exact_mean) ** 2 for x in values) / len(values)
+    assert math.isclose(running.get_std_deviation(), math.sqrt(exact_var), rel_tol=1e-6)
+
+
+def test_summary_keeps_pre_accumulator_keys():
+    stats = SystemStatistics()
+    for value in (70.0, 85.0, 92.5):
+        stats.record_package_delivered(value, value / 2)
+    stats.record_operation_time(120.0)
+    summary = stats.get_summary()
+
+    assert set(summary) >= {
+        'uptime_hours', 'nfc_success_rate', 'total_validations', 'packages_delivered',
+        'packages_received', 'lockers_opened', 'avg_efficiency', 'std_efficiency',
+        'avg_utilization', 'avg_operation_time', 'validation_cache_hits',
+        'validation_cache_misses', 'validation_cache_hit_rate'
+    }
+    mean, std, _, _ = two_pass([70.0, 85.0, 92.5])
+    assert math.isclose(summary['avg_efficiency'], mean)
+    assert math.isclose(summary['std_efficiency'], std)
+    assert math.isclose(summary['avg_utilization'], mean / 2)
+    assert summary['avg_operation_time'] == 120.0
+
+
+def test_restored_summary_matches(tmp_path):
+    from stats_store import StatsStore
+
+    stats = SystemStatistics()
+    rng = random.Random(5)
+    for _ in range(50):
+        stats.record_package_delivered(rng.uniform(50.0, 100.0), rng.uniform(10.0, 90.0))
+        stats.record_operation_time(rng.uniform(30.0, 600.0))
+    paths = [str(tmp_path / 'stats_a.bin'), str(tmp_path / 'stats_b.bin')]
+    StatsStore(paths).save(stats)
+
+    restored = SystemStatistics(StatsStore(paths))
+    summary = restored.get_summary()
+    original = stats.get_summary()
+    assert set(summary) == set(original)
+    for key in ('avg_efficiency', 'std_efficiency', 'avg_utilization', 'avg_operation_time',
+                'packages_delivered'):
+        assert summary[key] == original[key], key
+    for name in ('efficiency_scores', 'locker_utilizations', 'operation_times'):
+        assert getattr(restored, name).min == getattr(stats, name).min
+        assert getattr(restored, name).max == getattr(stats, name).max
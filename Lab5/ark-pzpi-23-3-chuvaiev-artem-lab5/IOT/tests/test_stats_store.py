@@ -0,0 +1,112 @@
+import os
+
+from statistics import SystemStatistics
+from stats_store import StatsStore
+
+
+def make_store(tmp_path, **kwargs):
+    paths = [str(tmp_path / 'stats_a.bin'), str(tmp_path / 'stats_b.bin')]
+    return StatsStore(paths, **kwargs)
+
+
+def sample_stats():
+    stats = SystemStatistics()
+    stats.record_nfc_validation(True)
+    stats.record_nfc_validation(False)
+    stats.record_package_delivered(82.5, 64.0)
+    stats.record_operation_time(240.0)
+    stats.record_api_call('validate', 200, {'connect': 40.0, 'wait': 110.0}, 120, 480)
+    return stats
+
+
+def test_round_trip(tmp_path):
+    stats = sample_stats()
+    make_store(tmp_path).save(stats)
+
+    restored = SystemStatistics(make_store(tmp_path))
+    assert restored.nfc_validations_success == 1
+    assert restored.nfc_validations_failed == 1
+    assert restored.packages_delivered == 1
+    assert restored.get_average_efficiency() == stats.get_average_efficiency()
+    assert restored.operation_latency.count == 1
+    assert restored.operation_latency.total == stats.operation_latency.total
+    assert restored.api_calls['validate'].bytes_received == 480
+    assert restored.api_calls['validate'].status_codes == {200: 1}
+    assert restored.api_latency['validate'].percentiles() == stats.api_latency['validate'].percentiles()
+    assert restored.last_hour.totals() == stats.last_hour.totals()
+
+
+def test_saves_alternate_between_slots(tmp_path):
+    store = make_store(tmp_path)
+    stats = sample_stats()
+
+    store.save(stats)
+    store.save(stats)
+    store.save(stats)
+    assert store.sequence == 3
+    assert store.next_slot == 1
+    assert os.path.exists(store.paths[0]) and os.path.exists(store.paths[1])
+
+    reloaded = make_store(tmp_path)
+    assert reloaded.load(SystemStatistics())
+    # Newest snapshot (3) is in slot 0, so the next write goes to slot 1
+    assert reloaded.sequence == 3
+    assert reloaded.next_slot == 1
+
+
+def test_torn_newest_slot_falls_back_to_previous(tmp_path):
+    store = make_store(tmp_path)
+    stats = sample_stats()
+    store.save(stats)
+    stats.record_package_received()
+    store.save(stats)
+
+    with open(store.paths[1], 'rb') as f:
+        data = f.read()
+    with open(store.paths[1], 'wb') as f:
+        f.write(data[:len(data) // 2])
+
+    restored = SystemStatistics()
+    reloaded = make_store(tmp_path)
+    assert reloaded.load(restored)
+    assert reloaded.sequence == 1
+    assert restored.packages_received == 0
+    assert reloaded.next_slot == 1
+
+
+def test_corrupted_slot_is_rejected_by_crc(tmp_path):
+    store = make_store(tmp_path)
+    stats = sample_stats()
+    store.save(stats)
+    stats.record_package_received()
+    store.save(stats)
+
+    with open(store.paths[1], 'rb') as f:
+        data = bytearray(f.read())
+    data[20] ^= 0xFF
+    with open(store.paths[1], 'wb') as f:
+        f.write(data)
+
+    reloaded = make_store(tmp_path)
+    assert reloaded._read_slot(store.paths[1]) is None
+    assert reloaded.load(SystemStatistics())
+    assert reloaded.sequence == 1
+
+
+def test_no_valid_slot(tmp_path):
+    store = make_store(tmp_path)
+    with open(store.paths[0], 'wb') as f:
+        f.write(b'garbage')
+    assert not store.load(SystemStatistics())
+
+
+def test_maybe_save_waits_for_interval_and_changes(tmp_path):
+    store = make_store(tmp_path, min_interval=60)
+    stats = SystemStatistics()
+    start = store.last_save
+
+    assert not store.maybe_save(stats, now=start + 120)
+    stats.record_locker_opened()
+    assert not store.maybe_save(stats, now=start + 30)
+    assert store.maybe_save(stats, now=start + 120)
+    assert store.writes == 1